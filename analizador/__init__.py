@@ -0,0 +1 @@
+"""Núcleo del Analizador de Inversiones: datos de mercado y almacenamiento local."""
@@ -0,0 +1,5 @@
+import sys
+
+from analizador.cli import main
+
+sys.exit(main())
@@ -0,0 +1,186 @@
+"""Backtest de aportes periódicos (DCA) y rebalanceo a pesos objetivo sobre la matriz de cierres."""
+
+import numpy as np
+import pandas as pd
+
+# Frecuencias de aportes y de rebalanceo periódico (períodos de pandas)
+CONTRIBUTION_FREQUENCIES = ("W", "M", "Q")
+REBALANCE_FREQUENCIES = ("M", "Q", "Y")
+
+REBALANCE_MODES = (None, "periodic", "threshold")
+
+# Desvío máximo por defecto (en fracción del portfolio) del rebalanceo por umbral
+DEFAULT_THRESHOLD = 0.05
+
+# Filas que se revisan por vez al buscar el próximo desvío del umbral
+THRESHOLD_CHUNK = 256
+
+DAYS_PER_YEAR = 365.25
+
+
+def period_starts(index, freq):
+    """Máscara de la primera fila de cada período freq de un índice de fechas (todo False sin freq)"""
+    if freq is None or len(index) == 0:
+        return np.zeros(len(index), dtype=bool)
+    periods = pd.DatetimeIndex(index).tz_localize(None).to_period(freq).asi8
+    return np.r_[True, periods[1:] != periods[:-1]]
+
+
+def target_matrix(available, weights):
+    """Pesos objetivo de cada fila, repartidos solo entre las acciones que ya cotizan"""
+    w = np.where(available, weights, 0.0)
+    total = w.sum(axis=1, keepdims=True)
+    return np.divide(w, total, out=np.zeros_like(w), where=total > 0)
+
+
+def _segments(rows, flows, targets, prices, safe_prices, units):
+    """Tenencias por fila con rebalanceos al inicio de cada fila de rows
+
+    Entre rebalanceos las tenencias solo cambian por los aportes, así que el
+    valor V_k tras cada rebalanceo cumple V_{k+1} = g_k · V_k + D_k, con g_k
+    el crecimiento de la cartera rebalanceada en el tramo y D_k el valor al
+    final del tramo de sus aportes. La recurrencia se resuelve con productos
+    y sumas acumuladas, sin recorrer los tramos uno por uno.
+    """
+    cumulative = np.cumsum(units, axis=0)
+    starts, ends = rows[:-1], rows[1:]
+    weights_at = targets[starts] / safe_prices[starts]
+    growth = np.einsum("ij,ij->i", weights_at, prices[ends])
+    added = np.einsum("ij,ij->i", cumulative[ends] - cumulative[starts], prices[ends])
+
+    compounded = np.r_[1.0, np.cumprod(growth)]
+    values = compounded * (flows[0] + np.r_[0.0, np.cumsum(added / compounded[1:])])
+
+    segment = np.searchsorted(rows, np.arange(len(flows)), side="right") - 1
+    base = values[:, None] * targets[rows] / safe_prices[rows]
+    return base[segment] + cumulative - cumulative[rows][segment]
+
+
+def _threshold_rows(threshold, flows, targets, prices, safe_prices, units):
+    """Filas en que el peso de alguna acción se aparta del objetivo más de threshold
+
+    Cada rebalanceo depende del anterior, pero el próximo desvío se busca
+    sobre bloques de THRESHOLD_CHUNK filas a la vez.
+    """
+    cumulative = np.cumsum(units, axis=0)
+    rows = [0]
+    base = units[0]
+    position = 1
+    while position < len(flows):
+        stop = min(len(flows), position + THRESHOLD_CHUNK)
+        held = base + cumulative[position:stop] - cumulative[rows[-1]]
+        values = held * prices[position:stop]
+        totals = values.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drift = np.abs(values / totals[:, None] - targets[position:stop]).max(axis=1)
+        hits = np.flatnonzero(drift > threshold)
+        if len(hits) == 0:
+            position = stop
+            continue
+        row = position + hits[0]
+        base = totals[hits[0]] * targets[row] / safe_prices[row]
+        rows.append(row)
+        position = row + 1
+    return np.array(rows)
+
+
+def money_weighted_return(flows, years, final_value, horizon, iterations=200):
+    """Tasa interna de retorno anual, en %, de aportes flows hechos a years años del inicio
+
+    final_value es el valor de la cartera a horizon años. Se resuelve por
+    bisección sobre el logaritmo de 1 + tasa: con todos los aportes antes del
+    valor final el valor presente neto es decreciente, así que la raíz es
+    única. None si no hay tiempo transcurrido o aportes.
+    """
+    flows = np.asarray(flows, dtype=float)
+    years = np.asarray(years, dtype=float)
+    if horizon <= 0 or flows.sum() <= 0:
+        return None
+
+    def npv(rate):
+        return final_value * np.exp(-rate * horizon) - np.sum(flows * np.exp(-rate * years))
+
+    low, high = -20.0, 20.0
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        if npv(middle) > 0:
+            low = middle
+        else:
+            high = middle
+    return float(np.expm1((low + high) / 2) * 100)
+
+
+def run_backtest(prices, weights, initial=0.0, contribution=0.0, contribution_freq=None,
+                 rebalance=None, rebalance_freq="Q", threshold=DEFAULT_THRESHOLD):
+    """Curva de valor de una cartera con aportes periódicos y rebalanceo a pesos objetivo
+
+    prices es la matriz fecha × símbolo de cierres (NaN donde no cotiza) y
+    weights los pesos objetivo (Series símbolo -> peso, se normalizan). El
+    monto initial se invierte en la primera fecha y contribution al inicio de
+    cada período contribution_freq; cada aporte compra según los pesos
+    objetivo entre las acciones que ya cotizan. rebalance es None (comprar y
+    mantener), "periodic" (al inicio de cada período rebalance_freq) o
+    "threshold" (cuando el peso de una acción se aparta del objetivo más de
+    threshold). Se admiten fracciones de acción y no hay costos.
+
+    Retorna un diccionario con equity (DataFrame fecha × value, invested,
+    flow), rebalances (fechas), invested, final_value, total_twr_pct y
+    twr_pct y mwr_pct, en % y anualizados si el período supera un año. Todo
+    se calcula con operaciones sobre la matriz completa.
+    """
+    if rebalance not in REBALANCE_MODES:
+        raise ValueError(f"Modo de rebalanceo desconocido: {rebalance}")
+    weights = pd.Series(weights, dtype=float).reindex(prices.columns).fillna(0.0).clip(lower=0.0)
+    if weights.sum() <= 0:
+        raise ValueError("Se necesita al menos un peso objetivo positivo")
+    filled = prices.ffill()
+    listed = filled.loc[:, weights.to_numpy() > 0].notna().any(axis=1).to_numpy()
+    if not listed.any():
+        raise ValueError("Ninguna acción con peso objetivo tiene precios en el período")
+    filled = filled.iloc[int(np.argmax(listed)):]
+
+    index = filled.index
+    values = filled.to_numpy(dtype=float)
+    available = ~np.isnan(values)
+    market = np.where(available, values, 0.0)
+    safe = np.where(available, values, 1.0)
+    targets = target_matrix(available, weights.to_numpy() / weights.sum())
+
+    flows = contribution * period_starts(index, contribution_freq).astype(float)
+    flows[0] += initial
+    if flows[0] <= 0:
+        raise ValueError("Se necesita un monto inicial o un aporte en la primera fecha")
+    units = flows[:, None] * targets / safe
+
+    if rebalance == "periodic":
+        rows = np.flatnonzero(period_starts(index, rebalance_freq) | (np.arange(len(index)) == 0))
+    elif rebalance == "threshold":
+        rows = _threshold_rows(threshold, flows, targets, market, safe, units)
+    else:
+        rows = np.array([0])
+
+    holdings = _segments(rows, flows, targets, market, safe, units)
+    value = np.einsum("ij,ij->i", holdings, market)
+    equity = pd.DataFrame({'value': value, 'invested': np.cumsum(flows), 'flow': flows}, index=index)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        period_returns = (value[1:] - flows[1:]) / value[:-1]
+    total_twr = float(np.prod(period_returns[np.isfinite(period_returns)]) - 1) * 100
+    elapsed = (index - index[0]).total_seconds().to_numpy() / 86400 / DAYS_PER_YEAR
+    horizon = elapsed[-1]
+    twr = ((1 + total_twr / 100) ** (1 / horizon) - 1) * 100 if horizon > 1 else total_twr
+
+    contributed = flows > 0
+    mwr = money_weighted_return(flows[contributed], elapsed[contributed], value[-1], horizon)
+    if mwr is not None and horizon <= 1:
+        # Igual que el TWR, sin anualizar en períodos de hasta un año
+        mwr = ((1 + mwr / 100) ** horizon - 1) * 100
+    return {
+        'equity': equity,
+        'rebalances': index[rows[1:]],
+        'invested': float(flows.sum()),
+        'final_value': float(value[-1]),
+        'total_twr_pct': total_twr,
+        'twr_pct': twr,
+        'mwr_pct': mwr,
+    }
@@ -0,0 +1,55 @@
+"""Acciones por defecto, categorías y períodos predefinidos."""
+
+from datetime import datetime, timedelta
+
+DEFAULT_STOCKS = {
+    "NU Holdings (Nu Bank)": {"symbol": "NU", "category": "🏦 Fintech"},
+    "NVIDIA Corporation": {"symbol": "NVDA", "category": "💻 Tecnología"},
+    "Apple Inc.": {"symbol": "AAPL", "category": "💻 Tecnología"},
+    "Alphabet Inc. (Google)": {"symbol": "GOOGL", "category": "💻 Tecnología"},
+    "Meta Platforms (Facebook)": {"symbol": "META", "category": "💻 Tecnología"},
+    "Microsoft Corporation": {"symbol": "MSFT", "category": "💻 Tecnología"},
+    "Amazon.com Inc.": {"symbol": "AMZN", "category": "🛒 E-commerce"},
+    "Tesla Inc.": {"symbol": "TSLA", "category": "🚗 Automotriz"},
+    "Netflix Inc.": {"symbol": "NFLX", "category": "🎬 Entretenimiento"},
+    "PayPal Holdings": {"symbol": "PYPL", "category": "🏦 Fintech"},
+    "Coca-Cola Company": {"symbol": "KO", "category": "🥤 Consumo"},
+    "Johnson & Johnson": {"symbol": "JNJ", "category": "💊 Salud"}
+}
+
+# Categoría de cada acción por defecto, indexada por símbolo
+DEFAULT_CATEGORIES = {data["symbol"]: data["category"] for data in DEFAULT_STOCKS.values()}
+
+PREDEFINED_CATEGORIES = [
+    "💻 Tecnología", "🏦 Fintech", "🪙 Criptomonedas", "📈 ETFs",
+    "🚗 Automotriz", "💊 Salud", "🥤 Consumo", "🎬 Entretenimiento",
+    "🛒 E-commerce", "🏭 Industrial", "🏠 Inmobiliario", "⚡ Energía",
+    "📊 Índices", "💎 Materias Primas", "🌿 ESG/Sustentable"
+]
+
+OTHER_CATEGORY = "🔹 Otros"
+
+# Períodos rápidos del sidebar: días hacia atrás desde ayer, o None para YTD
+DATE_PRESETS = {
+    "Último año": 365,
+    "Últimos 6 meses": 180,
+    "Últimos 3 meses": 90,
+    "YTD": None,
+    "Últimos 5 años": 365 * 5,
+}
+
+
+def preset_range(preset, now=None):
+    """Fechas (inicio, fin) de un período predefinido"""
+    now = now or datetime.now()
+    days = DATE_PRESETS[preset]
+    start = datetime(now.year, 1, 1) if days is None else now - timedelta(days=days)
+    return start, now - timedelta(days=1)
+
+
+def stock_category(symbol, custom_stocks=None):
+    """Categoría de una acción por defecto o personalizada (custom_stocks: símbolo -> datos)"""
+    if symbol in DEFAULT_CATEGORIES:
+        return DEFAULT_CATEGORIES[symbol]
+    data = (custom_stocks or {}).get(symbol)
+    return data["category"] if data is not None else OTHER_CATEGORY
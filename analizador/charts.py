@@ -0,0 +1,292 @@
+"""Figuras Plotly de la pestaña Análisis."""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from analizador.downsample import DEFAULT_BUCKETS, minmax_indices
+from analizador.fx import DEFAULT_CURRENCY, money_prefix
+from analizador.rolling import PORTFOLIO_COLUMN
+
+LINE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+               '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#ff9999', '#66b3ff']
+
+# Puntos totales a partir de los cuales las líneas se dibujan con WebGL
+WEBGL_POINT_THRESHOLD = 20000
+
+# Una sola plantilla para todas las trazas; el símbolo sale del nombre de la traza
+NORMALIZED_HOVER = '<b>%{fullData.name}</b><br>Fecha: %{x}<br>Precio normalizado: %{y:.1f}<extra></extra>'
+ROLLING_HOVER = '<b>%{fullData.name}</b><br>Fecha: %{x}<br>Valor: %{y:.2f}<extra></extra>'
+# Plantillas de montos; {prefix} es el prefijo de la moneda base (ver money_prefix)
+BACKTEST_HOVER = '<b>%{{fullData.name}}</b><br>Fecha: %{{x}}<br>{prefix}%{{y:,.2f}}<extra></extra>'
+PROFIT_HOVER = '<b>%{{x}}</b><br>Ganancia/Pérdida: {prefix}%{{y:,.2f}}<extra></extra>'
+
+
+def category_profit_figure(summary, currency=DEFAULT_CURRENCY):
+    """Barras de ganancia/pérdida por categoría (summary es un category_summary) en currency"""
+    fig_cat = go.Figure()
+
+    categories = list(summary.index)
+    cat_profits = summary['profit_loss'].to_numpy()
+    cat_colors = np.where(cat_profits >= 0, '#00cc44', '#ff4444')
+
+    fig_cat.add_trace(go.Bar(
+        x=categories,
+        y=cat_profits,
+        marker_color=cat_colors,
+        text=[f"{money_prefix(currency)}{p:,.0f}" for p in cat_profits],
+        textposition='auto',
+        hovertemplate=PROFIT_HOVER.format(prefix=money_prefix(currency))
+    ))
+
+    fig_cat.update_layout(
+        title="💰 Ganancia/Pérdida por Categoría",
+        xaxis_title="Categoría",
+        yaxis_title=f"Ganancia/Pérdida ({currency})",
+        template="plotly_white",
+        height=500
+    )
+    return fig_cat
+
+
+def symbol_profit_figure(frame, currency=DEFAULT_CURRENCY):
+    """Barras de ganancia/pérdida por acción (frame es un results_frame) en currency"""
+    fig_bar = go.Figure()
+
+    symbols = list(frame.index)
+    profits = frame['profit_loss'].to_numpy()
+    colors = np.where(profits >= 0, '#00cc44', '#ff4444')
+
+    fig_bar.add_trace(go.Bar(
+        x=symbols,
+        y=profits,
+        marker_color=colors,
+        text=[f"{money_prefix(currency)}{p:,.0f}" for p in profits],
+        textposition='auto',
+        hovertemplate=PROFIT_HOVER.format(prefix=money_prefix(currency))
+    ))
+
+    fig_bar.update_layout(
+        title="💰 Ganancia/Pérdida por Acción Individual",
+        xaxis_title="Acción",
+        yaxis_title=f"Ganancia/Pérdida ({currency})",
+        template="plotly_white",
+        height=500
+    )
+    return fig_bar
+
+
+def _add_downsampled_lines(fig, lines, hovertemplate, n_buckets, webgl_threshold):
+    """Agrega líneas (nombre, fechas, valores sin NaN, estilo) reducidas con minmax_indices"""
+    reduced = []
+    for name, dates, values, line in lines:
+        keep = minmax_indices(values, n_buckets)
+        reduced.append((name, dates[keep], values[keep], line))
+
+    total_points = sum(len(dates) for _, dates, _, _ in reduced)
+    trace = go.Scattergl if total_points > webgl_threshold else go.Scatter
+    for name, dates, values, line in reduced:
+        fig.add_trace(trace(x=dates, y=values, mode='lines', name=name, line=line,
+                            hovertemplate=hovertemplate))
+
+
+def normalized_prices_figure(results, n_buckets=DEFAULT_BUCKETS, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Líneas de precios normalizados (base 100) por acción
+
+    Cada serie se reduce con minmax_indices a n_buckets tramos (None envía
+    todos los puntos). Si el total de puntos supera webgl_threshold se usan
+    trazas WebGL, que el navegador dibuja sin crear un elemento SVG por punto.
+    Los valores se redondean a 2 decimales, más de lo que muestra el tooltip.
+    """
+    lines = []
+    for i, (symbol, metrics) in enumerate(results.items()):
+        close = metrics['close']
+        values = close.to_numpy()
+        lines.append((
+            f"{symbol} ({metrics['category']})", close.index, np.round(values / values[0] * 100, 2),
+            dict(width=3, color=LINE_COLORS[i % len(LINE_COLORS)])
+        ))
+
+    fig_lines = go.Figure()
+    _add_downsampled_lines(fig_lines, lines, NORMALIZED_HOVER, n_buckets, webgl_threshold)
+
+    fig_lines.update_layout(
+        title="📈 Evolución de Precios Normalizados por Categoría",
+        xaxis_title="Fecha",
+        yaxis_title="Precio Normalizado (Base 100)",
+        template="plotly_white",
+        hovermode='x unified',
+        height=600,
+        legend=dict(
+            orientation="v",
+            yanchor="top",
+            y=1,
+            xanchor="left",
+            x=1.02
+        )
+    )
+    return fig_lines
+
+
+def rolling_figure(frame, title, yaxis_title, n_buckets=DEFAULT_BUCKETS,
+                   webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Líneas de una métrica móvil por columna, con el portfolio destacado"""
+    lines = []
+    for i, column in enumerate(frame.columns):
+        series = frame[column].dropna()
+        if column == PORTFOLIO_COLUMN:
+            line = dict(width=4, color='#2c3e50')
+        else:
+            line = dict(width=2, color=LINE_COLORS[i % len(LINE_COLORS)])
+        lines.append((column, series.index, np.round(series.to_numpy(), 2), line))
+
+    fig = go.Figure()
+    _add_downsampled_lines(fig, lines, ROLLING_HOVER, n_buckets, webgl_threshold)
+    fig.update_layout(
+        title=title,
+        xaxis_title="Fecha",
+        yaxis_title=yaxis_title,
+        template="plotly_white",
+        hovermode='x unified',
+        height=500
+    )
+    return fig
+
+
+def backtest_figure(equity, rebalances, currency=DEFAULT_CURRENCY, n_buckets=DEFAULT_BUCKETS,
+                    webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Valor de la cartera del backtest y capital aportado en currency, con las fechas de rebalanceo"""
+    hover = BACKTEST_HOVER.format(prefix=money_prefix(currency))
+    lines = [
+        ("Valor de la cartera", equity.index, np.round(equity['value'].to_numpy(), 2),
+         dict(width=3, color='#667eea')),
+        ("Capital aportado", equity.index, np.round(equity['invested'].to_numpy(), 2),
+         dict(width=2, color='#7f7f7f', dash='dash')),
+    ]
+    fig = go.Figure()
+    _add_downsampled_lines(fig, lines, hover, n_buckets, webgl_threshold)
+    if len(rebalances) > 0:
+        fig.add_trace(go.Scatter(
+            x=rebalances, y=equity['value'].reindex(rebalances), mode='markers', name="Rebalanceo",
+            marker=dict(size=6, color='#764ba2'), hovertemplate=hover
+        ))
+    fig.update_layout(
+        title="🔁 Backtest de la Estrategia",
+        xaxis_title="Fecha",
+        yaxis_title=f"Valor ({currency})",
+        template="plotly_white",
+        hovermode='x unified',
+        height=500
+    )
+    return fig
+
+
+def fan_chart_figure(fan, last_date, currency=DEFAULT_CURRENCY):
+    """Abanico de percentiles del valor proyectado del portfolio en currency
+
+    fan es un DataFrame día hábil desde last_date × percentil (5, 25, 50, 75, 95).
+    """
+    dates = pd.DatetimeIndex(np.busday_offset(
+        np.datetime64(pd.Timestamp(last_date).date(), "D"), fan.index.to_numpy(), roll="forward"
+    ))
+    fig = go.Figure()
+    for low, high, color in ((5, 95, 'rgba(102, 126, 234, 0.2)'), (25, 75, 'rgba(102, 126, 234, 0.4)')):
+        fig.add_trace(go.Scatter(x=dates, y=fan[high], mode='lines', line=dict(width=0),
+                                 showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(
+            x=dates, y=fan[low], mode='lines', line=dict(width=0), fill='tonexty', fillcolor=color,
+            name=f"P{low}–P{high}", hoverinfo='skip'
+        ))
+    fig.add_trace(go.Scatter(
+        x=dates, y=fan[50], mode='lines', name="Mediana", line=dict(width=3, color='#764ba2'),
+        hovertemplate=f"Fecha: %{{x}}<br>Valor mediano: {money_prefix(currency)}%{{y:,.2f}}<extra></extra>"
+    ))
+    fig.update_layout(
+        title="🎲 Valor Proyectado del Portfolio",
+        xaxis_title="Fecha",
+        yaxis_title=f"Valor ({currency})",
+        template="plotly_white",
+        height=500
+    )
+    return fig
+
+
+def efficient_frontier_figure(frontier, assets, selected, selected_label):
+    """Frontera eficiente, acciones individuales y la asignación elegida
+
+    frontier y assets tienen columnas return y volatility (% anual); selected
+    es el par (volatilidad, retorno) de la asignación.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=frontier['volatility'], y=frontier['return'], mode='lines', name="Frontera eficiente",
+        line=dict(width=3, color='#667eea'),
+        hovertemplate='Volatilidad: %{x:.2f}%<br>Retorno: %{y:.2f}%<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=assets['volatility'], y=assets['return'], mode='markers', name="Acciones",
+        text=assets.index, marker=dict(size=8, color='#7f7f7f'),
+        hovertemplate='<b>%{text}</b><br>Volatilidad: %{x:.2f}%<br>Retorno: %{y:.2f}%<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=[selected[0]], y=[selected[1]], mode='markers', name=selected_label,
+        marker=dict(size=16, color='#764ba2', symbol='star'),
+        hovertemplate='Volatilidad: %{x:.2f}%<br>Retorno: %{y:.2f}%<extra></extra>'
+    ))
+    fig.update_layout(
+        title="🧮 Frontera Eficiente",
+        xaxis_title="Volatilidad anual (%)",
+        yaxis_title="Retorno esperado anual (%)",
+        template="plotly_white",
+        height=500
+    )
+    return fig
+
+
+# Celdas a partir de las cuales el mapa de calor no escribe los valores
+HEATMAP_TEXT_LIMIT = 400
+
+
+def heatmap_figure(matrix, title, correlation=True):
+    """Mapa de calor de una matriz cuadrada (correlación o covarianza)
+
+    La correlación usa una escala divergente fija entre -1 y 1; la covarianza
+    una escala secuencial. Los valores se escriben en cada celda solo si la
+    matriz tiene a lo sumo HEATMAP_TEXT_LIMIT celdas.
+    """
+    values = np.round(matrix.to_numpy(dtype=float), 3)
+    labels = [str(label) for label in matrix.index]
+    scale = dict(colorscale='RdBu', reversescale=True, zmin=-1, zmax=1, zmid=0) if correlation \
+        else dict(colorscale='Viridis')
+    fig = go.Figure(go.Heatmap(
+        z=values, x=labels, y=labels,
+        texttemplate='%{z:.2f}' if values.size <= HEATMAP_TEXT_LIMIT else None,
+        hovertemplate='<b>%{y} / %{x}</b><br>Valor: %{z:.3f}<extra></extra>',
+        **scale
+    ))
+    fig.update_layout(
+        title=title,
+        template="plotly_white",
+        height=max(400, min(900, 30 * len(labels) + 150)),
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
+
+
+def category_pie_figure(summary, value_key, title):
+    """Dona de distribución por categoría de la columna value_key de un category_summary"""
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=list(summary.index),
+        values=summary[value_key].to_numpy(),
+        hole=.4,
+        textinfo='label+percent',
+        textposition='auto'
+    )])
+
+    fig_pie.update_layout(
+        title=title,
+        template="plotly_white",
+        height=400,
+        showlegend=False
+    )
+    return fig_pie
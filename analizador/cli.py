@@ -0,0 +1,125 @@
+"""Análisis programado de portfolios desde la línea de comandos.
+
+    python -m analizador portfolio.json otro.json --preset 1y --output-dir resultados
+    python -m analizador carpeta/*.json --start 2020-01-01 --end 2024-12-31 --format parquet
+    python -m analizador portfolio.json --preset 3m --interval 1h
+    python -m analizador portfolio.json --preset 1y --currency EUR
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from analizador.catalog import preset_range
+from analizador.engine import analyze_portfolios, category_frame, holdings_frame, portfolios_from_config
+from analizador.fx import BASE_CURRENCIES, DEFAULT_CURRENCY
+from analizador.intervals import DEFAULT_INTERVAL, INTERVALS
+from analizador.gateway import FetchGateway
+from analizador.providers import create_provider
+
+PRESET_ALIASES = {
+    "1y": "Último año",
+    "6m": "Últimos 6 meses",
+    "3m": "Últimos 3 meses",
+    "ytd": "YTD",
+    "5y": "Últimos 5 años",
+}
+
+FORMATS = ("csv", "parquet", "json")
+
+
+def write_table(frame, path, fmt):
+    """Guarda una tabla en CSV, Parquet o JSON (lista de registros)"""
+    if fmt == "csv":
+        frame.to_csv(path, index=False)
+    elif fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_json(path, orient="records", force_ascii=False, indent=2)
+
+
+def summary_row(name, results):
+    """Totales de un portfolio para la tabla resumen"""
+    investment = sum(m['investment'] for m in results.values())
+    final_value = sum(m['final_value'] for m in results.values())
+    profit_loss = final_value - investment
+    return {
+        'portfolio': name,
+        'holdings': len(results),
+        'investment': investment,
+        'final_value': final_value,
+        'profit_loss': profit_loss,
+        'roi_pct': (profit_loss / investment) * 100 if investment > 0 else 0
+    }
+
+
+def safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m analizador",
+        description="Analiza portfolios exportados desde la app y guarda los resultados."
+    )
+    parser.add_argument("portfolios", nargs="+", type=Path,
+                        help="Archivos JSON de Exportar Configuración (con 'amounts' y/o presets)")
+    period = parser.add_mutually_exclusive_group(required=True)
+    period.add_argument("--preset", choices=sorted(PRESET_ALIASES), help="Período predefinido")
+    period.add_argument("--start", type=pd.Timestamp, help="Fecha de inicio (AAAA-MM-DD)")
+    parser.add_argument("--end", type=pd.Timestamp, help="Fecha final, exclusiva (por defecto hoy)")
+    parser.add_argument("--interval", choices=list(INTERVALS), default=DEFAULT_INTERVAL,
+                        help="Intervalo de las barras (los intradiarios cubren solo los últimos días)")
+    parser.add_argument("--total-return", action="store_true",
+                        help="Reinvierte los dividendos (retorno total) en lugar de usar solo el precio")
+    parser.add_argument("--currency", choices=BASE_CURRENCIES, default=DEFAULT_CURRENCY,
+                        help="Moneda base en la que se expresan todos los montos")
+    parser.add_argument("--output-dir", type=Path, default=Path("resultados"))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--provider", help="yfinance o local (por defecto ANALIZADOR_PROVIDER)")
+    args = parser.parse_args(argv)
+
+    if args.preset:
+        start, end = preset_range(PRESET_ALIASES[args.preset])
+    else:
+        start, end = args.start, args.end or pd.Timestamp(datetime.now().date())
+    if start >= end:
+        parser.error("la fecha de inicio debe ser anterior a la fecha final")
+
+    portfolios = []
+    for path in args.portfolios:
+        with open(path, encoding="utf-8") as f:
+            portfolios.extend(portfolios_from_config(path.stem, json.load(f)))
+    if not portfolios:
+        parser.error("ningún archivo contiene montos de inversión mayores a 0")
+
+    analyses, errors = analyze_portfolios(portfolios, start, end, provider=FetchGateway(create_provider(args.provider)),
+                                          interval=args.interval, basis="total" if args.total_return else "price",
+                                          currency=args.currency)
+    for symbol, reason in errors.items():
+        print(f"⚠️ {symbol}: {reason}", file=sys.stderr)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    summary = []
+    for name, results in analyses.items():
+        summary.append(summary_row(name, results))
+        if not results:
+            print(f"⚠️ {name}: sin datos para ninguna acción", file=sys.stderr)
+            continue
+        write_table(holdings_frame(results).reset_index(),
+                    args.output_dir / f"{safe_name(name)}_holdings.{args.format}", args.format)
+        write_table(category_frame(results),
+                    args.output_dir / f"{safe_name(name)}_categories.{args.format}", args.format)
+
+    write_table(pd.DataFrame(summary), args.output_dir / f"summary.{args.format}", args.format)
+    print(f"✅ {len(analyses)} portfolios analizados "
+          f"({pd.Timestamp(start):%d/%m/%Y} a {pd.Timestamp(end):%d/%m/%Y}) -> {args.output_dir}")
+    return 0 if any(analyses.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
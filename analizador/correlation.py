@@ -0,0 +1,226 @@
+"""Correlación y covarianza de los retornos diarios entre acciones."""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from analizador.metrics import TRADING_DAYS, returns_matrix
+from analizador.telemetry import count_cache, span
+
+# Retornos en común necesarios para estimar la correlación de un par
+MIN_OVERLAP = 20
+
+# Conjuntos (símbolos, período) que guarda CorrelationCache por defecto
+MAX_CACHED_CORRELATIONS = 32
+
+
+def _pair_sums(xa, va, xb, vb):
+    """Sumas de las columnas de a sobre los días en que cotizan las de b
+
+    xa y xb son retornos con NaN en 0 y va, vb sus máscaras de días válidos.
+    Retorna (días en común, suma de a, suma de a², suma de a × b), cada una
+    de columnas(a) × columnas(b).
+    """
+    return va.T @ vb, xa.T @ vb, (xa * xa).T @ vb, xa.T @ xb
+
+
+class ReturnStats:
+    """Sumas por pares de retornos diarios, actualizables de a un símbolo
+
+    Con ellas la correlación y la covarianza de cada par se obtienen sobre las
+    fechas en que cotizan ambos, igual que DataFrame.corr() y .cov(), pero
+    todo el cálculo son cuatro productos de matrices sobre la matriz alineada
+    de retornos. Agregar k símbolos a N cuesta O(k·N·días) y quitarlos solo
+    descarta filas y columnas, en lugar de recalcular las N × N sumas.
+    """
+
+    def __init__(self, closes):
+        self.returns = self._centered_returns(closes)
+        x, v = self._filled(self.returns)
+        self.count, self.sums, self.squares, self.cross = _pair_sums(x, v, x, v)
+
+    @property
+    def symbols(self):
+        return list(self.returns.columns)
+
+    @staticmethod
+    def _centered_returns(closes):
+        # Centrar cada símbolo por su media evita cancelaciones en las varianzas;
+        # la media no depende de los demás símbolos, así que las sumas siguen valiendo
+        returns = returns_matrix(closes.to_numpy(dtype=float))
+        valid = ~np.isnan(returns)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(valid, returns, 0.0).sum(axis=0) / valid.sum(axis=0)
+        return pd.DataFrame(returns - mean, index=closes.index, columns=closes.columns)
+
+    @staticmethod
+    def _filled(returns):
+        values = returns.to_numpy()
+        valid = ~np.isnan(values)
+        return np.where(valid, values, 0.0), valid.astype(float)
+
+    def copy(self):
+        other = object.__new__(ReturnStats)
+        other.returns = self.returns
+        other.count, other.sums = self.count.copy(), self.sums.copy()
+        other.squares, other.cross = self.squares.copy(), self.cross.copy()
+        return other
+
+    def remove(self, symbols):
+        """Quita los símbolos indicados"""
+        keep = ~self.returns.columns.isin(list(symbols))
+        self.returns = self.returns.loc[:, keep]
+        for name in ("count", "sums", "squares", "cross"):
+            setattr(self, name, getattr(self, name)[np.ix_(keep, keep)])
+
+    def add(self, closes):
+        """Agrega las columnas de closes (cierres fecha × símbolo de acciones nuevas)"""
+        index = self.returns.index.union(closes.index)
+        old = self.returns.reindex(index)
+        new = self._centered_returns(closes).reindex(index)
+        x, v = self._filled(old)
+        y, w = self._filled(new)
+
+        old_new = _pair_sums(x, v, y, w)
+        new_old = _pair_sums(y, w, x, v)
+        new_new = _pair_sums(y, w, y, w)
+        for name, top_right, bottom_left, bottom_right in zip(
+                ("count", "sums", "squares", "cross"), old_new, new_old, new_new):
+            setattr(self, name, np.block([[getattr(self, name), top_right], [bottom_left, bottom_right]]))
+        self.returns = pd.concat([old, new], axis=1)
+
+    def matrices(self, min_overlap=MIN_OVERLAP, periods_per_year=TRADING_DAYS):
+        """(correlación, covarianza anualizada) como DataFrames símbolo × símbolo
+
+        La covarianza se anualiza con periods_per_year retornos por año. Los
+        pares con menos de min_overlap retornos en común quedan en NaN.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = self.count
+            covariance = (self.cross - self.sums * self.sums.T / n) / (n - 1)
+            variance = (self.squares - self.sums ** 2 / n) / (n - 1)
+            correlation = np.clip(covariance / np.sqrt(variance * variance.T), -1.0, 1.0)
+        enough = n >= min_overlap
+        correlation = np.where(enough, correlation, np.nan)
+        np.fill_diagonal(correlation, np.where(np.diag(enough), 1.0, np.nan))
+        covariance = np.where(enough, covariance * periods_per_year, np.nan)
+
+        labels = pd.Index(self.symbols, name="symbol")
+        return (pd.DataFrame(correlation, index=labels, columns=labels),
+                pd.DataFrame(covariance, index=labels, columns=labels))
+
+
+class CorrelationCache:
+    """Matrices de correlación y covarianza por (conjunto de símbolos, período)
+
+    Si un conjunto no está guardado pero hay otro del mismo período que
+    difiere en menos símbolos de los que tiene, se parte de sus sumas
+    (ver ReturnStats) agregando y quitando solo la diferencia. Guarda a lo
+    sumo max_entries conjuntos, descartando los menos usados.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_CORRELATIONS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _closest(self, symbols, period):
+        best, best_distance = None, len(symbols)
+        for (cached, cached_period), entry in self._entries.items():
+            distance = len(cached ^ symbols)
+            if cached_period == period and distance < best_distance:
+                best, best_distance = entry, distance
+        return best
+
+    def matrices(self, closes, period, periods_per_year=TRADING_DAYS):
+        """(correlación, covarianza anualizada) de las columnas de closes
+
+        closes es la matriz fecha × símbolo de cierres del período (por
+        ejemplo close_matrix(results)); period identifica el rango de fechas y
+        el intervalo de las barras, que tiene periods_per_year barras por año.
+        """
+        symbols = frozenset(closes.columns)
+        key = (symbols, period)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                count_cache("correlation", hits=1)
+                return self._entries[key][1]
+            base = self._closest(symbols, period)
+        count_cache("correlation", misses=1)
+
+        with span("correlation", "full" if base is None else "incremental", symbols=len(symbols)):
+            if base is None:
+                stats = ReturnStats(closes)
+            else:
+                stats = base[0].copy()
+                cached = set(stats.symbols)
+                stats.remove(cached - symbols)
+                added = [symbol for symbol in closes.columns if symbol not in cached]
+                if added:
+                    stats.add(closes[added])
+            matrices = stats.matrices(periods_per_year=periods_per_year)
+
+        with self._lock:
+            self._entries[key] = (stats, matrices)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return matrices
+
+
+def cluster_order(correlation):
+    """Orden de las acciones según clustering jerárquico de enlace promedio
+
+    La distancia entre dos acciones es sqrt((1 - ρ) / 2); un par sin
+    correlación estimada cuenta como ρ = 0. Las fusiones actualizan la matriz
+    de distancias con la fórmula de Lance-Williams, sin recalcularla.
+    Retorna los símbolos con las acciones más correlacionadas contiguas.
+    """
+    symbols = list(correlation.index)
+    n = len(symbols)
+    if n < 3:
+        return symbols
+
+    rho = np.nan_to_num(correlation.to_numpy(dtype=float))
+    distance = np.sqrt(np.clip((1 - rho) / 2, 0.0, None))
+    np.fill_diagonal(distance, np.inf)
+    sizes = np.ones(n)
+    members = [[i] for i in range(n)]
+
+    for _ in range(n - 1):
+        a, b = divmod(int(np.argmin(distance)), n)
+        merged = (sizes[a] * distance[a] + sizes[b] * distance[b]) / (sizes[a] + sizes[b])
+        distance[a], distance[:, a] = merged, merged
+        distance[a, a] = np.inf
+        distance[b], distance[:, b] = np.inf, np.inf
+        sizes[a] += sizes[b]
+        members[a], members[b] = members[a] + members[b], []
+    return [symbols[i] for i in members[a]]
+
+
+def category_blocks(correlation, categories):
+    """Correlación promedio entre las acciones de cada par de categorías
+
+    categories mapea símbolo -> categoría. La diagonal es el promedio entre
+    acciones distintas de la misma categoría (NaN si tiene una sola); se
+    ignoran los pares sin correlación estimada.
+    """
+    labels = [categories[symbol] for symbol in correlation.index]
+    names = list(dict.fromkeys(labels))
+    membership = (np.array(labels)[:, None] == np.array(names)[None, :]).astype(float)
+
+    rho = correlation.to_numpy(dtype=float)
+    valid = ~np.isnan(rho)
+    np.fill_diagonal(valid, False)
+    total = membership.T @ np.where(valid, rho, 0.0) @ membership
+    count = membership.T @ valid.astype(float) @ membership
+    with np.errstate(divide="ignore", invalid="ignore"):
+        blocks = np.where(count > 0, total / count, np.nan)
+
+    index = pd.Index(names, name="category")
+    return pd.DataFrame(blocks, index=index, columns=index)
@@ -0,0 +1,37 @@
+"""Reducción de puntos de series para gráficos, conservando los extremos."""
+
+import numpy as np
+
+# Ancho típico del área de trazado en píxeles (sin la leyenda)
+CHART_WIDTH_PX = 1000
+
+# Tramos por defecto: cada uno abarca unos 4 píxeles y aporta su mínimo y máximo
+DEFAULT_BUCKETS = CHART_WIDTH_PX // 4
+
+
+def minmax_indices(values, n_buckets=DEFAULT_BUCKETS):
+    """Índices que conservan el mínimo y el máximo de cada tramo de la serie
+
+    Divide la serie en n_buckets tramos consecutivos de igual tamaño y retorna,
+    ordenados, el primer y último punto más el mínimo y máximo de cada tramo
+    (a lo sumo 2 * n_buckets + 2 índices). Los picos y caídas se ven igual que
+    con la serie completa. values no debe contener NaN.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if n_buckets is None or n <= 2 * n_buckets + 2:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.intp)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    def first_match(bucket_values):
+        # Primer índice de cada tramo cuyo valor coincide con el de su tramo
+        matches = np.flatnonzero(values == bucket_values[bucket])
+        _, first = np.unique(bucket[matches], return_index=True)
+        return matches[first]
+
+    mins = first_match(np.minimum.reduceat(values, starts))
+    maxs = first_match(np.maximum.reduceat(values, starts))
+    return np.unique(np.concatenate(([0, n - 1], mins, maxs)))
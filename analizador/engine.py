@@ -0,0 +1,263 @@
+"""Motor de análisis sin Streamlit: descarga, métricas y agregación por categoría."""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from analizador.catalog import DEFAULT_STOCKS, stock_category
+from analizador.fx import DEFAULT_CURRENCY, CurrencyConverter
+from analizador.intervals import DEFAULT_INTERVAL, is_intraday, periods_per_year, weekly_bars
+from analizador.metadata import MetadataStore
+from analizador.metrics import (
+    UNIT_COLUMNS, build_price_matrix, compute_unit_metrics, pays_dividends, scale_unit_metrics,
+    total_return_closes
+)
+from analizador.providers import create_provider
+from analizador.report import category_summary, results_frame
+from analizador.store import PriceStore, SharedCloses, default_data_dir, to_day
+from analizador.telemetry import count_cache, span
+
+# Entradas (símbolo, rango) que guarda MetricsCache por defecto
+MAX_CACHED_METRICS = 50000
+
+
+def open_store(provider):
+    """Almacén local de precios correspondiente a un proveedor"""
+    return PriceStore(default_data_dir() / provider.store_name)
+
+
+def open_metadata_store(provider):
+    """Almacén local de información de empresas correspondiente a un proveedor"""
+    return MetadataStore(default_data_dir() / provider.metadata_name)
+
+
+def load_history(symbols, start, end, interval, provider, store, bar_cache=None):
+    """Precios de los símbolos en barras del intervalo, como PriceStore.get_history
+
+    Las barras diarias y semanales se arman desde el almacén local de precios
+    diarios; las intradiarias se piden al proveedor en tramos (ver
+    MarketDataProvider.bars_batch), pasando por bar_cache (BarCache) si se da.
+    """
+    if is_intraday(interval):
+        if bar_cache is None:
+            return provider.bars_batch(symbols, start, end, interval)
+        return bar_cache.get_history(symbols, start, end, interval, provider.bars_batch)
+    datasets, errors = store.get_history(symbols, start, end, provider.history_batch)
+    if interval == "1wk":
+        datasets = {symbol: weekly_bars(data) for symbol, data in datasets.items()}
+    return datasets, errors
+
+
+def _results_dict(metrics_table, closes, categories):
+    results = {}
+    for symbol, metrics in metrics_table.to_dict("index").items():
+        metrics['close'] = closes[symbol]
+        metrics['category'] = categories[symbol]
+        results[symbol] = metrics
+    return results
+
+
+class MetricsCache:
+    """Métricas unitarias y cierres por (símbolo, rango de fechas, intervalo, moneda)
+
+    Las métricas que no dependen del monto se calculan una vez por símbolo,
+    rango e intervalo de las barras; los resultados para cualquier combinación
+    de montos se obtienen escalándolas (ver scale_unit_metrics), sin leer
+    precios ni recorrer series. Cada entrada guarda las métricas y cierres de
+    las dos bases de RETURN_BASES: por precio y con los dividendos
+    reinvertidos; para las acciones sin dividendos en el rango ambas son la
+    misma. Los precios que se agregan deben estar ya expresados en la moneda
+    indicada (ver CurrencyConverter). Guarda a lo sumo max_entries entradas,
+    descartando las menos usadas; al descartar una entrada suelta sus cierres
+    en shared (SharedCloses), que se liberan cuando ninguna otra los usa.
+    """
+
+    def __init__(self, shared=None, max_entries=MAX_CACHED_METRICS):
+        self.shared = shared if shared is not None else SharedCloses()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _range(start, end, interval, currency):
+        # Un fin posterior a hoy depende del día en que se consulta
+        return to_day(start), min(to_day(end), date.today()), interval, currency
+
+    @staticmethod
+    def _shared_keys(symbol, period):
+        """Claves en SharedCloses de los cierres por precio y reinvertidos de un símbolo
+
+        Los cierres diarios en la moneda por defecto se comparten por símbolo y
+        los de otros intervalos o monedas por separado; los reinvertidos
+        dependen además del primer día del rango. Los intradiarios no se
+        comparten (None): la memoria de esas barras la acota BarCache y sus
+        cierres se liberan con la entrada.
+        """
+        first, _, interval, currency = period
+        if is_intraday(interval):
+            return None, None
+        default = (interval, currency) == (DEFAULT_INTERVAL, DEFAULT_CURRENCY)
+        return symbol if default else (symbol, interval, currency), ("total", symbol, interval, currency, first)
+
+    def _close(self, key, data):
+        """Cierres de data, compartidos en shared bajo key (con None, una copia propia)"""
+        if key is None:
+            return data['Close'].dropna().copy()
+        return self.shared.share(key, data)
+
+    def missing(self, symbols, start, end, interval=DEFAULT_INTERVAL, currency=DEFAULT_CURRENCY):
+        """Símbolos sin métricas guardadas para el rango"""
+        period = self._range(start, end, interval, currency)
+        missing = [symbol for symbol in symbols if (symbol, *period) not in self._entries]
+        count_cache("metrics", hits=len(symbols) - len(missing), misses=len(missing))
+        return missing
+
+    def add(self, price_data, start, end, interval=DEFAULT_INTERVAL, currency=DEFAULT_CURRENCY):
+        """Calcula y guarda las métricas unitarias de los símbolos aún no guardados"""
+        period = self._range(start, end, interval, currency)
+        new = {symbol: data for symbol, data in price_data.items()
+               if (symbol, *period) not in self._entries}
+        reinvested = {symbol: total_return_closes(data).to_frame()
+                      for symbol, data in new.items() if pays_dividends(data)}
+        with span("metrics_compute", symbols=len(new), interval=interval):
+            unit = compute_unit_metrics(build_price_matrix(new), periods_per_year(interval))
+            total_unit = compute_unit_metrics(build_price_matrix(reinvested), periods_per_year(interval))
+        keys = {symbol: self._shared_keys(symbol, period) for symbol in unit.index}
+        closes = {symbol: self._close(keys[symbol][0], new[symbol]) for symbol in unit.index}
+        total_closes = {symbol: self._close(keys[symbol][1], reinvested[symbol]) for symbol in total_unit.index}
+        total_rows = dict(zip(total_unit.index, total_unit.to_numpy()))
+
+        released = []
+        with self._lock:
+            for symbol, row in zip(unit.index, unit.to_numpy()):
+                used = [key for key in (keys[symbol] if symbol in total_rows else keys[symbol][:1])
+                        if key is not None]
+                if (symbol, *period) in self._entries:
+                    # Otro hilo guardó el símbolo mientras se calculaba
+                    released.extend(used)
+                    continue
+                price = (row, closes[symbol])
+                total = (total_rows[symbol], total_closes[symbol]) if symbol in total_rows else price
+                self._entries[(symbol, *period)] = {"price": price, "total": total, "shared": used}
+            while len(self._entries) > self.max_entries:
+                released.extend(self._entries.popitem(last=False)[1]["shared"])
+        for key in released:
+            self.shared.release(key)
+
+    def results(self, amounts, categories, start, end, interval=DEFAULT_INTERVAL, basis="price",
+                currency=DEFAULT_CURRENCY):
+        """Resultados por acción para amounts escalando las métricas guardadas de la base dada"""
+        period = self._range(start, end, interval, currency)
+        with self._lock:
+            entries = {}
+            for symbol in amounts:
+                key = (symbol, *period)
+                if key in self._entries and amounts[symbol] > 0:
+                    self._entries.move_to_end(key)
+                    entries[symbol] = self._entries[key][basis]
+        if not entries:
+            return {}
+
+        with span("metrics_scale", symbols=len(entries)):
+            unit = pd.DataFrame(np.vstack([row for row, _ in entries.values()]),
+                                index=pd.Index(list(entries), name="symbol"), columns=UNIT_COLUMNS)
+            metrics_table = scale_unit_metrics(unit, pd.Series(amounts, dtype=float))
+        closes = {symbol: close for symbol, (_, close) in entries.items()}
+        return _results_dict(metrics_table, closes, categories)
+
+
+def close_matrix(results):
+    """Matriz fecha × símbolo con los cierres guardados en los resultados"""
+    if not results:
+        return pd.DataFrame(dtype=float)
+    matrix = pd.concat({symbol: metrics['close'] for symbol, metrics in results.items()}, axis=1)
+    return matrix.sort_index()
+
+
+def holdings_frame(results):
+    """Resultados por acción como tabla, sin las series de precios (ver results_frame)"""
+    return results_frame(results)
+
+
+def category_frame(results):
+    """Rendimiento por categoría como tabla"""
+    summary = category_summary(results_frame(results))
+    summary["stocks"] = summary["stocks"].str.join(", ")
+    return summary.reset_index()
+
+
+class Portfolio:
+    """Montos por acción y categorías de un portfolio guardado"""
+
+    def __init__(self, name, amounts, custom_stocks=None):
+        self.name = name
+        self.amounts = {symbol: float(amount) for symbol, amount in amounts.items() if amount > 0}
+        self.custom_stocks = custom_stocks or {}
+
+    @property
+    def categories(self):
+        return {symbol: stock_category(symbol, self.custom_stocks) for symbol in self.amounts}
+
+
+def portfolios_from_config(name, config):
+    """Portfolios de un archivo de "📤 Exportar Configuración"
+
+    Los montos de "amounts" forman el portfolio principal y cada preset de
+    "investment_presets" uno adicional llamado "<name>:<preset>".
+    """
+    custom_stocks = config.get('custom_stocks', {})
+    removed = set(config.get('removed_default_stocks', []))
+    default_symbols = {data["symbol"] for data in DEFAULT_STOCKS.values()}
+
+    def active(amounts):
+        return {symbol: amount for symbol, amount in amounts.items()
+                if not (symbol in removed and symbol in default_symbols)}
+
+    portfolios = []
+    if config.get('amounts'):
+        portfolios.append(Portfolio(name, active(config['amounts']), custom_stocks))
+    for preset_name, amounts in config.get('investment_presets', {}).items():
+        portfolios.append(Portfolio(f"{name}:{preset_name}", active(amounts), custom_stocks))
+    return [portfolio for portfolio in portfolios if portfolio.amounts]
+
+
+def analyze_portfolios(portfolios, start, end, provider=None, store=None, interval=DEFAULT_INTERVAL,
+                       basis="price", currency=DEFAULT_CURRENCY, metadata=None):
+    """Analiza varios portfolios con una sola descarga compartida de precios
+
+    Los precios se expresan en currency con los tipos de cambio del almacén;
+    la moneda de cada acción sale de metadata (MetadataStore), donde se
+    guarda la información de los símbolos que aún no la tengan; los de
+    moneda desconocida quedan en errores. Retorna
+    (resultados, errores): resultados mapea nombre de portfolio -> resultados
+    por acción (ver MetricsCache.results) en la base de retorno basis y errores
+    símbolo -> motivo.
+    """
+    provider = provider or create_provider()
+    store = store or open_store(provider)
+    metadata = metadata or open_metadata_store(provider)
+
+    symbols = list(dict.fromkeys(symbol for p in portfolios for symbol in p.amounts))
+    price_data, errors = load_history(symbols, start, end, interval, provider, store)
+    metadata.refresh([symbol for symbol in price_data if not (metadata.get(symbol) or {}).get('currency')],
+                     provider.info)
+    price_data, fx_errors = CurrencyConverter(store, provider.history_batch, metadata).convert(
+        price_data, currency, start, end
+    )
+    errors.update(fx_errors)
+
+    # Cada símbolo se recorre una vez aunque aparezca en varios portfolios
+    cache = MetricsCache()
+    cache.add(price_data, start, end, interval, currency)
+
+    analyses = {}
+    for portfolio in portfolios:
+        analyses[portfolio.name] = cache.results(portfolio.amounts, portfolio.categories, start, end, interval,
+                                                 basis, currency)
+    return analyses, errors
@@ -0,0 +1,85 @@
+"""Ejecución concurrente y acotada de descargas de datos de mercado."""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 30.0
+
+# Intervalo con que se revisan los tiempos límite de las tareas en curso
+_POLL_INTERVAL = 0.1
+
+
+def run_concurrently(tasks, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT,
+                     on_done=None, initializer=None):
+    """Ejecuta tareas en un pool de hilos acotado con tiempo límite por tarea
+
+    tasks es un diccionario clave -> función sin argumentos. Cada tarea vence
+    timeout × (tandas que espera en la cola + 1) después de enviarse, con
+    tandas de max_workers tareas: es lo que tardaría si todas las anteriores
+    agotaran su tiempo. Así una tarea que cuelga un hilo no deja esperando a
+    las de la cola, que vencen aunque no hayan empezado, y la llamada termina
+    a más tardar timeout × ⌈tareas / max_workers⌉ después de empezar. Una
+    tarea vencida se reporta como error y su resultado tardío se descarta.
+    on_done(clave, completadas, total) se llama en el hilo que invoca esta función
+    a medida que termina cada tarea, con o sin éxito.
+
+    Retorna una tupla (resultados, errores) indexada por clave.
+    """
+    results = {}
+    errors = {}
+    total = len(tasks)
+    if total == 0:
+        return results, errors
+
+    started = {}
+
+    def run(key, fn):
+        started[key] = time.monotonic()
+        return fn()
+
+    workers = max(1, min(max_workers, total))
+    executor = ThreadPoolExecutor(max_workers=workers, initializer=initializer)
+    submitted = time.monotonic()
+    futures = {executor.submit(run, key, fn): key for key, fn in tasks.items()}
+    deadlines = {}
+    if timeout is not None:
+        deadlines = {future: submitted + timeout * (i // workers + 1) for i, future in enumerate(futures)}
+    pending = set(futures)
+    completed = 0
+
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            finished = []
+            for future in done:
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    errors[key] = str(e) or type(e).__name__
+                finished.append(key)
+
+            if timeout is not None:
+                now = time.monotonic()
+                expired = {future for future in pending if now > deadlines[future]}
+                for future in expired:
+                    key = futures[future]
+                    if key in started:
+                        errors[key] = f"Tiempo límite excedido ({timeout:.0f}s)"
+                    else:
+                        future.cancel()
+                        errors[key] = f"Tiempo límite excedido sin empezar, con los hilos ocupados ({timeout:.0f}s)"
+                    finished.append(key)
+                pending -= expired
+
+            for key in finished:
+                completed += 1
+                if on_done is not None:
+                    on_done(key, completed, total)
+    finally:
+        # Las tareas vencidas siguen en segundo plano; no se espera por ellas
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
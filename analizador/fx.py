@@ -0,0 +1,140 @@
+"""Conversión de precios a una moneda base con tipos de cambio guardados junto a los precios."""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analizador.store import to_day
+from analizador.telemetry import span
+
+DEFAULT_CURRENCY = "USD"
+
+# Monedas en las que se puede valuar un portfolio
+BASE_CURRENCIES = ("USD", "EUR", "GBP", "CAD", "MXN", "BRL", "COP", "CLP", "ARS", "JPY", "CHF")
+
+# Columnas de los precios expresadas en la moneda de cotización
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Dividends")
+
+# Yahoo Finance cotiza algunas bolsas en la subunidad de la moneda (peniques, centavos)
+MINOR_UNITS = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+
+# Días previos al rango que se piden para tener un tipo de cambio al primer día
+LOOKBACK_DAYS = 7
+
+# Símbolo de los montos en cada moneda base; las demás se escriben con el código ISO
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£", "JPY": "¥"}
+
+UNKNOWN_CURRENCY_MESSAGE = "Moneda de cotización desconocida (sin información del proveedor)"
+
+
+def money_prefix(currency):
+    """Prefijo de los montos en currency: "$", "€" o el código seguido de un espacio"""
+    return CURRENCY_SYMBOLS.get(currency, f"{currency} ")
+
+
+def format_money(value, currency, decimals=2):
+    """Monto con el prefijo de su moneda, por ejemplo $1,500.00 o CHF 1,500.00"""
+    return f"{money_prefix(currency)}{value:,.{decimals}f}"
+
+
+def normalize_currency(code):
+    """(moneda ISO, escala) de un código de moneda del proveedor; sin código, None"""
+    if not code:
+        return None
+    if code in MINOR_UNITS:
+        return MINOR_UNITS[code]
+    return code.upper(), 1.0
+
+
+def fx_symbol(currency, base):
+    """Símbolo del tipo de cambio en Yahoo Finance: unidades de base por unidad de currency"""
+    return f"{currency}{base}=X"
+
+
+def fx_rates(currencies, base, start, end, store, fetch_batch):
+    """Tipos de cambio diarios a base como DataFrame fecha × moneda
+
+    Cada par es un símbolo más del almacén de precios (PriceStore): se pide
+    al proveedor una sola vez por rango y luego se lee del disco. Retorna
+    (tipos, errores moneda -> motivo).
+    """
+    pairs = {currency: fx_symbol(currency, base) for currency in dict.fromkeys(currencies) if currency != base}
+    if not pairs:
+        return pd.DataFrame(dtype=float), {}
+    first = to_day(start) - timedelta(days=LOOKBACK_DAYS)
+    datasets, errors = store.get_history(list(pairs.values()), first, end, fetch_batch)
+    rates = {currency: datasets[symbol]['Close'] for currency, symbol in pairs.items() if symbol in datasets}
+    failures = {currency: errors.get(symbol, "Sin cotizaciones en el período")
+                for currency, symbol in pairs.items() if symbol not in datasets}
+    if not rates:
+        return pd.DataFrame(dtype=float), failures
+    return pd.concat(rates, axis=1).sort_index().ffill().bfill(), failures
+
+
+def convert_prices(data, rate):
+    """Copia de data con PRICE_COLUMNS multiplicadas por rate
+
+    rate es un factor fijo o una Series fecha -> tipo de cambio; con una
+    Series cada barra toma el último tipo de cambio de cierre a su fecha, o
+    el primero disponible si la barra es anterior. La multiplicación es una
+    sola operación sobre la matriz de precios.
+    """
+    if isinstance(rate, pd.Series):
+        positions = np.searchsorted(rate.index.to_numpy(), data.index.to_numpy(), side="right") - 1
+        factor = rate.to_numpy(dtype=float)[np.clip(positions, 0, None)][:, None]
+    else:
+        factor = float(rate)
+    columns = [column for column in PRICE_COLUMNS if column in data.columns]
+    converted = data.copy()
+    converted[columns] = data[columns].to_numpy(dtype=float) * factor
+    return converted
+
+
+class CurrencyConverter:
+    """Expresa los precios de cada acción en una moneda base
+
+    La moneda de cotización de cada acción sale del almacén de metadatos
+    (MetadataStore) y los tipos de cambio del almacén de precios (ver
+    fx_rates). Una acción sin moneda conocida no se convierte: suponer una
+    moneda dejaría montos equivocados en las métricas compartidas.
+    """
+
+    def __init__(self, store, fetch_batch, metadata):
+        self.store = store
+        self.fetch_batch = fetch_batch
+        self.metadata = metadata
+
+    def currency_of(self, symbol):
+        """(moneda ISO, escala) en que cotiza un símbolo, o None si no se conoce"""
+        info = self.metadata.get(symbol)
+        return normalize_currency(info['currency'] if info else None)
+
+    def convert(self, datasets, base, start, end):
+        """Precios de datasets en base; retorna (datos, errores)
+
+        Las acciones ya expresadas en base se devuelven tal cual; las de
+        moneda desconocida o sin tipo de cambio en el rango quedan en errores.
+        """
+        units = {symbol: self.currency_of(symbol) for symbol in datasets}
+        unknown = [symbol for symbol, unit in units.items() if unit is None]
+        foreign = {symbol: unit for symbol, unit in units.items() if unit is not None and unit != (base, 1.0)}
+        if not foreign and not unknown:
+            return datasets, {}
+
+        converted = {symbol: data for symbol, data in datasets.items() if symbol not in unknown}
+        errors = dict.fromkeys(unknown, UNKNOWN_CURRENCY_MESSAGE)
+        if not foreign:
+            return converted, errors
+        with span("fx_convert", symbols=len(foreign), base=base):
+            rates, failures = fx_rates([currency for currency, _ in foreign.values()], base, start, end,
+                                       self.store, self.fetch_batch)
+            for symbol, (currency, scale) in foreign.items():
+                if currency in failures:
+                    del converted[symbol]
+                    errors[symbol] = f"Sin tipo de cambio {currency}/{base}: {failures[currency]}"
+                elif currency == base:
+                    converted[symbol] = convert_prices(datasets[symbol], scale)
+                else:
+                    converted[symbol] = convert_prices(datasets[symbol], rates[currency] * scale)
+        return converted, errors
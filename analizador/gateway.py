@@ -0,0 +1,330 @@
+"""Acceso compartido al proveedor: solicitudes unificadas, límite de tasa, reintentos y cortocircuito."""
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from analizador.intervals import DEFAULT_INTERVAL
+from analizador.providers import MarketDataProvider
+from analizador.store import to_day
+from analizador.telemetry import count_cache, span
+
+# Solicitudes por segundo al proveedor y ráfaga máxima permitida
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 5
+
+# Reintentos de un fallo transitorio, con espera exponencial entre BACKOFF_BASE y BACKOFF_MAX segundos
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Fallos transitorios seguidos que abren el circuito y segundos hasta volver a probar
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60.0
+
+UNAVAILABLE_MESSAGE = "Proveedor no disponible temporalmente; se usan los datos guardados"
+
+# Mensajes de error que vale la pena reintentar: límite de solicitudes, errores HTTP 5xx y de red
+TRANSIENT_PATTERN = re.compile(
+    r"rate ?limit|too many requests|\b(429|50[0234])\b|timed? ?out|connection|temporarily|unavailable",
+    re.IGNORECASE
+)
+
+
+class ProviderUnavailable(RuntimeError):
+    """El circuito está abierto: no se consulta al proveedor hasta RESET_TIMEOUT"""
+
+
+def is_transient(error):
+    """Indica si un fallo (excepción o mensaje) puede resolverse reintentando
+
+    Un símbolo desconocido o un rango inválido son definitivos; los errores de
+    red y de límite de solicitudes, transitorios.
+    """
+    if isinstance(error, ProviderUnavailable):
+        return False
+    if isinstance(error, (LookupError, ValueError, TypeError)):
+        return False
+    if isinstance(error, OSError):
+        return True
+    return TRANSIENT_PATTERN.search(str(error)) is not None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """Espera antes del reintento número attempt (desde 0), con jitter completo"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Limita las solicitudes a rate por segundo con ráfagas de hasta burst
+
+    Cada acquire reserva un token y espera, fuera del lock, hasta que esté
+    disponible; los hilos se atienden en el orden en que llegan.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def acquire(self):
+        """Toma un token, esperando si hace falta; retorna los segundos esperados"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Corta las solicitudes tras failure_threshold fallos transitorios seguidos
+
+    Abierto, rechaza todo durante reset_timeout segundos; luego deja pasar una
+    sola solicitud de prueba (semiabierto) que lo cierra si tiene éxito o lo
+    vuelve a abrir si falla. Una prueba que no informa su resultado en
+    reset_timeout segundos se da por perdida y se deja pasar otra.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "cerrado", "abierto", "semiabierto"
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Indica si una solicitud puede ir al proveedor"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            now = self._clock()
+            waited = now - (self._opened_at if self._state == self.OPEN else self._probe_started)
+            if waited >= self.reset_timeout:
+                # La primera solicitud tras la espera es la de prueba; las demás siguen rechazadas
+                self._state = self.HALF_OPEN
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class SingleFlight:
+    """Une solicitudes idénticas en curso desde distintos hilos y sesiones
+
+    claim(claves) registra como propias las claves sin solicitud en curso y
+    retorna además las ajenas, cuyo Future se resuelve cuando su dueño llama
+    a release.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def claim(self, keys):
+        """Retorna (propias, ajenas), ambas clave -> Future"""
+        owned, shared = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._calls:
+                    shared[key] = self._calls[key]
+                else:
+                    owned[key] = self._calls[key] = Future()
+        return owned, shared
+
+    def release(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+class FetchGateway(MarketDataProvider):
+    """Proveedor que envuelve a otro, compartido por todas las sesiones
+
+    Las solicitudes iguales en curso (mismo símbolo, rango e intervalo, o la
+    información de un símbolo) se hacen una sola vez; cada llamada al
+    proveedor toma un token de TokenBucket; los fallos transitorios se
+    reintentan con espera exponencial; y tras FAILURE_THRESHOLD fallos
+    seguidos el circuito se abre y las solicitudes fallan sin red, de modo
+    que PriceStore y MetadataStore sirven lo último guardado.
+    """
+
+    def __init__(self, provider, rate=DEFAULT_RATE, burst=DEFAULT_BURST, retries=DEFAULT_RETRIES,
+                 breaker=None, sleep=time.sleep):
+        self.provider = provider
+        self.retries = retries
+        self.bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._flights = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "retries": 0, "rejected": 0}
+
+    @property
+    def name(self):
+        return self.provider.name
+
+    @property
+    def store_name(self):
+        return self.provider.store_name
+
+    @property
+    def metadata_name(self):
+        return self.provider.metadata_name
+
+    def earliest_start(self, interval):
+        return self.provider.earliest_start(interval)
+
+    @property
+    def stats(self):
+        """Solicitudes al proveedor, unificadas, reintentos, rechazadas y estado del circuito"""
+        with self._stats_lock:
+            return {**self._stats, "circuit": self.breaker.state}
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _fetch_history(self, symbols, start, end, interval):
+        """Llama al proveedor reintentando solo los símbolos con fallos transitorios"""
+        if not self.breaker.allow():
+            self._count("rejected")
+            return {}, {symbol: UNAVAILABLE_MESSAGE for symbol in symbols}
+
+        datasets, errors = {}, {}
+        pending = list(symbols)
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                with span("provider_call", "history", symbols=len(pending), interval=interval, attempt=attempt):
+                    fetched, fetch_errors = self.provider.history_batch(pending, start, end, interval)
+            except Exception as e:
+                if not is_transient(e):
+                    # El proveedor respondió: el error es del pedido, no de su disponibilidad
+                    self.breaker.record_success()
+                    raise
+                fetched, fetch_errors = {}, {symbol: str(e) or type(e).__name__ for symbol in pending}
+            datasets.update(fetched)
+            errors.update(fetch_errors)
+
+            pending = [symbol for symbol in pending if symbol in fetch_errors and is_transient(fetch_errors[symbol])]
+            if not pending:
+                self.breaker.record_success()
+                break
+            if attempt == self.retries:
+                self.breaker.record_failure()
+                break
+            self._count("retries")
+            self._sleep(backoff_delay(attempt))
+            for symbol in pending:
+                del errors[symbol]
+        return datasets, errors
+
+    def history_batch(self, symbols, start, end, interval=DEFAULT_INTERVAL):
+        keys = {("history", symbol, to_day(start), to_day(end), interval): symbol
+                for symbol in dict.fromkeys(symbols)}
+        owned, shared = self._flights.claim(keys)
+        count_cache("inflight", hits=len(shared), misses=len(owned))
+        if shared:
+            self._count("coalesced", len(shared))
+
+        datasets, errors = {}, {}
+        if owned:
+            try:
+                datasets, errors = self._fetch_history([keys[key] for key in owned], start, end, interval)
+            except Exception as e:
+                # _fetch_history ya informó el resultado al circuito; solo se libera a quienes esperan
+                for key in owned:
+                    self._flights.release(key, error=e)
+                raise
+            for key in owned:
+                symbol = keys[key]
+                self._flights.release(key, (datasets.get(symbol), errors.get(symbol)))
+
+        for key, future in shared.items():
+            symbol = keys[key]
+            try:
+                data, error = future.result()
+            except Exception as e:
+                data, error = None, str(e) or type(e).__name__
+            if error is not None:
+                errors[symbol] = error
+            elif data is not None:
+                datasets[symbol] = data
+        return datasets, errors
+
+    def _fetch_info(self, symbol):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise ProviderUnavailable(UNAVAILABLE_MESSAGE)
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                with span("provider_call", "info", symbol=symbol, attempt=attempt):
+                    info = self.provider.info(symbol)
+            except Exception as e:
+                if not is_transient(e):
+                    # El proveedor respondió: el símbolo no existe
+                    self.breaker.record_success()
+                    raise
+                if attempt == self.retries:
+                    self.breaker.record_failure()
+                    raise
+                self._count("retries")
+                self._sleep(backoff_delay(attempt))
+            else:
+                self.breaker.record_success()
+                return info
+
+    def info(self, symbol):
+        key = ("info", symbol)
+        owned, shared = self._flights.claim([key])
+        count_cache("inflight", hits=len(shared), misses=len(owned))
+        if shared:
+            self._count("coalesced")
+            return shared[key].result()
+        try:
+            info = self._fetch_info(symbol)
+        except Exception as e:
+            # Como en history_batch, _fetch_info ya informó el resultado al circuito
+            self._flights.release(key, error=e)
+            raise
+        self._flights.release(key, info)
+        return info
@@ -0,0 +1,161 @@
+"""Importación de carteras (símbolo, monto, categoría) desde archivos CSV o JSON."""
+
+import io
+import json
+import re
+from functools import partial
+
+import pandas as pd
+
+from analizador.fetch import DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT, run_concurrently
+
+HOLDINGS_COLUMNS = ["symbol", "amount", "category"]
+
+# Encabezados aceptados para cada columna, en minúsculas
+COLUMN_ALIASES = {
+    "symbol": ("symbol", "ticker", "símbolo", "simbolo"),
+    "amount": ("amount", "monto", "investment", "inversión", "inversion"),
+    "category": ("category", "categoría", "categoria"),
+}
+
+# Montos con punto decimal (1500.50, 1,500.50) y con coma decimal (1500,50, 1.500,50)
+POINT_DECIMAL = re.compile(r"^(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?$")
+COMMA_DECIMAL = re.compile(r"^(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?$")
+
+
+class AmbiguousAmount(ValueError):
+    """Monto que vale distinto con coma o con punto decimal ("1,500" o "1.500")"""
+
+
+def parse_amount(text, decimal_comma=None):
+    """Monto de un texto como "$1,500.50" o "1.500,50 €"; None si no es un número
+
+    Un texto con una sola lectura posible se acepta en cualquier archivo. Si
+    admite las dos con valores distintos ("1,500" o "1.500"), decide
+    decimal_comma: True para coma decimal, False para punto decimal y None
+    (sin convención conocida) lanza AmbiguousAmount.
+    """
+    text = re.sub(r"[$€£\s]", "", str(text))
+    sign = -1.0 if text.startswith("-") else 1.0
+    digits = text.lstrip("+-")
+    point = float(digits.replace(",", "")) if POINT_DECIMAL.match(digits) else None
+    comma = float(digits.replace(".", "").replace(",", ".")) if COMMA_DECIMAL.match(digits) else None
+    if point is None and comma is None:
+        return None
+    if point is not None and comma is not None and point != comma:
+        if decimal_comma is None:
+            raise AmbiguousAmount(text)
+        return sign * (comma if decimal_comma else point)
+    return sign * (point if point is not None else comma)
+
+
+def _json_frame(data):
+    """Filas de un JSON: lista de objetos, símbolo -> monto o un archivo de Exportar Configuración"""
+    if isinstance(data, dict) and "amounts" in data:
+        custom_stocks = data.get("custom_stocks", {})
+        return pd.DataFrame({
+            "symbol": list(data["amounts"]),
+            "amount": list(data["amounts"].values()),
+            "category": [custom_stocks.get(symbol, {}).get("category") for symbol in data["amounts"]],
+        })
+    if isinstance(data, dict):
+        return pd.DataFrame({"symbol": list(data), "amount": list(data.values())})
+    return pd.DataFrame.from_records(data)
+
+
+def _clean_amounts(column, decimal_comma=None):
+    """Montos de la columna como números (NaN si vacíos o no numéricos) y máscara de los ambiguos"""
+    if column.dtype != object:
+        return pd.to_numeric(column, errors="coerce"), pd.Series(False, index=column.index)
+    values, ambiguous = [], []
+    for value in column:
+        is_ambiguous = False
+        if isinstance(value, (int, float)):
+            number = float(value)
+        elif value is None or str(value).strip() in ("", "nan"):
+            number = None
+        else:
+            try:
+                number = parse_amount(value, decimal_comma)
+            except AmbiguousAmount:
+                number, is_ambiguous = None, True
+        values.append(number)
+        ambiguous.append(is_ambiguous)
+    return pd.Series(values, index=column.index, dtype=float), pd.Series(ambiguous, index=column.index)
+
+
+def read_holdings(content, filename):
+    """Cartera de un archivo como DataFrame con HOLDINGS_COLUMNS
+
+    content son los bytes o el texto del archivo; si filename termina en .json
+    se lee como JSON y si no como CSV (separado por comas o punto y coma).
+    En un CSV separado por punto y coma los montos usan coma decimal
+    ("1.500,50"); en uno separado por comas, punto decimal ("1,500.50"),
+    aunque un monto que solo admite coma decimal ("1500,50") se lee así.
+    Los símbolos quedan en mayúsculas, los montos vacíos cuentan 0, la
+    categoría vacía queda en None y las filas repetidas de un símbolo se
+    suman conservando la última categoría. Lanza ValueError si falta la
+    columna de símbolos o hay montos no numéricos, ambiguos o negativos.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        frame = _json_frame(json.loads(content))
+        decimal_comma = None
+    else:
+        header = content.split("\n", 1)[0]
+        separator = ";" if ";" in header and "," not in header else ","
+        frame = pd.read_csv(io.StringIO(content), sep=separator, dtype=str, skipinitialspace=True)
+        decimal_comma = separator == ";"
+
+    renames = {}
+    for column in frame.columns:
+        for name, aliases in COLUMN_ALIASES.items():
+            if str(column).strip().lower() in aliases:
+                renames[column] = name
+    frame = frame.rename(columns=renames)
+    if "symbol" not in frame.columns:
+        raise ValueError("El archivo no tiene una columna de símbolos (symbol o ticker)")
+    frame = frame.reindex(columns=HOLDINGS_COLUMNS)
+
+    frame["symbol"] = frame["symbol"].astype(str).str.strip().str.upper()
+    frame = frame[frame["symbol"].ne("") & frame["symbol"].ne("NAN") & frame["symbol"].ne("NONE")]
+
+    amounts, ambiguous = _clean_amounts(frame["amount"], decimal_comma)
+    if ambiguous.any():
+        raise ValueError(f"Montos ambiguos para: {', '.join(frame.loc[ambiguous, 'symbol'][:5])} "
+                         "(escribe 1500.50 o 1.500,50)")
+    invalid = frame.loc[amounts.isna() & frame["amount"].notna() & frame["amount"].astype(str).str.strip().ne(""),
+                        "symbol"]
+    if len(invalid) > 0:
+        raise ValueError(f"Montos no numéricos para: {', '.join(invalid[:5])}")
+    amounts = amounts.fillna(0.0)
+    if (amounts < 0).any():
+        raise ValueError(f"Montos negativos para: {', '.join(frame.loc[amounts < 0, 'symbol'][:5])}")
+
+    categories = frame["category"].astype(object).where(frame["category"].notna(), None)
+    categories = categories.map(lambda value: str(value).strip() or None if value is not None else None)
+    frame = frame.assign(amount=amounts.astype(float), category=categories)
+
+    grouped = frame.groupby("symbol", sort=False).agg(amount=("amount", "sum"), category=("category", "last"))
+    grouped["category"] = grouped["category"].astype(object).where(grouped["category"].notna(), None)
+    return grouped.reset_index()[HOLDINGS_COLUMNS]
+
+
+def validate_symbols(symbols, validate, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT,
+                     on_done=None, initializer=None):
+    """Valida símbolos en paralelo con validate(símbolo) -> (válido, nombre o error)
+
+    on_done e initializer se pasan a run_concurrently. Retorna (nombres,
+    errores) por símbolo; una validación que excede timeout es un error.
+    """
+    tasks = {symbol: partial(validate, symbol) for symbol in dict.fromkeys(symbols)}
+    outputs, errors = run_concurrently(tasks, max_workers=max_workers, timeout=timeout,
+                                       on_done=on_done, initializer=initializer)
+    names = {}
+    for symbol, (valid, name_or_error) in outputs.items():
+        if valid:
+            names[symbol] = name_or_error
+        else:
+            errors[symbol] = name_or_error
+    return names, errors
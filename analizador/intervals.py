@@ -0,0 +1,91 @@
+"""Intervalos de precios: límites del proveedor, tramos de descarga y anualización."""
+
+from datetime import date, timedelta
+
+import pandas as pd
+
+from analizador.metrics import TRADING_DAYS
+from analizador.store import to_day
+
+DEFAULT_INTERVAL = "1d"
+
+# minutes: duración de la barra (None para diaria y semanal); chunk_days: días
+# por solicitud y lookback_days: antigüedad máxima que acepta Yahoo Finance
+INTERVALS = {
+    "1m": {"label": "1 minuto", "minutes": 1, "chunk_days": 7, "lookback_days": 30},
+    "5m": {"label": "5 minutos", "minutes": 5, "chunk_days": 60, "lookback_days": 60},
+    "15m": {"label": "15 minutos", "minutes": 15, "chunk_days": 60, "lookback_days": 60},
+    "1h": {"label": "1 hora", "minutes": 60, "chunk_days": 365, "lookback_days": 730},
+    "1d": {"label": "1 día", "minutes": None, "chunk_days": None, "lookback_days": None},
+    "1wk": {"label": "1 semana", "minutes": None, "chunk_days": None, "lookback_days": None},
+}
+
+INTRADAY_INTERVALS = tuple(name for name, spec in INTERVALS.items() if spec["minutes"])
+
+# Minutos de una sesión regular de la bolsa de Nueva York (9:30 a 16:00)
+SESSION_MINUTES = 390
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+
+WEEKLY_AGGREGATIONS = {
+    "Open": "first", "High": "max", "Low": "min", "Close": "last",
+    "Volume": "sum", "Dividends": "sum", "Stock Splits": "max"
+}
+
+
+def is_intraday(interval):
+    return interval in INTRADAY_INTERVALS
+
+
+def bars_per_day(interval):
+    """Barras de una sesión completa; la última barra horaria dura media hora"""
+    if interval == "1wk":
+        return 1 / 5
+    minutes = INTERVALS[interval]["minutes"]
+    return -(-SESSION_MINUTES // minutes) if minutes else 1
+
+
+def periods_per_year(interval):
+    """Barras por año con que se anualizan volatilidad, Sharpe y covarianza"""
+    return TRADING_DAYS * bars_per_day(interval)
+
+
+def earliest_start(interval, today=None):
+    """Primer día que el proveedor ofrece para el intervalo (None si no hay límite)"""
+    lookback = INTERVALS[interval]["lookback_days"]
+    if lookback is None:
+        return None
+    # Un día de margen: el límite se cuenta desde el momento de la solicitud
+    return (today or date.today()) - timedelta(days=lookback - 1)
+
+
+def date_chunks(start, end, interval):
+    """Divide [start, end) en tramos de a lo sumo chunk_days días del intervalo"""
+    start, end = to_day(start), to_day(end)
+    chunk_days = INTERVALS[interval]["chunk_days"]
+    if chunk_days is None:
+        return [(start, end)] if start < end else []
+    chunks = []
+    while start < end:
+        chunk_end = min(start + timedelta(days=chunk_days), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end
+    return chunks
+
+
+def weekly_bars(data):
+    """Barras semanales (lunes a viernes) a partir de precios diarios
+
+    Cada semana queda fechada en su último día con cotización.
+    """
+    if data is None or len(data) == 0:
+        return data
+    weeks = data.index.to_period("W-FRI")
+    aggregations = {c: WEEKLY_AGGREGATIONS[c] for c in data.columns if c in WEEKLY_AGGREGATIONS}
+    weekly = data.groupby(weeks).agg(aggregations)
+    weekly.index = pd.DatetimeIndex(data.index.to_series().groupby(weeks).max().to_numpy(), name="Date")
+    return weekly
+
+
+def daily_closes(closes):
+    """Último cierre de cada día de una matriz fecha × símbolo intradiaria"""
+    return closes.groupby(closes.index.normalize()).last()
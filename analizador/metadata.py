@@ -0,0 +1,144 @@
+"""Almacén persistente de información de empresas con vigencia por campo."""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from analizador.fetch import DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT, run_concurrently
+from analizador.providers import info_record
+from analizador.store import default_data_dir
+from analizador.telemetry import count_cache
+
+DAY = 24 * 3600
+
+# Segundos que cada campo se considera vigente antes de volver a pedirlo
+FIELD_TTLS = {
+    'name': 30 * DAY,
+    'sector': 30 * DAY,
+    'industry': 30 * DAY,
+    'currency': 30 * DAY,
+    'market_cap': DAY,
+    'pe_ratio': DAY,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    symbol TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (symbol, field)
+) WITHOUT ROWID;
+"""
+
+
+class MetadataStore:
+    """Información de empresas en SQLite con una copia en memoria
+
+    Las consultas se resuelven desde un diccionario en memoria (O(1) por
+    símbolo) y cada escritura se persiste en disco. Un campo está vencido
+    cuando su antigüedad supera FIELD_TTLS.
+    """
+
+    def __init__(self, path=None, ttls=None):
+        self.path = Path(path) if path else default_data_dir() / "metadata.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = ttls or FIELD_TTLS
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._entries = {}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            rows = conn.execute("SELECT symbol, field, value, updated FROM metadata").fetchall()
+        for symbol, field, value, updated in rows:
+            self._entries.setdefault(symbol, {})[field] = (json.loads(value), updated)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def __contains__(self, symbol):
+        return symbol in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def symbols(self):
+        return list(self._entries)
+
+    def get(self, symbol):
+        """info_record guardado para un símbolo (aunque esté vencido), o None"""
+        entry = self._entries.get(symbol)
+        count_cache("metadata", hits=int(entry is not None), misses=int(entry is None))
+        if entry is None:
+            return None
+        return info_record(symbol, **{field: value for field, (value, _) in entry.items()})
+
+    def is_stale(self, symbol, now=None):
+        """True si falta el símbolo o alguno de sus campos está vencido"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return True
+        now = now or time.time()
+        return any(
+            field not in entry or now - entry[field][1] > ttl
+            for field, ttl in self.ttls.items()
+        )
+
+    def stale_symbols(self, symbols):
+        now = time.time()
+        return [symbol for symbol in symbols if self.is_stale(symbol, now)]
+
+    def put(self, symbol, info):
+        """Guarda la información de un símbolo con la hora actual"""
+        now = time.time()
+        fields = {field: info.get(field) for field in self.ttls if field in info}
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO metadata (symbol, field, value, updated) VALUES (?, ?, ?, ?)",
+                [(symbol, field, json.dumps(value), now) for field, value in fields.items()]
+            )
+            entry = dict(self._entries.get(symbol, {}))
+            entry.update({field: (value, now) for field, value in fields.items()})
+            self._entries[symbol] = entry
+
+    def refresh(self, symbols, fetch_info, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+        """Pide en paralelo la información de los símbolos y la guarda
+
+        Retorna un diccionario símbolo -> motivo con los que fallaron.
+        """
+        tasks = {symbol: (lambda symbol=symbol: fetch_info(symbol)) for symbol in symbols}
+        infos, errors = run_concurrently(tasks, max_workers=max_workers, timeout=timeout)
+        for symbol, info in infos.items():
+            self.put(symbol, info)
+        return errors
+
+    def refresh_in_background(self, symbols, fetch_info, **kwargs):
+        """Actualiza en un hilo aparte los símbolos que no se estén actualizando ya
+
+        Retorna el hilo iniciado, o None si no había nada nuevo que actualizar.
+        """
+        with self._lock:
+            pending = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._refreshing]
+            self._refreshing.update(pending)
+        if not pending:
+            return None
+
+        def job():
+            try:
+                self.refresh(pending, fetch_info, **kwargs)
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(pending)
+
+        thread = threading.Thread(target=job, name="metadata-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def refreshing(self):
+        """Cantidad de símbolos con actualización en curso"""
+        return len(self._refreshing)
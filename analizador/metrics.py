@@ -0,0 +1,182 @@
+"""Métricas de inversión, por acción y vectorizadas sobre una matriz de precios."""
+
+import numpy as np
+import pandas as pd
+
+# Días de negociación por año usados para anualizar
+TRADING_DAYS = 252
+
+METRIC_COLUMNS = [
+    "investment", "start_price", "end_price", "shares", "final_value",
+    "profit_loss", "profit_loss_pct", "max_value", "min_value",
+    "max_price", "min_price", "volatility", "max_drawdown", "sharpe_ratio"
+]
+
+# Retorno solo por precio o total, con los dividendos reinvertidos
+RETURN_BASES = ("price", "total")
+
+# Métricas que no dependen del monto; las demás se obtienen escalándolas
+UNIT_COLUMNS = [
+    "start_price", "end_price", "max_price", "min_price",
+    "volatility", "max_drawdown", "sharpe_ratio"
+]
+
+
+def pays_dividends(data):
+    """Indica si data (DataFrame de history()) tiene algún dividendo"""
+    return "Dividends" in data.columns and bool((data["Dividends"].fillna(0.0) > 0).any())
+
+
+def total_return_closes(data):
+    """Cierres de data con los dividendos reinvertidos, anclados al primer cierre
+
+    Cada dividendo se reinvierte al cierre previo a su fecha ex: desde esa
+    fecha la serie se multiplica por 1 + dividendo / cierre previo. Yahoo
+    Finance entrega cierres y dividendos ajustados por splits y PriceStore
+    mantiene todas las filas de un símbolo en una misma base, así que Stock
+    Splits no cambia el retorno. Sin dividendos retorna data['Close'].
+    """
+    close = data["Close"]
+    if not pays_dividends(data):
+        return close
+    dividends = data["Dividends"].fillna(0.0)
+    previous = close.ffill().shift(1)
+    growth = (1 + dividends / previous).where((dividends > 0) & (previous > 0), 1.0)
+    return (close * growth.cumprod()).rename("Close")
+
+
+def build_price_matrix(datasets, column="Close"):
+    """Alinea una columna de varios DataFrames en una matriz fecha × símbolo
+
+    Las fechas sin cotización de un símbolo quedan como NaN.
+    """
+    if not datasets:
+        return pd.DataFrame(dtype=float)
+    matrix = pd.concat({symbol: data[column] for symbol, data in datasets.items()}, axis=1)
+    return matrix.sort_index().astype(float)
+
+
+def previous_valid(values):
+    """Último precio válido anterior a cada fila, por columna (NaN si no hay)"""
+    filled = pd.DataFrame(values).ffill().to_numpy()
+    prev = np.empty_like(values)
+    prev[0] = np.nan
+    prev[1:] = filled[:-1]
+    return prev
+
+
+def returns_matrix(values):
+    """Retornos entre observaciones válidas consecutivas de cada columna
+
+    Equivale a aplicar pct_change() a la serie de cada símbolo sin sus NaN:
+    los huecos de un símbolo no generan retornos de 0%.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / previous_valid(values) - 1
+
+
+def compute_unit_metrics(prices, periods_per_year=TRADING_DAYS):
+    """Métricas que no dependen del monto invertido, para todos los símbolos
+
+    prices es una matriz fecha × símbolo de precios de cierre (NaN donde un
+    símbolo no cotiza) con periods_per_year filas por año de negociación.
+    Retorna un DataFrame indexado por símbolo con UNIT_COLUMNS; se omiten los
+    símbolos sin precios. Cada fila depende solo de la columna de su símbolo,
+    por lo que puede guardarse por separado.
+    """
+    values = np.asfortranarray(prices.to_numpy(dtype=float))
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    keep = counts > 0
+
+    values, valid, counts = values[:, keep], valid[:, keep], counts[keep]
+    symbols = prices.columns[keep]
+    if len(symbols) == 0:
+        return pd.DataFrame(columns=UNIT_COLUMNS, dtype=float)
+
+    cols = np.arange(values.shape[1])
+    first_row = valid.argmax(axis=0)
+    last_row = values.shape[0] - 1 - valid[::-1].argmax(axis=0)
+
+    # Volatilidad y Sharpe sobre retornos entre observaciones válidas
+    returns = returns_matrix(values)
+    n_returns = counts - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_return = np.nansum(returns, axis=0) / n_returns
+        deviations = np.where(np.isnan(returns), 0.0, (mean_return - returns) ** 2)
+        std_return = np.sqrt(deviations.sum(axis=0) / (n_returns - 1))
+        std_return[n_returns < 2] = np.nan
+
+        volatility = np.where(n_returns > 0, std_return * (periods_per_year ** 0.5) * 100, 0.0)
+        sharpe_ratio = np.where(
+            std_return > 0, mean_return / std_return * (periods_per_year ** 0.5), 0.0
+        )
+
+        # Drawdown máximo con máximo acumulado por columna
+        running_max = np.fmax.accumulate(values, axis=0)
+        max_drawdown = np.nanmin((values - running_max) / running_max, axis=0) * 100
+
+    return pd.DataFrame({
+        "start_price": values[first_row, cols],
+        "end_price": values[last_row, cols],
+        "max_price": np.nanmax(values, axis=0),
+        "min_price": np.nanmin(values, axis=0),
+        "volatility": volatility,
+        "max_drawdown": max_drawdown,
+        "sharpe_ratio": sharpe_ratio,
+    }, index=pd.Index(symbols, name="symbol"))
+
+
+def scale_unit_metrics(unit, amounts):
+    """Métricas completas (METRIC_COLUMNS) para montos dados a partir de las unitarias
+
+    Las métricas en dinero son lineales en el monto, por lo que basta escalar
+    los precios guardados. amounts es una Series símbolo -> monto o una
+    secuencia alineada a unit.index; se omiten los montos <= 0.
+    """
+    if isinstance(amounts, pd.Series):
+        amounts = amounts.reindex(unit.index)
+    amounts = np.asarray(amounts, dtype=float)
+    keep = amounts > 0
+    unit, amounts = unit[keep], amounts[keep]
+    if len(unit) == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS, dtype=float)
+
+    start_price = unit["start_price"].to_numpy()
+    end_price = unit["end_price"].to_numpy()
+    shares = amounts / start_price
+    final_value = shares * end_price
+    profit_loss = final_value - amounts
+
+    return pd.DataFrame({
+        "investment": amounts,
+        "start_price": start_price,
+        "end_price": end_price,
+        "shares": shares,
+        "final_value": final_value,
+        "profit_loss": profit_loss,
+        "profit_loss_pct": (profit_loss / amounts) * 100,
+        "max_value": shares * unit["max_price"].to_numpy(),
+        "min_value": shares * unit["min_price"].to_numpy(),
+        "max_price": unit["max_price"].to_numpy(),
+        "min_price": unit["min_price"].to_numpy(),
+        "volatility": unit["volatility"].to_numpy(),
+        "max_drawdown": unit["max_drawdown"].to_numpy(),
+        "sharpe_ratio": unit["sharpe_ratio"].to_numpy(),
+    }, index=unit.index)
+
+
+def compute_portfolio_metrics(prices, amounts, periods_per_year=TRADING_DAYS):
+    """Calcula todas las métricas para todos los símbolos en operaciones NumPy
+
+    prices es una matriz fecha × símbolo de precios de cierre (NaN donde un
+    símbolo no cotiza) y amounts un monto invertido por símbolo (Series o
+    secuencia alineada a las columnas). Retorna un DataFrame indexado por
+    símbolo con METRIC_COLUMNS, iguales a calcularlas sobre la serie de cada
+    símbolo sin sus NaN. Se omiten símbolos sin precios o con monto <= 0.
+    """
+    if isinstance(amounts, pd.Series):
+        amounts = amounts.reindex(prices.columns)
+    amounts = pd.Series(np.asarray(amounts, dtype=float), index=prices.columns)
+    invested = prices.loc[:, (amounts > 0).to_numpy()]
+    return scale_unit_metrics(compute_unit_metrics(invested, periods_per_year), amounts)
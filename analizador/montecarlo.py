@@ -0,0 +1,124 @@
+"""Proyección Monte Carlo del valor del portfolio a partir de retornos históricos."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analizador.metrics import returns_matrix
+
+METHODS = ("bootstrap", "gbm")
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Elementos (caminos × días × acciones) por bloque: unos 16 MB en float32
+CHUNK_ELEMENTS = 4_000_000
+
+
+def log_returns(prices):
+    """Log-retornos diarios entre observaciones válidas; NaN donde no hay retorno"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log1p(returns_matrix(prices.to_numpy(dtype=float)))
+
+
+def gbm_parameters(returns):
+    """Media y factor de covarianza de los log-retornos para el GBM correlacionado
+
+    La covarianza se estima por pares con las fechas en común y se proyecta a
+    la matriz semidefinida positiva más cercana (autovalores negativos en 0),
+    por lo que factor @ factor.T la reproduce aunque haya símbolos sin
+    historia completa.
+    """
+    frame = pd.DataFrame(returns)
+    mean = np.nan_to_num(frame.mean().to_numpy())
+    covariance = np.nan_to_num(frame.cov(min_periods=2).to_numpy())
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+    return mean, factor
+
+
+def step_days(horizon, step=1):
+    """Días desde hoy de cada punto simulado: 0, step, 2 * step, ..., horizon"""
+    return np.unique(np.append(np.arange(0, horizon, step), horizon))
+
+
+def _simulate_chunk(method, n_paths, days, values, returns, mean, factor, seed):
+    """Valor del portfolio en los días simulados de n_paths caminos (n_paths × len(days) - 1)"""
+    rng = np.random.default_rng(seed)
+    lengths = np.diff(days)
+    if method == "bootstrap":
+        # Días históricos completos: conserva la correlación entre acciones
+        increments = returns[rng.integers(0, len(returns), size=(n_paths, days[-1]))]
+        if len(lengths) < days[-1]:
+            increments = np.add.reduceat(increments, days[:-1], axis=1)
+    else:
+        # La suma de k log-retornos normales es normal con media k·μ y covarianza k·Σ
+        shocks = rng.standard_normal((n_paths * len(lengths), len(values)), dtype=np.float32)
+        increments = (shocks @ factor.T).reshape(n_paths, len(lengths), len(values))
+        increments *= np.sqrt(lengths, dtype=np.float32)[:, None]
+        increments += lengths.astype(np.float32)[:, None] * mean
+    np.cumsum(increments, axis=1, out=increments)
+    np.exp(increments, out=increments)
+    return increments @ values
+
+
+def simulate_portfolio(prices, values, horizon=252, n_paths=10000, method="bootstrap",
+                       step=1, seed=None, workers=None):
+    """Caminos futuros del valor total del portfolio
+
+    prices es la matriz fecha × símbolo de cierres históricos y values el
+    valor actual de cada posición (Series símbolo -> valor). Se simula el
+    valor cada step días (ver step_days); la distribución en esos días es la
+    misma que simulando día por día, con step veces menos números aleatorios.
+    Los caminos se simulan por bloques de a lo sumo CHUNK_ELEMENTS números
+    para acotar la memoria, repartidos entre workers hilos (NumPy libera el
+    GIL). Cada bloque usa su propia semilla derivada de seed, así que el
+    resultado no depende de la cantidad de hilos. Los cálculos son en float32,
+    precisión de sobra para percentiles. Retorna (días, caminos): caminos es
+    float32 de n_paths × len(días) y su primera columna es el valor actual.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de simulación desconocido: {method}")
+    values = pd.Series(values, dtype=float).reindex(prices.columns).fillna(0.0).to_numpy()
+    days = step_days(horizon, step)
+
+    returns = log_returns(prices)
+    mean, factor = (a.astype(np.float32) for a in gbm_parameters(returns))
+    # El bootstrap sortea días en que cotizó al menos una acción; sin dato cuenta como 0%
+    returns = np.nan_to_num(returns[~np.isnan(returns).all(axis=1)]).astype(np.float32)
+    if len(returns) == 0:
+        raise ValueError("Se necesitan al menos dos precios por acción para simular")
+
+    per_path = (horizon if method == "bootstrap" else len(days) - 1) * len(values)
+    chunk = max(1, CHUNK_ELEMENTS // per_path)
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    paths = np.empty((n_paths, len(days)), dtype=np.float32)
+    paths[:, 0] = values.sum()
+    offsets = np.cumsum([0] + sizes)
+    values32 = values.astype(np.float32)
+
+    def run(i):
+        block = _simulate_chunk(method, sizes[i], days, values32, returns, mean, factor, seeds[i])
+        paths[offsets[i]:offsets[i + 1], 1:] = block
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        list(executor.map(run, range(len(sizes))))
+    return days, paths
+
+
+def fan_percentiles(days, paths, percentiles=PERCENTILES):
+    """Percentiles del valor del portfolio por día simulado (DataFrame día × percentil)"""
+    return pd.DataFrame(np.percentile(paths, percentiles, axis=0).T,
+                        index=pd.Index(days, name="day"), columns=list(percentiles))
+
+
+def outcome_summary(paths):
+    """Valor inicial, percentiles del valor final y probabilidad de pérdida"""
+    start, final = float(paths[0, 0]), paths[:, -1]
+    summary = {'start_value': start, 'loss_probability': float((final < start).mean() * 100)}
+    for p, value in zip(PERCENTILES, np.percentile(final, PERCENTILES)):
+        summary[f'p{p}'] = float(value)
+    return summary
@@ -0,0 +1,162 @@
+"""Optimización media-varianza (solo posiciones largas) y frontera eficiente."""
+
+import numpy as np
+import pandas as pd
+
+from analizador.metrics import TRADING_DAYS, returns_matrix
+
+# Pesos menores a este valor se consideran 0 en las asignaciones
+MIN_WEIGHT = 1e-4
+
+
+def shrunk_covariance(returns):
+    """Covarianza de Ledoit-Wolf hacia una identidad escalada
+
+    returns es una matriz fecha × activo; los días sin dato de un activo
+    cuentan como retorno igual a su media. Retorna (covarianza, intensidad),
+    con la intensidad de contracción entre 0 y 1. Todo es álgebra matricial,
+    por lo que escala a cientos de activos.
+    """
+    centered = np.nan_to_num(returns - np.nanmean(returns, axis=0))
+    n_obs, n_assets = centered.shape
+    sample = centered.T @ centered / n_obs
+    target = np.trace(sample) / n_assets
+
+    distance = np.sum((sample - target * np.eye(n_assets)) ** 2)
+    row_norms = np.sum(centered ** 2, axis=1)
+    spread = (np.sum(row_norms ** 2) / n_obs - np.sum(sample ** 2)) / n_obs
+    shrinkage = min(spread, distance) / distance if distance > 0 else 1.0
+    return shrinkage * target * np.eye(n_assets) + (1 - shrinkage) * sample, shrinkage
+
+
+def project_simplex(v):
+    """Proyección euclídea de v sobre {w >= 0, suma(w) = 1}"""
+    u = np.sort(v)[::-1]
+    cumulative = np.cumsum(u) - 1
+    rho = np.nonzero(u - cumulative / np.arange(1, len(v) + 1) > 0)[0][-1]
+    return np.maximum(v - cumulative[rho] / (rho + 1), 0.0)
+
+
+class MeanVarianceOptimizer:
+    """Asignaciones de mínima varianza, máximo Sharpe y retorno objetivo
+
+    Estima una vez los retornos esperados y la covarianza anualizados a
+    partir de una matriz fecha × símbolo de cierres. Cada problema se resuelve
+    con gradiente proyectado acelerado (FISTA) sobre el simplex, partiendo de
+    la última solución encontrada, por lo que recorrer la frontera o buscar un
+    retorno objetivo requiere pocas iteraciones por punto. Tasa libre de
+    riesgo 0, como el Sharpe de las métricas.
+    """
+
+    def __init__(self, prices, max_iter=5000, tol=1e-9):
+        self.symbols = list(prices.columns)
+        returns = returns_matrix(prices.to_numpy(dtype=float))
+        self.expected_returns = np.nan_to_num(np.nanmean(returns, axis=0)) * TRADING_DAYS
+        covariance, self.shrinkage = shrunk_covariance(returns)
+        self.covariance = covariance * TRADING_DAYS
+        self.lipschitz = 2 * np.linalg.eigvalsh(self.covariance)[-1]
+        self.max_iter = max_iter
+        self.tol = tol
+        self._last = np.full(len(self.symbols), 1 / len(self.symbols))
+
+    def solve(self, risk_aversion, start=None):
+        """Pesos que minimizan varianza - risk_aversion × retorno esperado"""
+        w = self._last if start is None else start
+        y, t = w, 1.0
+        for _ in range(self.max_iter):
+            gradient = 2 * self.covariance @ y - risk_aversion * self.expected_returns
+            w_next = project_simplex(y - gradient / self.lipschitz)
+            if np.max(np.abs(w_next - w)) < self.tol:
+                w = w_next
+                break
+            t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            # Reinicio adaptativo: si el paso va contra el gradiente se pierde la inercia
+            if gradient @ (w_next - w) > 0:
+                t_next, y = 1.0, w_next
+            else:
+                y = w_next + (t - 1) / t_next * (w_next - w)
+            w, t = w_next, t_next
+        self._last = w
+        return w
+
+    def stats(self, weights):
+        """(retorno esperado %, volatilidad %, Sharpe) anualizados de una asignación"""
+        expected = float(self.expected_returns @ weights)
+        volatility = float(np.sqrt(max(weights @ self.covariance @ weights, 0.0)))
+        sharpe = expected / volatility if volatility > 0 else 0.0
+        return expected * 100, volatility * 100, sharpe
+
+    def weights(self, raw):
+        """Pesos como Series, sin posiciones menores a MIN_WEIGHT"""
+        raw = np.where(raw < MIN_WEIGHT, 0.0, raw)
+        return pd.Series(raw / raw.sum(), index=self.symbols)
+
+    def _scale(self):
+        # Aversión a partir de la cual domina el activo de mayor retorno
+        spread = np.ptp(self.expected_returns)
+        return self.lipschitz / spread if spread > 0 else 1.0
+
+    def min_variance(self):
+        return self.weights(self.solve(0.0))
+
+    def max_sharpe(self, iterations=40):
+        """Búsqueda de sección áurea sobre log(aversión) a lo largo de la frontera"""
+        if np.all(self.expected_returns <= 0):
+            return self.min_variance()
+
+        def sharpe(log_lambda):
+            return self.stats(self.solve(np.exp(log_lambda)))[2]
+
+        low, high = np.log(self._scale() * 1e-4), np.log(self._scale() * 1e2)
+        ratio = (np.sqrt(5) - 1) / 2
+        a, b = high - ratio * (high - low), low + ratio * (high - low)
+        fa, fb = sharpe(a), sharpe(b)
+        for _ in range(iterations):
+            if fa < fb:
+                low, a, fa = a, b, fb
+                b = low + ratio * (high - low)
+                fb = sharpe(b)
+            else:
+                high, b, fb = b, a, fa
+                a = high - ratio * (high - low)
+                fa = sharpe(a)
+        return self.weights(self.solve(np.exp((low + high) / 2)))
+
+    def target_return(self, target_pct, iterations=50):
+        """Mínima varianza con retorno esperado de al menos target_pct (% anual)
+
+        Si el objetivo supera el máximo alcanzable retorna el activo de mayor
+        retorno esperado.
+        """
+        target = target_pct / 100
+        w = self.solve(0.0)
+        if self.expected_returns @ w >= target:
+            return self.weights(w)
+        if target >= self.expected_returns.max():
+            return self.weights(np.eye(len(self.symbols))[self.expected_returns.argmax()])
+
+        low, high = 0.0, self._scale()
+        while self.expected_returns @ self.solve(high) < target:
+            low, high = high, high * 2
+        for _ in range(iterations):
+            middle = (low + high) / 2
+            if self.expected_returns @ self.solve(middle) < target:
+                low = middle
+            else:
+                high = middle
+        return self.weights(self.solve(high))
+
+    def frontier(self, n_points=40):
+        """Frontera eficiente como DataFrame (return, volatility, sharpe) por punto"""
+        lambdas = np.concatenate(([0.0], np.geomspace(1e-4, 1e2, n_points - 1) * self._scale()))
+        self._last = np.full(len(self.symbols), 1 / len(self.symbols))
+        rows = [self.stats(self.solve(risk_aversion)) for risk_aversion in lambdas]
+        frame = pd.DataFrame(rows, columns=["return", "volatility", "sharpe"])
+        return frame.drop_duplicates(subset=["return", "volatility"]).sort_values("volatility")
+
+    def asset_stats(self):
+        """Retorno esperado y volatilidad anualizados (%) de cada activo por separado"""
+        return pd.DataFrame({
+            "return": self.expected_returns * 100,
+            "volatility": np.sqrt(np.diag(self.covariance)) * 100,
+        }, index=pd.Index(self.symbols, name="symbol"))
@@ -0,0 +1,354 @@
+"""Proveedores de datos de mercado: Yahoo Finance y un proveedor local sin red."""
+
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analizador.intervals import (
+    DEFAULT_INTERVAL, INTERVALS, SESSION_OPEN, bars_per_day, date_chunks, earliest_start, is_intraday,
+    weekly_bars
+)
+from analizador.store import HISTORY_COLUMNS, compact_bars, default_data_dir, to_day
+
+PROVIDER_ENV = "ANALIZADOR_PROVIDER"
+LOCAL_DIR_ENV = "ANALIZADOR_LOCAL_DIR"
+LOCAL_LATENCY_ENV = "ANALIZADOR_LOCAL_LATENCY"
+
+# Máximo de símbolos por solicitud agrupada a Yahoo Finance
+BATCH_DOWNLOAD_SIZE = 50
+
+# Primer día de las series sintéticas; cualquier rango es un tramo de la misma serie
+SYNTHETIC_EPOCH = pd.Timestamp("1990-01-01")
+
+# Moneda de las acciones sintéticas según el sufijo de bolsa de Yahoo Finance
+SYNTHETIC_CURRENCIES = {".L": "GBp", ".DE": "EUR", ".PA": "EUR", ".MC": "EUR", ".AS": "EUR", ".MI": "EUR",
+                        ".TO": "CAD", ".MX": "MXN", ".SA": "BRL", ".SN": "CLP", ".BA": "ARS", ".T": "JPY"}
+
+
+def info_record(symbol, name=None, sector="N/A", industry="N/A", currency=None,
+                market_cap=0, pe_ratio="N/A"):
+    """Información de empresa con las claves que usa la app"""
+    return {
+        'name': name or symbol, 'sector': sector, 'industry': industry,
+        'currency': currency, 'market_cap': market_cap, 'pe_ratio': pe_ratio
+    }
+
+
+class MarketDataProvider:
+    """Interfaz común de los proveedores de datos de mercado
+
+    history_batch(symbols, start, end, interval) retorna (datos, errores): un
+    DataFrame por símbolo con HISTORY_COLUMNS y el motivo de cada fallo real.
+    Un símbolo ausente de ambos no tiene precios en el rango. info(symbol)
+    retorna un info_record y lanza una excepción si el proveedor no responde.
+    """
+
+    name = "base"
+    store_name = "prices.sqlite"
+    metadata_name = "metadata.sqlite"
+
+    def history_batch(self, symbols, start, end, interval=DEFAULT_INTERVAL):
+        raise NotImplementedError
+
+    def info(self, symbol):
+        raise NotImplementedError
+
+    def earliest_start(self, interval):
+        """Primer día que el proveedor ofrece para el intervalo (None si no hay límite)"""
+        return earliest_start(interval)
+
+    def bars_batch(self, symbols, start, end, interval):
+        """Como history_batch, respetando los límites del proveedor para el intervalo
+
+        El rango se recorta a los días que el proveedor ofrece y se pide en
+        tramos de a lo sumo chunk_days días (ver intervals.INTERVALS), que se
+        unen por símbolo. Las barras se retornan compactas (float32) y con
+        la hora local de la bolsa, sin zona horaria.
+        """
+        first = self.earliest_start(interval)
+        start = max(to_day(start), first) if first else to_day(start)
+        chunks = date_chunks(start, end, interval)
+        if not chunks:
+            label = INTERVALS[interval]["label"]
+            return {}, {symbol: f"Barras de {label} solo disponibles desde {first:%d/%m/%Y}"
+                        for symbol in symbols}
+
+        parts, errors = {}, {}
+        for chunk_start, chunk_end in chunks:
+            pending = [symbol for symbol in symbols if symbol not in errors]
+            datasets, chunk_errors = self.history_batch(pending, chunk_start, chunk_end, interval)
+            errors.update(chunk_errors)
+            for symbol, data in datasets.items():
+                if getattr(data.index, "tz", None) is not None:
+                    data = data.tz_localize(None)
+                parts.setdefault(symbol, []).append(data)
+
+        datasets = {symbol: compact_bars(pd.concat(frames)) for symbol, frames in parts.items()
+                    if symbol not in errors}
+        return datasets, errors
+
+
+def _split_batch_frame(raw, symbol):
+    """Extrae el DataFrame de un símbolo desde una descarga agrupada"""
+    if raw is None or len(raw) == 0:
+        return None
+    if isinstance(raw.columns, pd.MultiIndex):
+        if symbol not in raw.columns.get_level_values(0):
+            return None
+        data = raw[symbol].copy()
+    else:
+        data = raw.copy()
+    data.columns.name = None
+    data = data.dropna(subset=['Close'])
+    if len(data) == 0:
+        return None
+    columns = [c for c in HISTORY_COLUMNS if c in data.columns]
+    return data[columns]
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Datos de Yahoo Finance a través de yfinance
+
+    Los cierres se piden sin ajustar por dividendos (solo por splits) y los
+    dividendos por separado, para calcular tanto el retorno por precio como
+    el total (ver metrics.total_return_closes).
+    """
+
+    name = "yfinance"
+    # prices.sqlite guardaba cierres ya ajustados por dividendos
+    store_name = "prices_unadjusted.sqlite"
+
+    def history_batch(self, symbols, start, end, interval=DEFAULT_INTERVAL):
+        import yfinance as yf
+
+        symbols = list(dict.fromkeys(symbols))
+        datasets = {}
+        errors = {}
+
+        for i in range(0, len(symbols), BATCH_DOWNLOAD_SIZE):
+            chunk = symbols[i:i + BATCH_DOWNLOAD_SIZE]
+            try:
+                raw = yf.download(
+                    chunk, start=start, end=end, interval=interval,
+                    group_by="ticker", actions=True, auto_adjust=False,
+                    threads=True, progress=False
+                )
+            except Exception as e:
+                for symbol in chunk:
+                    errors[symbol] = str(e)
+                continue
+
+            chunk_errors = dict(getattr(yf.shared, '_ERRORS', {}))
+            for symbol in chunk:
+                data = _split_batch_frame(raw, symbol)
+                if data is not None:
+                    datasets[symbol] = data
+                elif not chunk_errors.get(symbol, "YFPricesMissingError").startswith("YFPricesMissingError"):
+                    errors[symbol] = chunk_errors[symbol]
+
+        return datasets, errors
+
+    def info(self, symbol):
+        import yfinance as yf
+
+        info = yf.Ticker(symbol).info
+        if 'symbol' not in info and 'shortName' not in info:
+            raise LookupError(f"Símbolo desconocido: {symbol}")
+        return info_record(
+            symbol,
+            name=info.get('shortName', symbol),
+            sector=info.get('sector', 'N/A'),
+            industry=info.get('industry', 'N/A'),
+            currency=info.get('currency'),
+            market_cap=info.get('marketCap', 0),
+            pe_ratio=info.get('trailingPE', 'N/A')
+        )
+
+
+class LocalProvider(MarketDataProvider):
+    """Datos leídos de disco o generados, para pruebas de carga y uso sin red
+
+    Busca precios grabados en <root>/history/<SÍMBOLO>.csv (o .parquet) e
+    información en <root>/info/<SÍMBOLO>.json. Si synthetic es True, los
+    símbolos sin datos grabados reciben una caminata aleatoria determinista
+    (la misma para un símbolo y semilla dados, sin importar el rango pedido);
+    los tipos de cambio (símbolos terminados en =X) son caminatas cerca de 1
+    con menos volatilidad y sin dividendos.
+    latency agrega una espera en segundos a cada solicitud para simular red.
+    """
+
+    name = "local"
+    store_name = "prices_local.sqlite"
+    metadata_name = "metadata_local.sqlite"
+
+    def __init__(self, root=None, latency=0.0, synthetic=True, seed=0):
+        self.root = Path(root) if root else default_data_dir() / "local_provider"
+        self.latency = latency
+        self.synthetic = synthetic
+        self.seed = seed
+
+    def earliest_start(self, interval):
+        # Las series locales y sintéticas cubren cualquier rango
+        return None
+
+    def _wait(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _recorded_history(self, symbol):
+        for suffix, reader in ((".parquet", pd.read_parquet), (".csv", _read_history_csv)):
+            path = self.root / "history" / f"{symbol}{suffix}"
+            if path.exists():
+                data = reader(path)
+                if getattr(data.index, "tz", None) is not None:
+                    data.index = data.index.tz_localize(None)
+                return data
+        return None
+
+    def synthetic_history(self, symbol, end, dates=None):
+        """Caminata aleatoria diaria determinista desde SYNTHETIC_EPOCH hasta end, con dividendos trimestrales"""
+        if dates is None:
+            dates = synthetic_dates(end)
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        drift = rng.uniform(-0.0002, 0.0008)
+        sigma = rng.uniform(0.008, 0.03)
+        start_price = rng.uniform(5, 500)
+        is_fx = symbol.endswith("=X")
+        if is_fx:
+            drift, sigma, start_price = drift / 4, sigma / 4, rng.uniform(0.5, 2)
+
+        # Una fila de shocks por día: la serie hasta una fecha no depende de end
+        shocks = rng.standard_normal((len(dates), 4))
+        close = start_price * np.exp(np.cumsum(drift + sigma * shocks[:, 0]))
+        open_ = close * np.exp(sigma * shocks[:, 1] * 0.3)
+        high = np.maximum(open_, close) * (1 + sigma * np.abs(shocks[:, 2]) * 0.5)
+        low = np.minimum(open_, close) * (1 - sigma * np.abs(shocks[:, 2]) * 0.5)
+        volume = np.floor(np.exp(14 + shocks[:, 3]))
+
+        # La mitad de las acciones paga un dividendo el primer día hábil de cada trimestre
+        payer_rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), 1])
+        dividend_yield = payer_rng.uniform(0.01, 0.06) if payer_rng.random() < 0.5 and not is_fx else 0.0
+        quarters = dates.to_period("Q").asi8
+        quarter_start = np.r_[True, quarters[1:] != quarters[:-1]]
+        dividends = np.where(quarter_start, close * dividend_yield / 4, 0.0)
+
+        return pd.DataFrame({
+            "Open": open_, "High": high, "Low": low, "Close": close,
+            "Volume": volume, "Dividends": dividends, "Stock Splits": 0.0
+        }, index=dates)
+
+    def synthetic_bars(self, symbol, daily, interval):
+        """Barras intradiarias deterministas que unen los cierres diarios de daily
+
+        Cada día es un puente browniano desde el cierre anterior hasta el
+        cierre del día, con shocks que dependen solo del símbolo, el intervalo
+        y la fecha. La primera fila de daily solo aporta el cierre anterior.
+        """
+        minutes = INTERVALS[interval]["minutes"]
+        n_bars = int(bars_per_day(interval))
+        crc = zlib.crc32(symbol.encode())
+        days = daily.index[1:]
+        shocks = np.array([
+            np.random.default_rng([self.seed, crc, minutes, day.toordinal()]).standard_normal(n_bars)
+            for day in days
+        ]).reshape(len(days), n_bars)
+
+        previous = np.log(daily["Close"].to_numpy()[:-1])[:, None]
+        target = np.log(daily["Close"].to_numpy()[1:])[:, None]
+        fraction = np.arange(1, n_bars + 1) / n_bars
+        walk = np.cumsum(shocks, axis=1) * 0.01 / np.sqrt(n_bars)
+        close = np.exp(previous + walk - fraction * walk[:, -1:] + fraction * (target - previous))
+        open_ = np.concatenate([np.exp(previous), close[:, :-1]], axis=1)
+        spread = 1 + np.abs(shocks) * 0.001
+
+        offsets = SESSION_OPEN + pd.to_timedelta(np.arange(n_bars) * minutes, unit="min")
+        index = pd.DatetimeIndex((days.to_numpy()[:, None] + offsets.to_numpy()[None, :]).ravel(), name="Date")
+        volume = np.repeat(daily["Volume"].to_numpy()[1:] / n_bars, n_bars)
+        return pd.DataFrame({
+            "Open": open_.ravel(), "High": (np.maximum(open_, close) * spread).ravel(),
+            "Low": (np.minimum(open_, close) / spread).ravel(), "Close": close.ravel(),
+            "Volume": np.floor(volume), "Dividends": 0.0, "Stock Splits": 0.0
+        }, index=index)
+
+    def history_batch(self, symbols, start, end, interval=DEFAULT_INTERVAL):
+        self._wait()
+        start, end = pd.Timestamp(to_day(start)), pd.Timestamp(to_day(end))
+        datasets = {}
+        errors = {}
+        dates = None
+        for symbol in dict.fromkeys(symbols):
+            data = self._recorded_history(symbol)
+            if data is None:
+                if not self.synthetic:
+                    errors[symbol] = f"Sin datos locales para {symbol}"
+                    continue
+                if dates is None:
+                    dates = synthetic_dates(end)
+                data = self.synthetic_history(symbol, end, dates)
+            if is_intraday(interval):
+                # El día anterior al rango aporta el cierre desde el que parte el primer día
+                daily = data[data.index < end]
+                daily = daily[daily.index >= start].combine_first(daily[daily.index < start].tail(1))
+                data = self.synthetic_bars(symbol, daily, interval) if len(daily) > 1 else data.iloc[:0]
+            data = data[(data.index >= start) & (data.index < end)]
+            if interval == "1wk":
+                data = weekly_bars(data)
+            if len(data) > 0:
+                datasets[symbol] = data
+        return datasets, errors
+
+    def info(self, symbol):
+        self._wait()
+        path = self.root / "info" / f"{symbol}.json"
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                return info_record(symbol, **json.load(f))
+        if not self.synthetic:
+            raise LookupError(f"Sin información local para {symbol}")
+        currency = next((currency for suffix, currency in SYNTHETIC_CURRENCIES.items()
+                         if symbol.upper().endswith(suffix)), "USD")
+        return info_record(symbol, name=f"{symbol} (sintético)", sector="Sintético",
+                           industry="Sintético", currency=currency)
+
+    def save_history(self, symbol, data):
+        """Graba precios para servirlos después sin red"""
+        path = self.root / "history" / f"{symbol}.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data.reindex(columns=HISTORY_COLUMNS).to_csv(path, index_label="Date")
+
+    def save_info(self, symbol, info):
+        """Graba la información de una empresa para servirla después sin red"""
+        path = self.root / "info" / f"{symbol}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def synthetic_dates(end):
+    """Días hábiles (lunes a viernes) desde SYNTHETIC_EPOCH hasta end, sin incluirlo"""
+    days = np.arange(SYNTHETIC_EPOCH.to_datetime64().astype("datetime64[D]"),
+                     pd.Timestamp(end).to_datetime64().astype("datetime64[D]"))
+    return pd.DatetimeIndex(days[np.is_busday(days)].astype("datetime64[ns]"), name="Date")
+
+
+def _read_history_csv(path):
+    data = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+    return data.reindex(columns=HISTORY_COLUMNS)
+
+
+def create_provider(name=None):
+    """Crea el proveedor indicado, o el de ANALIZADOR_PROVIDER (yfinance por defecto)"""
+    name = name or os.environ.get(PROVIDER_ENV, "yfinance")
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "local":
+        return LocalProvider(
+            root=os.environ.get(LOCAL_DIR_ENV),
+            latency=float(os.environ.get(LOCAL_LATENCY_ENV, 0))
+        )
+    raise ValueError(f"Proveedor de datos desconocido: {name}")
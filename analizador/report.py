@@ -0,0 +1,89 @@
+"""Agregación por categorías y tablas de resultados de la pestaña Análisis."""
+
+import numpy as np
+import pandas as pd
+
+# Columnas de category_summary, además del índice por categoría
+CATEGORY_COLUMNS = ["count", "investment", "final_value", "profit_loss", "roi_pct", "stocks"]
+
+
+def results_frame(results):
+    """Resultados por acción como una tabla tipada, sin las series de precios
+
+    Índice symbol; una columna float64 por métrica y category como
+    categórica. Se arma por columnas, no fila por fila.
+    """
+    if not results:
+        return pd.DataFrame(index=pd.Index([], name="symbol"))
+    symbols = list(results)
+    first = results[symbols[0]]
+    columns = {}
+    for key in first:
+        if key in ("close", "category"):
+            continue
+        columns[key] = np.fromiter((results[symbol][key] for symbol in symbols), dtype=float, count=len(symbols))
+    frame = pd.DataFrame(columns, index=pd.Index(symbols, name="symbol"))
+    frame["category"] = pd.Categorical([results[symbol]["category"] for symbol in symbols])
+    return frame
+
+
+def category_summary(frame):
+    """Inversión, valor final, ganancia/pérdida, ROI y acciones por categoría
+
+    frame es un results_frame; el resultado queda indexado por categoría, en
+    el orden en que aparecen, con CATEGORY_COLUMNS.
+    """
+    if len(frame) == 0:
+        return pd.DataFrame(columns=CATEGORY_COLUMNS, index=pd.Index([], name="category"))
+    grouped = frame.reset_index().groupby("category", observed=True, sort=False)
+    summary = grouped.agg(
+        count=("symbol", "size"),
+        investment=("investment", "sum"),
+        final_value=("final_value", "sum"),
+        profit_loss=("profit_loss", "sum"),
+        stocks=("symbol", list),
+    )
+    investment = summary["investment"].to_numpy()
+    summary["roi_pct"] = np.divide(summary["profit_loss"].to_numpy() * 100, investment,
+                                   out=np.zeros(len(summary)), where=investment > 0)
+    summary.index = summary.index.astype(object)
+    return summary[CATEGORY_COLUMNS]
+
+
+def category_table(summary):
+    """Tabla de rendimiento por categoría con columnas numéricas"""
+    return pd.DataFrame({
+        '🏷️ Categoría': summary.index,
+        '📊 # Acciones': summary['count'].to_numpy(),
+        '💵 Inversión': summary['investment'].to_numpy(),
+        '💎 Valor Final': summary['final_value'].to_numpy(),
+        '💰 Ganancia/Pérdida': summary['profit_loss'].to_numpy(),
+        '📈 ROI (%)': summary['roi_pct'].to_numpy(),
+        '📋 Acciones': summary['stocks'].str.join(", ").to_numpy(),
+    })
+
+
+def results_table(frame, display_names):
+    """Tabla detallada por acción con columnas numéricas
+
+    frame es un results_frame; display_names mapea símbolo -> nombre corto.
+    """
+    symbols = frame.index.to_series()
+    names = symbols.map(display_names).fillna(symbols)
+    return pd.DataFrame({
+        '🏢 Empresa': (names + " (" + symbols + ")").to_numpy(),
+        '🏷️ Categoría': frame['category'].to_numpy(),
+        '💵 Inversión': frame['investment'].to_numpy(),
+        '📈 Precio Inicial': frame['start_price'].to_numpy(),
+        '📉 Precio Final': frame['end_price'].to_numpy(),
+        '📊 Acciones': frame['shares'].to_numpy(),
+        '💎 Valor Final': frame['final_value'].to_numpy(),
+        '💰 Ganancia/Pérdida': frame['profit_loss'].to_numpy(),
+        '📈 ROI (%)': frame['profit_loss_pct'].to_numpy(),
+        '📊 Volatilidad': frame['volatility'].to_numpy(),
+    })
+
+
+def best_and_worst(frame, column="profit_loss_pct"):
+    """Filas (Series con name = símbolo) con el mayor y el menor valor de column"""
+    return frame.nlargest(1, column).iloc[0], frame.nsmallest(1, column).iloc[0]
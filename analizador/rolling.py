@@ -0,0 +1,100 @@
+"""Métricas móviles sobre la matriz fecha × símbolo, en tiempo lineal."""
+
+import numpy as np
+import pandas as pd
+
+from analizador.metrics import TRADING_DAYS, returns_matrix
+
+# Ventanas en días de negociación que ofrece la pestaña Análisis
+ROLLING_WINDOWS = (30, 90, 252)
+
+ROLLING_METRICS = ("volatility", "sharpe", "drawdown", "return")
+
+PORTFOLIO_COLUMN = "Portfolio"
+
+
+def _window_sums(values, window):
+    """Suma de cada ventana de window filas terminada en cada fila (NaN cuenta 0)"""
+    sums = np.cumsum(np.nan_to_num(values), axis=0)
+    sums[window:] -= sums[:-window].copy()
+    return sums
+
+
+def rolling_max(values, window):
+    """Máximo de cada ventana de window filas por columna, ignorando NaN
+
+    Algoritmo de van Herk/Gil-Werman: máximos acumulados hacia adelante y
+    hacia atrás dentro de bloques de window filas, combinados con un solo
+    fmax. Son O(filas) operaciones por columna sin importar la ventana.
+    """
+    n_rows, n_cols = values.shape
+    n_blocks = -(-n_rows // window)
+    padded = np.full((n_blocks * window, n_cols), np.nan)
+    padded[:n_rows] = values
+    blocks = padded.reshape(n_blocks, window, n_cols)
+
+    prefix = np.fmax.accumulate(blocks, axis=1).reshape(-1, n_cols)[:n_rows]
+    suffix = np.fmax.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, n_cols)
+
+    result = prefix.copy()
+    if n_rows >= window:
+        result[window - 1:] = np.fmax(suffix[:n_rows - window + 1], prefix[window - 1:])
+    return result
+
+
+def rolling_metrics(prices, window, min_periods=None):
+    """Volatilidad, Sharpe, drawdown y retorno móviles de cada columna
+
+    prices es una matriz fecha × símbolo de cierres (NaN donde no cotiza).
+    Retorna un diccionario ROLLING_METRICS -> DataFrame con la misma forma;
+    una fila queda en NaN si su ventana tiene menos de min_periods retornos
+    (por defecto la mitad de la ventana). Volatilidad y retorno en %, Sharpe
+    anualizado y drawdown en % respecto del máximo de la ventana.
+    """
+    min_periods = min_periods or window // 2
+    values = prices.to_numpy(dtype=float)
+
+    returns = returns_matrix(values)
+    valid = ~np.isnan(returns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Centrar por columna antes de acumular evita cancelaciones en la varianza
+        column_mean = np.nanmean(returns, axis=0)
+        centered = returns - column_mean
+    count = _window_sums(valid.astype(float), window)
+    total = _window_sums(centered, window)
+    squares = _window_sums(centered ** 2, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (squares - total ** 2 / count) / (count - 1)
+        std = np.sqrt(np.maximum(variance, 0.0))
+        mean = total / count + column_mean
+        enough = count >= min_periods
+
+        volatility = np.where(enough, std * np.sqrt(TRADING_DAYS) * 100, np.nan)
+        sharpe = np.where(enough & (std > 0), mean / std * np.sqrt(TRADING_DAYS), np.nan)
+
+        peak = rolling_max(values, window)
+        drawdown = (values - peak) / peak * 100
+
+        filled = pd.DataFrame(values).ffill().to_numpy()
+        base = np.full_like(filled, np.nan)
+        base[window:] = filled[:-window]
+        period_return = np.where(enough, (filled / base - 1) * 100, np.nan)
+
+    return {
+        name: pd.DataFrame(data, index=prices.index, columns=prices.columns)
+        for name, data in zip(ROLLING_METRICS, (volatility, sharpe, drawdown, period_return))
+    }
+
+
+def with_portfolio(prices, shares):
+    """Agrega la columna PORTFOLIO_COLUMN con el valor diario de las posiciones
+
+    shares mapea símbolo -> cantidad de acciones. Antes de su primera
+    cotización cada posición vale su primer precio (el monto invertido) y
+    en los días sin cotización conserva el último precio conocido.
+    """
+    shares = pd.Series(shares, dtype=float).reindex(prices.columns).fillna(0.0)
+    filled = prices.ffill().bfill()
+    portfolio = filled.to_numpy(dtype=float) @ shares.to_numpy()
+    return prices.assign(**{PORTFOLIO_COLUMN: portfolio})
@@ -0,0 +1,402 @@
+"""Almacén persistente de precios OHLCV en SQLite, indexado por símbolo y fecha."""
+
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analizador.telemetry import count_cache, span
+
+# Columnas retornadas por yf.Ticker.history() y su nombre en la base de datos
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+DB_COLUMNS = ["open", "high", "low", "close", "volume", "dividends", "splits"]
+
+DATA_DIR_ENV = "ANALIZADOR_DATA_DIR"
+
+# Memoria máxima de BarCache: unos 3,5 millones de barras de 36 bytes
+INTRADAY_MEMORY_BUDGET = 128 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    fetched TEXT
+);
+"""
+
+
+def default_data_dir():
+    """Directorio de datos locales (configurable con ANALIZADOR_DATA_DIR)"""
+    return Path(os.environ.get(DATA_DIR_ENV, Path.home() / ".analizador_inversiones"))
+
+
+def to_day(value):
+    """Normaliza date, datetime o texto a un datetime.date"""
+    return pd.Timestamp(value).date()
+
+
+def uncovered_ranges(covered, start, end):
+    """Rangos [start, end) fuera del rango covered (o todo el pedido si es None)
+
+    end se limita a hoy: los días futuros no se piden al proveedor.
+    """
+    start, end = to_day(start), min(to_day(end), date.today())
+    if start >= end:
+        return []
+    if covered is None:
+        return [(start, end)]
+
+    cov_start, cov_end = covered
+    ranges = []
+    if start < cov_start:
+        ranges.append((start, cov_start))
+    if end > cov_end:
+        ranges.append((cov_end, end))
+    return ranges
+
+
+def split_factor(data, after):
+    """Producto de los splits de data (columna Stock Splits) con fecha posterior al día after
+
+    1.0 si no hay ninguno. Un split 4:1 figura como 4.0 y uno inverso 1:10 como 0.1.
+    """
+    if data is None or len(data) == 0 or "Stock Splits" not in data.columns:
+        return 1.0
+    splits = data["Stock Splits"].fillna(0.0)
+    splits = splits[(splits > 0) & (data.index > pd.Timestamp(after))]
+    return float(splits.prod()) if len(splits) else 1.0
+
+
+def compact_bars(data):
+    """Barras con HISTORY_COLUMNS en float32, índice ordenado y sin duplicados
+
+    float32 conserva 7 cifras significativas, de sobra para precios y
+    volúmenes, y ocupa la mitad que float64. El índice se reconstruye para
+    no arrastrar la tabla de búsqueda que pandas crea al detectar duplicados.
+    """
+    data = data[~data.index.duplicated(keep="last")].sort_index()
+    values = data.reindex(columns=HISTORY_COLUMNS).to_numpy(dtype=np.float32)
+    index = pd.DatetimeIndex(data.index.to_numpy(dtype="datetime64[ns]"), name="Date")
+    return pd.DataFrame(values, index=index, columns=HISTORY_COLUMNS)
+
+
+def group_missing(symbols, missing_ranges):
+    """Agrupa los símbolos por rango faltante para pedir cada rango una sola vez"""
+    pending = {}
+    for symbol in symbols:
+        for missing in missing_ranges(symbol):
+            pending.setdefault(missing, []).append(symbol)
+    return pending
+
+
+class PriceStore:
+    """Precios diarios persistidos localmente con relleno incremental de rangos
+
+    Para cada símbolo se guarda el rango [start, end) ya consultado al proveedor
+    (end exclusivo, como en yfinance) y el día de la última descarga. Un rango
+    pedido se sirve desde disco y solo se descargan los días faltantes.
+
+    Yahoo Finance ajusta hacia atrás toda la historia por cada split, así que
+    las filas guardadas están en la base del día en que se descargaron. Para
+    no mezclar bases, los días faltantes al final se piden hasta hoy y, si
+    traen splits posteriores a la última descarga, las filas guardadas se
+    dividen por el factor del split; un hueco al inicio se pide junto con todo
+    lo guardado hasta hoy, que se reemplaza.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_data_dir() / "prices.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(coverage)")]
+            if "fetched" not in columns:
+                # Almacenes anteriores: se toma el fin del rango como día de la descarga
+                conn.execute("ALTER TABLE coverage ADD COLUMN fetched TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def coverage(self, symbol):
+        """Rango (start, end) ya consultado para un símbolo, o None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT start, end FROM coverage WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        if row is None:
+            return None
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+
+    def missing_ranges(self, symbol, start, end):
+        """Rangos [start, end) que faltan localmente para cubrir el pedido
+
+        Con días ya guardados, el rango faltante se extiende hasta hoy para
+        ver todos los splits posteriores a la última descarga (ver write).
+        """
+        covered = self.coverage(symbol)
+        ranges = uncovered_ranges(covered, start, end)
+        if covered is None or not ranges:
+            return ranges
+        return [(ranges[0][0], date.today())]
+
+    def write(self, symbol, data, start, end):
+        """Guarda filas descargadas y extiende el rango cubierto del símbolo
+
+        Las filas guardadas anteriores a start se pasan a la base de data:
+        se dividen por los splits de data posteriores a la última descarga.
+        """
+        start, end = to_day(start), to_day(end)
+        rows = []
+        if data is not None and len(data) > 0:
+            frame = data.reindex(columns=HISTORY_COLUMNS)
+            days = pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d")
+            values = frame.to_numpy(dtype=float)
+            rows = [
+                (symbol, day, *[None if pd.isna(v) else float(v) for v in row])
+                for day, row in zip(days, values)
+            ]
+
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT start, end, fetched FROM coverage WHERE symbol = ?", (symbol,)
+            ).fetchone()
+            if row is not None:
+                factor = split_factor(data, date.fromisoformat(row[2] or row[1]))
+                if factor != 1.0:
+                    conn.execute(
+                        "UPDATE prices SET open = open / ?, high = high / ?, low = low / ?, close = close / ?, "
+                        "dividends = dividends / ?, volume = volume * ? WHERE symbol = ? AND date < ?",
+                        (factor,) * 6 + (symbol, start.isoformat())
+                    )
+                start = min(start, date.fromisoformat(row[0]))
+                end = max(end, date.fromisoformat(row[1]))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO prices (symbol, date, {', '.join(DB_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(DB_COLUMNS))})",
+                rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage (symbol, start, end, fetched) VALUES (?, ?, ?, ?)",
+                (symbol, start.isoformat(), end.isoformat(), date.today().isoformat())
+            )
+
+    def read(self, symbol, start, end):
+        """Lee los precios locales de [start, end) con las columnas de history()"""
+        with self._connect() as conn:
+            data = pd.read_sql_query(
+                f"SELECT date, {', '.join(DB_COLUMNS)} FROM prices "
+                "WHERE symbol = ? AND date >= ? AND date < ? ORDER BY date",
+                conn,
+                params=(symbol, to_day(start).isoformat(), to_day(end).isoformat()),
+                parse_dates=["date"],
+                index_col="date"
+            )
+        if len(data) == 0:
+            return None
+        data.columns = HISTORY_COLUMNS
+        data.index.name = "Date"
+        return data
+
+    def get_history(self, symbols, start, end, fetch_batch):
+        """Sirve varios símbolos desde disco, descargando solo los días faltantes
+
+        fetch_batch(symbols, start, end) debe retornar (datos, errores), donde
+        errores contiene solo fallos reales: un símbolo ausente de ambos
+        diccionarios se considera consultado sin datos en ese rango.
+        Retorna (datos, errores) con el mismo formato.
+        """
+        symbols = list(dict.fromkeys(symbols))
+
+        # Agrupar símbolos con el mismo rango faltante en una sola descarga
+        pending = group_missing(symbols, lambda symbol: self.missing_ranges(symbol, start, end))
+        fetched_count = len({symbol for group in pending.values() for symbol in group})
+        count_cache("prices", hits=len(symbols) - fetched_count, misses=fetched_count)
+
+        errors = {}
+        for (range_start, range_end), group in pending.items():
+            fetched, fetch_errors = fetch_batch(tuple(group), range_start, range_end)
+            for symbol in group:
+                if symbol in fetch_errors:
+                    errors[symbol] = fetch_errors[symbol]
+                else:
+                    self.write(symbol, fetched.get(symbol), range_start, range_end)
+
+        datasets = {}
+        with span("store_read", symbols=len(symbols)):
+            for symbol in symbols:
+                data = self.read(symbol, start, end)
+                if data is not None:
+                    datasets[symbol] = data
+        return datasets, errors
+
+
+class BarCache:
+    """Barras intradiarias en memoria, con un presupuesto fijo de bytes
+
+    Yahoo Finance solo ofrece las barras intradiarias de las últimas semanas,
+    por lo que no se guardan en disco. Por (símbolo, intervalo) se conserva un
+    DataFrame compacto (ver compact_bars) y el rango ya consultado;
+    como en PriceStore, solo se piden los días faltantes. Si la memoria supera
+    budget_bytes se descartan los símbolos usados hace más tiempo.
+    """
+
+    def __init__(self, budget_bytes=INTRADAY_MEMORY_BUDGET):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por las barras guardadas (datos e índice)"""
+        return sum(nbytes for _, _, nbytes in self._entries.values())
+
+    def missing_ranges(self, symbol, interval, start, end):
+        entry = self._entries.get((symbol, interval))
+        return uncovered_ranges(entry[1] if entry else None, start, end)
+
+    def _write(self, symbol, interval, data, start, end):
+        with self._lock:
+            stored, covered, _ = self._entries.pop((symbol, interval), (None, None, 0))
+            if covered is not None:
+                start, end = min(start, covered[0]), max(end, covered[1])
+            if stored is not None and data is not None:
+                data = compact_bars(pd.concat([stored, data]))
+            elif data is None:
+                data = stored
+            nbytes = 0 if data is None else int(data.memory_usage(index=True).sum())
+            self._entries[(symbol, interval)] = (data, (start, end), nbytes)
+
+            total = sum(entry[2] for entry in self._entries.values())
+            while total > self.budget_bytes and len(self._entries) > 1:
+                total -= self._entries.popitem(last=False)[1][2]
+
+    def get_history(self, symbols, start, end, interval, fetch_batch):
+        """Como PriceStore.get_history para barras del intervalo dado
+
+        fetch_batch(symbols, start, end, interval) retorna (datos, errores).
+        Las barras de un día se incluyen si el día está en [start, end).
+        """
+        symbols = list(dict.fromkeys(symbols))
+        pending = group_missing(symbols, lambda symbol: self.missing_ranges(symbol, interval, start, end))
+        fetched_count = len({symbol for group in pending.values() for symbol in group})
+        count_cache("bars", hits=len(symbols) - fetched_count, misses=fetched_count)
+
+        errors = {}
+        for (range_start, range_end), group in pending.items():
+            fetched, fetch_errors = fetch_batch(tuple(group), range_start, range_end, interval)
+            for symbol in group:
+                if symbol in fetch_errors:
+                    errors[symbol] = fetch_errors[symbol]
+                else:
+                    self._write(symbol, interval, fetched.get(symbol), range_start, range_end)
+
+        first, last = pd.Timestamp(to_day(start)), pd.Timestamp(to_day(end))
+        datasets = {}
+        with self._lock:
+            for symbol in symbols:
+                key = (symbol, interval)
+                if key not in self._entries or self._entries[key][0] is None:
+                    continue
+                self._entries.move_to_end(key)
+                data = self._entries[key][0]
+                data = data[(data.index >= first) & (data.index < last)]
+                if len(data) > 0:
+                    datasets[symbol] = data
+        return datasets, errors
+
+
+class SharedCloses:
+    """Precios de cierre de solo lectura compartidos por todo el proceso
+
+    Guarda por símbolo un único par de arreglos contiguos (fechas y cierres)
+    que cubre todos los rangos pedidos. Cada resultado recibe una Series que
+    es una vista sobre esos arreglos, por lo que sesiones que analizan el
+    mismo símbolo comparten la memoria en lugar de copiar el DataFrame
+    completo. Si un rango nuevo extiende el guardado, los arreglos se
+    reemplazan y las vistas entregadas antes siguen siendo válidas. Si en
+    los días en común los cierres nuevos difieren de los guardados (precios
+    corregidos o pasados a otra base por un split), lo guardado se descarta
+    y los arreglos se arman solo con los nuevos.
+
+    Cada share cuenta un uso de la clave hasta el release correspondiente;
+    al soltar el último uso los arreglos se descartan (las vistas entregadas
+    siguen siendo válidas, solo dejan de compartirse).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arrays = {}
+        self._users = Counter()
+
+    def __len__(self):
+        return len(self._arrays)
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arreglos guardados"""
+        return sum(dates.nbytes + close.nbytes for dates, close in self._arrays.values())
+
+    @staticmethod
+    def _agrees(arrays, close):
+        """True si close tiene las mismas fechas y cierres que arrays en el tramo que comparten"""
+        dates, values = arrays
+        first, last = close.index[0].to_datetime64(), close.index[-1].to_datetime64()
+        i, j = dates.searchsorted(first), dates.searchsorted(last, side="right")
+        overlap = close[(close.index >= pd.Timestamp(dates[0])) & (close.index <= pd.Timestamp(dates[-1]))]
+        return (np.array_equal(dates[i:j], overlap.index.to_numpy(dtype="datetime64[ns]"))
+                and np.array_equal(values[i:j], overlap.to_numpy(dtype=float)))
+
+    def share(self, symbol, data):
+        """Series de cierres de data (DataFrame con Close) respaldada por la copia compartida"""
+        close = data['Close'].dropna()
+        with self._lock:
+            self._users[symbol] += 1
+        if len(close) == 0:
+            return close
+        first, last = close.index[0].to_datetime64(), close.index[-1].to_datetime64()
+
+        with self._lock:
+            arrays = self._arrays.get(symbol)
+            if arrays is not None and not self._agrees(arrays, close):
+                arrays = None
+            if arrays is None or arrays[0][0] > first or arrays[0][-1] < last:
+                if arrays is not None:
+                    stored = pd.Series(arrays[1], index=pd.DatetimeIndex(arrays[0]))
+                    close = close.combine_first(stored)
+                dates = np.ascontiguousarray(close.index.to_numpy(dtype="datetime64[ns]"))
+                values = np.ascontiguousarray(close.to_numpy(dtype=float))
+                dates.flags.writeable = False
+                values.flags.writeable = False
+                arrays = self._arrays[symbol] = (dates, values)
+
+        dates, values = arrays
+        i, j = dates.searchsorted(first), dates.searchsorted(last, side="right")
+        return pd.Series(values[i:j], index=pd.DatetimeIndex(dates[i:j], name="Date"),
+                         name="Close", copy=False)
+
+    def release(self, symbol):
+        """Descuenta un uso de symbol; sin usos, descarta sus arreglos"""
+        with self._lock:
+            self._users[symbol] -= 1
+            if self._users[symbol] <= 0:
+                del self._users[symbol]
+                self._arrays.pop(symbol, None)
@@ -0,0 +1,200 @@
+"""Tiempos por etapa y aciertos de caché, con registro JSON y texto para Prometheus."""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TIMING_LOG_ENV = "ANALIZADOR_TIMING_LOG"
+METRICS_PORT_ENV = "ANALIZADOR_METRICS_PORT"
+
+# Etapas recientes que se conservan para el panel y la exportación JSON
+MAX_RECENT_SPANS = 500
+
+METRIC_PREFIX = "analizador"
+
+logger = logging.getLogger("analizador.telemetry")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _stage_labels(stage):
+    labels = f'stage="{_label(stage["stage"])}"'
+    if stage["name"] is not None:
+        labels += f',name="{_label(stage["name"])}"'
+    return labels
+
+
+class Telemetry:
+    """Registro de tiempos y aciertos de caché compartido por el proceso
+
+    Cada etapa se agrega por (etapa, nombre) con cantidad, tiempo total,
+    máximo y último; los detalles de cada medición (símbolos, intervalo...)
+    solo van al registro JSON y a las mediciones recientes, para no crear
+    una serie de Prometheus por símbolo.
+    """
+
+    def __init__(self, max_recent=MAX_RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._caches = {}
+        self._recent = deque(maxlen=max_recent)
+        self.started = time.time()
+
+    @contextmanager
+    def span(self, stage, name=None, **details):
+        """Mide el bloque como una ejecución de la etapa, aun si lanza una excepción"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, name, **details)
+
+    def record(self, stage, seconds, name=None, **details):
+        """Agrega una medición de seconds segundos a la etapa"""
+        entry = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 6)}
+        if name is not None:
+            entry["name"] = name
+        entry.update(details)
+        entry["thread"] = threading.current_thread().name
+        with self._lock:
+            count, total, maximum, _ = self._stages.get((stage, name), (0, 0.0, 0.0, 0.0))
+            self._stages[(stage, name)] = (count + 1, total + seconds, max(maximum, seconds), seconds)
+            self._recent.append(entry)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "span", **entry}, ensure_ascii=False, default=str))
+
+    def count_cache(self, cache, hits=0, misses=0):
+        """Suma aciertos y fallos de una caché"""
+        if not hits and not misses:
+            return
+        with self._lock:
+            cache_hits, cache_misses = self._caches.get(cache, (0, 0))
+            self._caches[cache] = (cache_hits + hits, cache_misses + misses)
+
+    def stages(self):
+        """Lista de dicts por etapa: stage, name, count, total, mean, max y last (segundos)"""
+        with self._lock:
+            items = list(self._stages.items())
+        return [
+            {"stage": stage, "name": name, "count": count, "total": total,
+             "mean": total / count, "max": maximum, "last": last}
+            for (stage, name), (count, total, maximum, last) in sorted(items, key=lambda item: -item[1][1])
+        ]
+
+    def caches(self):
+        """Lista de dicts por caché: cache, hits, misses y hit_ratio"""
+        with self._lock:
+            items = sorted(self._caches.items())
+        return [{"cache": cache, "hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses)}
+                for cache, (hits, misses) in items]
+
+    def recent(self, limit=None):
+        """Mediciones más recientes primero"""
+        with self._lock:
+            entries = list(self._recent)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def json_lines(self):
+        """Mediciones recientes como JSON por línea, de la más antigua a la más nueva"""
+        return "\n".join(json.dumps(entry, ensure_ascii=False, default=str)
+                         for entry in reversed(self.recent())) + "\n"
+
+    def prometheus_text(self):
+        """Tiempos y cachés en el formato de texto de Prometheus"""
+        prefix = METRIC_PREFIX
+        stages = [(_stage_labels(stage), stage) for stage in self.stages()]
+        lines = [
+            f"# HELP {prefix}_stage_seconds Tiempo de cada etapa del análisis",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for labels, stage in stages:
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {stage['count']}")
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {stage['total']:.6f}")
+        lines += [
+            f"# HELP {prefix}_stage_seconds_max Máximo tiempo de cada etapa",
+            f"# TYPE {prefix}_stage_seconds_max gauge",
+        ]
+        lines += [f"{prefix}_stage_seconds_max{{{labels}}} {stage['max']:.6f}" for labels, stage in stages]
+        lines += [
+            f"# HELP {prefix}_cache_requests_total Consultas a cada caché por resultado",
+            f"# TYPE {prefix}_cache_requests_total counter",
+        ]
+        for cache in self.caches():
+            name = _label(cache["cache"])
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="hit"}} {cache["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{cache="{name}",result="miss"}} {cache["misses"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._caches.clear()
+            self._recent.clear()
+            self.started = time.time()
+
+
+TELEMETRY = Telemetry()
+
+
+def span(stage, name=None, **details):
+    """TELEMETRY.span: mide un bloque con with span("etapa"):"""
+    return TELEMETRY.span(stage, name, **details)
+
+
+def count_cache(cache, hits=0, misses=0):
+    TELEMETRY.count_cache(cache, hits, misses)
+
+
+def configure_timing_log(destination=None):
+    """Escribe cada medición como una línea JSON en destination ("-" es stderr)
+
+    Por defecto se toma de ANALIZADOR_TIMING_LOG; sin destino no hace nada.
+    Retorna el handler agregado, o None.
+    """
+    destination = destination or os.environ.get(TIMING_LOG_ENV)
+    if not destination:
+        return None
+    handler = logging.StreamHandler() if destination == "-" else logging.FileHandler(destination, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+
+def serve_metrics(port=None, telemetry=TELEMETRY):
+    """Sirve telemetry.prometheus_text() en http://0.0.0.0:<port>/metrics desde un hilo aparte
+
+    Por defecto el puerto se toma de ANALIZADOR_METRICS_PORT; sin puerto no
+    hace nada. Retorna el servidor iniciado, o None.
+    """
+    port = port or os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,192 @@
+"""Precarga en segundo plano de precios, métricas e información de las acciones más usadas."""
+
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from analizador.catalog import DATE_PRESETS, DEFAULT_STOCKS, preset_range
+from analizador.fetch import DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT
+from analizador.fx import DEFAULT_CURRENCY, CurrencyConverter
+from analizador.store import to_day
+
+WARMER_ENV = "ANALIZADOR_WARMER"
+
+# La precarga corre todos los días media hora después del cierre de la bolsa de Nueva York
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+WARM_HOUR, WARM_MINUTE = 16, 30
+
+# Acciones personalizadas más pedidas que se precargan además de las por defecto
+MAX_POPULAR_SYMBOLS = 50
+
+logger = logging.getLogger("analizador.warmer")
+
+
+def next_warm_time(now=None):
+    """Próxima precarga (con zona horaria) posterior a now"""
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    candidate = now.replace(hour=WARM_HOUR, minute=WARM_MINUTE, second=0, microsecond=0)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+def warm_periods(now=None):
+    """Rangos (inicio, fin) por día de los períodos predefinidos de hoy y de mañana
+
+    Los de mañana quedan listos para quien calcule antes de la próxima precarga.
+    """
+    now = now or datetime.now()
+    periods = {}
+    for day in (now, now + timedelta(days=1)):
+        for preset in DATE_PRESETS:
+            start, end = preset_range(preset, day)
+            periods[(to_day(start), to_day(end))] = None
+    return list(periods)
+
+
+class CacheWarmer:
+    """Mantiene precargados el almacén de precios, MetricsCache y el de metadatos
+
+    Cubre las acciones por defecto, las fijadas con pin (las de presets
+    guardados) y las MAX_POPULAR_SYMBOLS más pedidas según record, para todos
+    los períodos predefinidos. Corre en un hilo del proceso del servidor al
+    iniciar y después de cada cierre del mercado; trigger adelanta la
+    próxima corrida. Las descargas pasan por el proveedor dado (normalmente
+    un FetchGateway), por lo que respetan su límite de tasa. Las métricas se
+    precargan en DEFAULT_CURRENCY. Una corrida que falla se registra en el
+    log y en status["failure"] sin detener las siguientes.
+    """
+
+    def __init__(self, provider, store, metadata, metrics_cache,
+                 max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.provider = provider
+        self.store = store
+        self.metadata = metadata
+        self.metrics_cache = metrics_cache
+        self.converter = CurrencyConverter(store, provider.history_batch, metadata)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._pinned = set()
+        self._hits = 0
+        self._misses = 0
+        self._status = {"running": False, "completed": 0, "total": 0, "symbols": 0,
+                        "errors": 0, "failure": None, "last_run": None, "next_run": None}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, symbols, missing):
+        """Registra un análisis de symbols en el que missing no estaban precargados"""
+        with self._lock:
+            self._requests.update(symbols)
+            self._misses += len(missing)
+            self._hits += len(symbols) - len(missing)
+
+    def pin(self, symbols):
+        """Agrega símbolos que se precargan siempre, como los de un preset guardado"""
+        with self._lock:
+            self._pinned.update(symbols)
+
+    def targets(self):
+        """Símbolos a precargar: por defecto, fijados y los más pedidos"""
+        with self._lock:
+            popular = [symbol for symbol, _ in self._requests.most_common(MAX_POPULAR_SYMBOLS)]
+            pinned = sorted(self._pinned)
+        defaults = [data["symbol"] for data in DEFAULT_STOCKS.values()]
+        return list(dict.fromkeys(defaults + pinned + popular))
+
+    @property
+    def hit_ratio(self):
+        """Fracción de acciones analizadas cuyas métricas ya estaban guardadas (None sin análisis)"""
+        with self._lock:
+            total = self._hits + self._misses
+            return self._hits / total if total else None
+
+    @property
+    def status(self):
+        """Progreso de la precarga en curso o de la última"""
+        with self._lock:
+            return {**self._status, "hits": self._hits, "misses": self._misses}
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _step(self):
+        with self._lock:
+            self._status["completed"] += 1
+
+    def run_once(self, now=None):
+        """Precarga precios, métricas e información de targets() para los períodos predefinidos"""
+        symbols = self.targets()
+        periods = warm_periods(now)
+        self._update(running=True, completed=0, total=len(periods) + 2, symbols=len(symbols), errors=0,
+                     failure=None)
+        try:
+            # Una sola descarga cubre el rango más amplio; cada período se lee luego del disco
+            first = min(start for start, _ in periods)
+            last = max(end for _, end in periods)
+            _, errors = self.store.get_history(symbols, first, last, self.provider.history_batch)
+            self._step()
+
+            # La moneda de cada acción tiene que conocerse antes de calcular sus métricas
+            pending = [symbol for symbol in symbols if symbol not in self.metadata]
+            pending += [symbol for symbol in self.metadata.stale_symbols(symbols) if symbol in self.metadata]
+            info_errors = self.metadata.refresh(pending, self.provider.info,
+                                                max_workers=self.max_workers, timeout=self.timeout)
+            self._step()
+
+            for start, end in periods:
+                cached = self.metrics_cache.missing(symbols, start, end, currency=DEFAULT_CURRENCY)
+                missing = [symbol for symbol in cached if symbol not in errors]
+                if missing:
+                    datasets, _ = self.store.get_history(missing, start, end, self.provider.history_batch)
+                    datasets, fx_errors = self.converter.convert(datasets, DEFAULT_CURRENCY, start, end)
+                    errors.update(fx_errors)
+                    self.metrics_cache.add(datasets, start, end, currency=DEFAULT_CURRENCY)
+                self._step()
+            self._update(errors=len(set(errors) | set(info_errors)))
+        finally:
+            self._update(running=False, last_run=datetime.now(MARKET_TIMEZONE))
+
+    def _run_logged(self):
+        """run_once registrando en el log y en el estado el error de una corrida fallida"""
+        try:
+            self.run_once()
+        except Exception as error:
+            logger.exception("Falló la precarga")
+            self._update(failure=f"{type(error).__name__}: {error}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Una precarga fallida no detiene las siguientes
+            self._run_logged()
+            next_run = next_warm_time()
+            self._update(next_run=next_run)
+            self._wake.wait(timeout=(next_run - datetime.now(MARKET_TIMEZONE)).total_seconds())
+            self._wake.clear()
+
+    def start(self):
+        """Inicia el hilo de precarga si no está corriendo (y ANALIZADOR_WARMER no es 0)"""
+        if os.environ.get(WARMER_ENV, "1") == "0":
+            return None
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def trigger(self):
+        """Adelanta la próxima precarga; sin hilo, la corre en uno aparte"""
+        if self._thread is not None and self._thread.is_alive():
+            self._wake.set()
+        elif not self._status["running"]:
+            threading.Thread(target=self._run_logged, name="cache-warmer-once", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
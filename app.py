@@ -1,10 +1,30 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
-import numpy as np
+import re
+import threading
+import time
+from functools import partial
+from pathlib import Path
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from analizador.backtest import DEFAULT_THRESHOLD, run_backtest
+from analizador.catalog import DATE_PRESETS, DEFAULT_STOCKS, PREDEFINED_CATEGORIES, preset_range, stock_category
+from analizador.correlation import CorrelationCache, category_blocks, cluster_order
+from analizador.engine import MetricsCache, close_matrix, load_history, open_metadata_store, open_store
+from analizador.fetch import DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT, run_concurrently
+from analizador.fx import BASE_CURRENCIES, DEFAULT_CURRENCY, CurrencyConverter, format_money, money_prefix
+from analizador.gateway import FetchGateway
+from analizador.holdings import read_holdings, validate_symbols
+from analizador.intervals import DEFAULT_INTERVAL, INTERVALS, daily_closes, earliest_start, is_intraday, periods_per_year
+from analizador.metrics import RETURN_BASES, build_price_matrix, total_return_closes
+from analizador.montecarlo import fan_percentiles, outcome_summary, simulate_portfolio
+from analizador.optimizer import MeanVarianceOptimizer
+from analizador.providers import BATCH_DOWNLOAD_SIZE, create_provider, info_record
+from analizador.report import best_and_worst, category_summary, category_table, results_frame, results_table
+from analizador.rolling import PORTFOLIO_COLUMN, ROLLING_WINDOWS, rolling_metrics, with_portfolio
+from analizador.store import BarCache, SharedCloses, to_day
+from analizador.telemetry import TELEMETRY, configure_timing_log, serve_metrics, span
+from analizador.warmer import CacheWarmer
 
 # ============= CONFIGURACIÓN DE LA PÁGINA =============
 st.set_page_config(
@@ -15,192 +35,16 @@ st.set_page_config(
 )
 
 # ============= CSS MEJORADO =============
-st.markdown("""
-<style>
-    /* Estilo principal */
-    .main-header {
-        text-align: center;
-        padding: 1.5rem 0;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        font-size: 2.8rem;
-        font-weight: bold;
-        margin-bottom: 0.5rem;
-    }
-    
-    .subtitle {
-        text-align: center;
-        color: #666;
-        font-size: 1.2rem;
-        margin-bottom: 2rem;
-        font-style: italic;
-    }
-    
-    /* Tarjetas de métricas mejoradas */
-    .metric-card {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        border-left: 5px solid #667eea;
-        margin: 0.5rem 0;
-    }
-    
-    .metric-positive {
-        border-left: 5px solid #00c851;
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-    }
-    
-    .metric-negative {
-        border-left: 5px solid #ff4444;
-        background: linear-gradient(135deg, #f8d7da 0%, #f1b0b7 100%);
-    }
-    
-    /* Sidebar mejorado */
-    .sidebar-section {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-        border: 1px solid #e9ecef;
-    }
-    
-    /* Botones de acción rápida */
-    .quick-action-btn {
-        background: linear-gradient(45deg, #667eea, #764ba2);
-        color: white;
-        padding: 0.5rem 1rem;
-        border-radius: 25px;
-        border: none;
-        font-weight: bold;
-        cursor: pointer;
-        margin: 0.2rem;
-        transition: all 0.3s ease;
-    }
-    
-    .quick-action-btn:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-    }
-    
-    /* Categorías con colores */
-    .category-tech { background: linear-gradient(45deg, #4285f4, #34a853); }
-    .category-fintech { background: linear-gradient(45deg, #ff6b35, #f7931e); }
-    .category-crypto { background: linear-gradient(45deg, #f7931e, #ffcd02); }
-    .category-health { background: linear-gradient(45deg, #ea4335, #fbbc04); }
-    .category-consumer { background: linear-gradient(45deg, #34a853, #0f9d58); }
-    .category-auto { background: linear-gradient(45deg, #4285f4, #0066cc); }
-    
-    /* Alertas mejoradas */
-    .success-alert {
-        background: linear-gradient(90deg, #d4edda, #c3e6cb);
-        border: 1px solid #c3e6cb;
-        border-radius: 10px;
-        padding: 1rem;
-        color: #155724;
-    }
-    
-    .warning-alert {
-        background: linear-gradient(90deg, #fff3cd, #ffeaa7);
-        border: 1px solid #ffeaa7;
-        border-radius: 10px;
-        padding: 1rem;
-        color: #856404;
-    }
-    
-    .error-alert {
-        background: linear-gradient(90deg, #f8d7da, #f5c6cb);
-        border: 1px solid #f5c6cb;
-        border-radius: 10px;
-        padding: 1rem;
-        color: #721c24;
-    }
-    
-    /* Tablas mejoradas */
-    .dataframe {
-        border-radius: 10px;
-        overflow: hidden;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Loading spinner personalizado */
-    .stSpinner > div {
-        border-top-color: #667eea !important;
-    }
-    
-    /* Tooltips mejorados */
-    .tooltip {
-        position: relative;
-        display: inline-block;
-        cursor: help;
-    }
-    
-    .tooltip .tooltiptext {
-        visibility: hidden;
-        width: 200px;
-        background-color: #555;
-        color: white;
-        text-align: center;
-        border-radius: 6px;
-        padding: 5px;
-        position: absolute;
-        z-index: 1;
-        bottom: 125%;
-        left: 50%;
-        margin-left: -100px;
-        opacity: 0;
-        transition: opacity 0.3s;
-    }
-    
-    .tooltip:hover .tooltiptext {
-        visibility: visible;
-        opacity: 1;
-    }
-    
-    /* Navegación por tabs */
-    .tab-nav {
-        display: flex;
-        background: #f8f9fa;
-        border-radius: 10px;
-        padding: 0.5rem;
-        margin: 1rem 0;
-    }
-    
-    .tab-item {
-        flex: 1;
-        text-align: center;
-        padding: 0.8rem;
-        background: transparent;
-        border: none;
-        border-radius: 8px;
-        cursor: pointer;
-        transition: all 0.3s ease;
-    }
-    
-    .tab-item.active {
-        background: linear-gradient(45deg, #667eea, #764ba2);
-        color: white;
-    }
-    
-    /* Animaciones sutiles */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .fade-in {
-        animation: fadeIn 0.6s ease-out;
-    }
-    
-    /* Responsive design */
-    @media (max-width: 768px) {
-        .main-header { font-size: 2rem; }
-        .metric-card { padding: 1rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_styles():
+    """Lee y minifica la hoja de estilos una sola vez por proceso"""
+    css = (Path(__file__).parent / "assets" / "styles.css").read_text(encoding="utf-8")
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+st.markdown(load_styles(), unsafe_allow_html=True)
 
 # ============= FUNCIONES DE UTILIDAD MEJORADAS =============
 
@@ -242,169 +86,410 @@ def initialize_session_state():
         'removed_default_stocks': set(),
         'stock_categories': {},
         'custom_categories': set(),
-        'current_view': 'portfolio',  # portfolio, analysis, settings
+        'current_view': 'portfolio',  # portfolio, analysis, settings, help
         'show_tutorial': True,
         'last_calculation': None,
         'favorite_stocks': set(),
-        'investment_presets': {}
+        'investment_presets': {},
+        'fetch_max_workers': DEFAULT_MAX_WORKERS,
+        'fetch_timeout': DEFAULT_TIMEOUT,
+        'show_performance': False,
+        'return_basis': 'price',
+        'base_currency': DEFAULT_CURRENCY
     }
     
     for key, default_value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = default_value
 
-initialize_session_state()
+def persist_setting(key):
+    """Guarda el valor de un widget de configuración fuera de su clave de widget
 
-# ============= DATOS Y CONFIGURACIÓN =============
-DEFAULT_STOCKS = {
-    "NU Holdings (Nu Bank)": {"symbol": "NU", "category": "🏦 Fintech"},
-    "NVIDIA Corporation": {"symbol": "NVDA", "category": "💻 Tecnología"}, 
-    "Apple Inc.": {"symbol": "AAPL", "category": "💻 Tecnología"},
-    "Alphabet Inc. (Google)": {"symbol": "GOOGL", "category": "💻 Tecnología"},
-    "Meta Platforms (Facebook)": {"symbol": "META", "category": "💻 Tecnología"},
-    "Microsoft Corporation": {"symbol": "MSFT", "category": "💻 Tecnología"},
-    "Amazon.com Inc.": {"symbol": "AMZN", "category": "🛒 E-commerce"},
-    "Tesla Inc.": {"symbol": "TSLA", "category": "🚗 Automotriz"},
-    "Netflix Inc.": {"symbol": "NFLX", "category": "🎬 Entretenimiento"},
-    "PayPal Holdings": {"symbol": "PYPL", "category": "🏦 Fintech"},
-    "Coca-Cola Company": {"symbol": "KO", "category": "🥤 Consumo"},
-    "Johnson & Johnson": {"symbol": "JNJ", "category": "💊 Salud"}
-}
+    Los widgets de vistas no mostradas se eliminan del estado de sesión, por lo
+    que cada ajuste se conserva en su propia clave.
+    """
+    st.session_state[key] = st.session_state[f"_{key}"]
+
+def change_return_basis():
+    """Guarda la base de retorno elegida; la simulación y el backtest se rehacen con ella"""
+    st.session_state.return_basis = RETURN_BASIS_LABELS[st.session_state._return_basis]
+    st.session_state.montecarlo = None
+    st.session_state.backtest = None
 
-PREDEFINED_CATEGORIES = [
-    "💻 Tecnología", "🏦 Fintech", "🪙 Criptomonedas", "📈 ETFs",
-    "🚗 Automotriz", "💊 Salud", "🥤 Consumo", "🎬 Entretenimiento",
-    "🛒 E-commerce", "🏭 Industrial", "🏠 Inmobiliario", "⚡ Energía",
-    "📊 Índices", "💎 Materias Primas", "🌿 ESG/Sustentable"
-]
+initialize_session_state()
 
 # ============= FUNCIONES PRINCIPALES =============
 
-@st.cache_data(ttl=3600)
+@st.cache_resource
+def get_market_provider():
+    """Proveedor de datos de mercado (ANALIZADOR_PROVIDER, yfinance por defecto)
+
+    Pasa por un FetchGateway compartido por todas las sesiones: las descargas
+    iguales en curso se hacen una vez, con límite de tasa, reintentos y
+    cortocircuito si el proveedor falla.
+    """
+    return FetchGateway(create_provider())
+
 def validate_stock_symbol(symbol):
-    """Valida símbolo de acción con mejor manejo de errores"""
+    """Valida símbolo de acción con mejor manejo de errores
+
+    Un símbolo ya presente en el almacén de metadatos es válido sin consultar
+    la red; si no, la información obtenida se guarda para el análisis.
+    """
+    info = get_metadata_store().get(symbol)
+    if info is not None:
+        return True, info['name']
     try:
-        stock = yf.Ticker(symbol.upper())
-        info = stock.info
-        if 'symbol' in info or 'shortName' in info:
-            return True, info.get('shortName', symbol.upper())
-        return False, None
+        info = get_market_provider().info(symbol)
     except Exception as e:
         return False, str(e)
+    get_metadata_store().put(symbol, info)
+    return True, info['name']
 
-@st.cache_data(ttl=3600)
-def get_stock_data(symbol, start, end):
-    """Obtiene datos históricos con manejo mejorado de errores"""
-    try:
-        stock = yf.Ticker(symbol)
-        data = stock.history(start=start, end=end, interval="1d")
-        if len(data) == 0:
-            return None
-        return data
-    except Exception as e:
-        st.error(f"❌ Error obteniendo datos para {symbol}: {str(e)}")
-        return None
+@st.cache_resource
+def get_price_store():
+    """Almacén local de precios compartido por todas las sesiones"""
+    return open_store(get_market_provider())
+
+@st.cache_resource
+def get_bar_cache():
+    """Barras intradiarias en memoria compartidas por todas las sesiones, con memoria acotada"""
+    return BarCache()
+
+@st.cache_resource
+def get_shared_closes():
+    """Cierres de solo lectura compartidos por los resultados de todas las sesiones"""
+    return SharedCloses()
+
+@st.cache_resource
+def get_metrics_cache():
+    """Métricas por acción y período compartidas por todas las sesiones
+
+    Recalcular con otros montos solo escala las métricas ya guardadas.
+    """
+    return MetricsCache(get_shared_closes())
+
+@st.cache_resource
+def get_correlation_cache():
+    """Matrices de correlación por conjunto de acciones y período compartidas por todas las sesiones
+
+    Agregar o quitar una acción del análisis actualiza la matriz guardada más
+    parecida en lugar de recalcularla.
+    """
+    return CorrelationCache()
+
+@st.cache_resource
+def start_telemetry_exports():
+    """Registro JSON de tiempos (ANALIZADOR_TIMING_LOG) y endpoint /metrics (ANALIZADOR_METRICS_PORT)
+
+    Retorna el servidor de métricas, o None si no se configuró un puerto.
+    """
+    configure_timing_log()
+    return serve_metrics()
+
+@st.cache_resource
+def get_cache_warmer():
+    """Precarga en segundo plano, compartida por todas las sesiones
+
+    Se inicia con el primer acceso al servidor y luego corre después de cada
+    cierre del mercado (ver CacheWarmer).
+    """
+    warmer = CacheWarmer(get_market_provider(), get_price_store(), get_metadata_store(), get_metrics_cache())
+    warmer.start()
+    return warmer
+
+def get_stocks_data_batch(symbols, start, end, interval=DEFAULT_INTERVAL):
+    """Obtiene datos históricos de varios símbolos desde el almacén local
+
+    Solo los días que faltan localmente se piden al proveedor, por lo que
+    análisis repetidos y reinicios de la app no requieren red. Las barras
+    intradiarias se guardan en memoria (ver get_bar_cache).
+    """
+    with span("fetch_history", symbols=len(symbols), interval=interval):
+        return load_history(symbols, start, end, interval, get_market_provider(), get_price_store(), get_bar_cache())
+
+@st.cache_resource
+def get_metadata_store():
+    """Almacén local de información de empresas compartido por todas las sesiones"""
+    return open_metadata_store(get_market_provider())
+
+@st.cache_resource
+def get_currency_converter():
+    """Conversión a la moneda base con tipos de cambio del almacén local de precios"""
+    return CurrencyConverter(get_price_store(), get_market_provider().history_batch, get_metadata_store())
 
-@st.cache_data(ttl=3600)
 def get_stock_info(symbol):
-    """Obtiene información de la empresa"""
+    """Obtiene información de la empresa
+
+    Se sirve desde el almacén de metadatos; solo los símbolos sin información
+    guardada (o sin su moneda de cotización) se consultan al proveedor. Si el
+    proveedor no responde, la información por defecto no se guarda y la
+    moneda sigue desconocida.
+    """
+    info = get_metadata_store().get(symbol)
+    if info is not None and info['currency']:
+        return info
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        return {
-            'name': info.get('shortName', symbol),
-            'sector': info.get('sector', 'N/A'),
-            'industry': info.get('industry', 'N/A'),
-            'currency': info.get('currency', 'USD'),
-            'market_cap': info.get('marketCap', 0),
-            'pe_ratio': info.get('trailingPE', 'N/A')
-        }
-    except:
-        return {
-            'name': symbol, 'sector': 'N/A', 'industry': 'N/A', 
-            'currency': 'USD', 'market_cap': 0, 'pe_ratio': 'N/A'
-        }
+        with span("fetch_info", symbol=symbol):
+            info = get_market_provider().info(symbol)
+    except Exception:
+        return default_stock_info(symbol)
+    get_metadata_store().put(symbol, info)
+    return info
 
-def calculate_investment_metrics(data, investment_amount):
-    """Calcula métricas de inversión con análisis adicional"""
-    if data is None or len(data) == 0 or investment_amount <= 0:
-        return None
-    
-    start_price = data['Close'].iloc[0]
-    end_price = data['Close'].iloc[-1]
-    
-    shares = investment_amount / start_price
-    final_value = shares * end_price
-    profit_loss = final_value - investment_amount
-    profit_loss_pct = (profit_loss / investment_amount) * 100
+def refresh_stale_metadata(symbols):
+    """Actualiza en segundo plano la información vencida de los símbolos
+
+    Retorna la cantidad de símbolos enviados a actualizar.
+    """
+    store = get_metadata_store()
+    stale = [symbol for symbol in store.stale_symbols(symbols) if symbol in store]
+    store.refresh_in_background(
+        stale, get_market_provider().info,
+        max_workers=st.session_state.get('fetch_max_workers', DEFAULT_MAX_WORKERS),
+        timeout=st.session_state.get('fetch_timeout', DEFAULT_TIMEOUT)
+    )
+    return len(stale)
+
+def default_stock_info(symbol):
+    """Información por defecto cuando el proveedor no responde"""
+    return info_record(symbol)
+
+def fetch_analysis_inputs(symbols, start, end, on_progress=None, interval=DEFAULT_INTERVAL):
+    """Descarga en paralelo históricos (por lotes) e información de cada símbolo
+
+    La información ya guardada se toma del almacén de metadatos (la vencida se
+    actualiza en segundo plano) y solo se piden los símbolos sin información.
+    Retorna (datos, errores). on_progress(etiqueta, completadas, total) se
+    llama a medida que termina cada solicitud.
+    """
+    symbols = list(symbols)
+    metadata = get_metadata_store()
+    tasks = {}
+    for i in range(0, len(symbols), BATCH_DOWNLOAD_SIZE):
+        chunk = tuple(symbols[i:i + BATCH_DOWNLOAD_SIZE])
+        tasks[("history", chunk)] = partial(get_stocks_data_batch, chunk, start, end, interval)
+    for symbol in symbols:
+        if not (metadata.get(symbol) or {}).get('currency'):
+            tasks[("info", symbol)] = partial(get_stock_info, symbol)
+    refresh_stale_metadata(symbols)
     
-    # Análisis adicional
-    max_price = data['Close'].max()
-    min_price = data['Close'].min()
-    max_value = shares * max_price
-    min_value = shares * min_price
+    # Los hilos del pool usan el contexto de la sesión para acceder a los recursos de st.cache_resource
+    ctx = get_script_run_ctx()
     
-    # Volatilidad y otros indicadores
-    daily_returns = data['Close'].pct_change().dropna()
-    volatility = daily_returns.std() * (252 ** 0.5) * 100 if len(daily_returns) > 0 else 0
+    def on_done(key, completed, total):
+        if on_progress is not None:
+            kind, target = key
+            label = f"Históricos de {len(target)} acciones" if kind == "history" else f"Info de {target}"
+            on_progress(label, completed, total)
     
-    # Drawdown máximo
-    rolling_max = data['Close'].expanding().max()
-    drawdown = (data['Close'] - rolling_max) / rolling_max
-    max_drawdown = drawdown.min() * 100
+    outputs, task_errors = run_concurrently(
+        tasks,
+        max_workers=st.session_state.get('fetch_max_workers', DEFAULT_MAX_WORKERS),
+        timeout=st.session_state.get('fetch_timeout', DEFAULT_TIMEOUT),
+        on_done=on_done,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    )
     
-    # Sharpe ratio simplificado (asumiendo risk-free rate = 0)
-    sharpe_ratio = daily_returns.mean() / daily_returns.std() * (252 ** 0.5) if daily_returns.std() > 0 else 0
+    price_data, fetch_errors = {}, {}
+    for key in tasks:
+        kind, target = key
+        if kind == "history":
+            if key in outputs:
+                chunk_data, chunk_errors = outputs[key]
+                price_data.update(chunk_data)
+                fetch_errors.update(chunk_errors)
+            else:
+                fetch_errors.update({symbol: task_errors[key] for symbol in target})
     
-    return {
-        'investment': investment_amount,
-        'start_price': start_price,
-        'end_price': end_price,
-        'shares': shares,
-        'final_value': final_value,
-        'profit_loss': profit_loss,
-        'profit_loss_pct': profit_loss_pct,
-        'max_value': max_value,
-        'min_value': min_value,
-        'max_price': max_price,
-        'min_price': min_price,
-        'volatility': volatility,
-        'max_drawdown': max_drawdown,
-        'sharpe_ratio': sharpe_ratio,
-        'data': data
-    }
+    return price_data, fetch_errors
+
+DEFAULT_STOCK_NAMES = {data["symbol"]: name for name, data in DEFAULT_STOCKS.items()}
+
+def get_display_name(symbol):
+    """Nombre corto de una acción para las tablas"""
+    if symbol in DEFAULT_STOCK_NAMES:
+        return DEFAULT_STOCK_NAMES[symbol].split(' ')[0]
+    if symbol in st.session_state.custom_stocks:
+        return st.session_state.custom_stocks[symbol]["name"].split(' ')[0]
+    info = get_metadata_store().get(symbol)
+    return info['name'] if info else symbol
 
 def get_stock_category(symbol):
     """Obtiene categoría de una acción"""
+    return stock_category(symbol, st.session_state.custom_stocks)
+
+def get_current_investments():
+    """Montos mayores a 0 configurados en el sidebar, por símbolo"""
+    current_investments = {}
+    for data in DEFAULT_STOCKS.values():
+        if data["symbol"] not in st.session_state.removed_default_stocks:
+            amount = st.session_state.get(f"investment_{data['symbol']}", 0)
+            if amount > 0:
+                current_investments[data["symbol"]] = amount
+    
+    for symbol in st.session_state.custom_stocks.keys():
+        amount = st.session_state.get(f"investment_{symbol}", 0)
+        if amount > 0:
+            current_investments[symbol] = amount
+    
+    return current_investments
+
+def get_all_stocks():
+    """Acciones activas (por defecto no eliminadas y personalizadas) por nombre"""
+    all_stocks = {}
     for name, data in DEFAULT_STOCKS.items():
-        if data["symbol"] == symbol:
-            return data["category"]
+        symbol = data["symbol"]
+        if symbol not in st.session_state.removed_default_stocks:
+            all_stocks[name] = data
+    
+    for symbol, data in st.session_state.custom_stocks.items():
+        # Dos empresas con el mismo nombre no deben ocultarse entre sí
+        name = data["name"] if data["name"] not in all_stocks else f"{data['name']} ({symbol})"
+        all_stocks[name] = {
+            "symbol": symbol,
+            "category": data["category"]
+        }
+    return all_stocks
+
+IMPORTED_CATEGORY = "📥 Importadas"
+
+# Acciones a partir de las cuales el sidebar usa una tabla en lugar de un campo por acción
+EDITOR_THRESHOLD = 25
+
+def import_holdings(holdings, replace=False, on_progress=None):
+    """Agrega las acciones y montos de una cartera leída con read_holdings
+
+    Los símbolos por defecto y los ya agregados no se validan; el resto se
+    valida en paralelo (ver validate_stock_symbol) y los válidos quedan como
+    acciones personalizadas. Con replace los montos que no figuran en la
+    cartera vuelven a 0. Retorna (importados, errores por símbolo).
+    """
+    custom_stocks = st.session_state.custom_stocks
+    known = set(DEFAULT_STOCK_NAMES) | set(custom_stocks)
+    pending = [symbol for symbol in holdings["symbol"] if symbol not in known]
+    
+    ctx = get_script_run_ctx()
+    names, errors = validate_symbols(
+        pending, validate_stock_symbol,
+        max_workers=st.session_state.get('fetch_max_workers', DEFAULT_MAX_WORKERS),
+        timeout=st.session_state.get('fetch_timeout', DEFAULT_TIMEOUT),
+        on_done=on_progress,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    )
     
-    for sym, data in st.session_state.custom_stocks.items():
-        if sym == symbol:
-            return data["category"]
+    if replace:
+        for symbol in list(DEFAULT_STOCK_NAMES) + list(custom_stocks):
+            st.session_state[f"investment_{symbol}"] = 0.0
     
-    return "🔹 Otros"
+    imported = 0
+    for symbol, amount, category in holdings.itertuples(index=False):
+        if symbol in errors:
+            continue
+        if symbol in DEFAULT_STOCK_NAMES:
+            st.session_state.removed_default_stocks.discard(symbol)
+        elif symbol in names or category:
+            category = category or custom_stocks.get(symbol, {}).get("category", IMPORTED_CATEGORY)
+            name = names[symbol] if symbol in names else custom_stocks[symbol]["name"]
+            custom_stocks[symbol] = {"name": name, "category": category}
+            if category not in PREDEFINED_CATEGORIES:
+                st.session_state.custom_categories.add(category)
+        st.session_state[f"investment_{symbol}"] = float(amount)
+        imported += 1
+    return imported, errors
 
 # ============= INTERFAZ PRINCIPAL =============
 
+start_telemetry_exports()
+get_cache_warmer()
+
 # Header principal con estilo mejorado
 st.markdown('<h1 class="main-header">📈 Analizador de Inversiones Pro</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">🚀 Descubre el potencial de tus inversiones con análisis profesional y categorías personalizables</p>', unsafe_allow_html=True)
 
-# ============= NAVEGACIÓN POR TABS =============
-# Verificar si hay análisis completado para mostrar indicador
+# ============= NAVEGACIÓN POR VISTAS =============
+# Solo se construye la vista seleccionada: las demás no ejecutan su código en cada rerun
 has_analysis = 'analysis_results' in st.session_state and st.session_state.analysis_results
 
-# Crear títulos de tabs con indicadores
-portfolio_tab = "🏠 Portfolio"
-analysis_tab = "📊 Análisis" + (" ✅" if has_analysis else "")
-config_tab = "⚙️ Configuración"
-help_tab = "❓ Ayuda"
+# Títulos fijos: si cambiaran, el selector perdería la vista elegida
+VIEW_TITLES = {
+    "🏠 Portfolio": "portfolio",
+    "📊 Análisis": "analysis",
+    "⚙️ Configuración": "settings",
+    "❓ Ayuda": "help"
+}
+
+ROLLING_WINDOW_LABELS = {f"{window} días": window for window in ROLLING_WINDOWS}
+
+# Métrica móvil: (clave en rolling_metrics, título del eje)
+ROLLING_METRIC_LABELS = {
+    "Volatilidad": ("volatility", "Volatilidad anualizada (%)"),
+    "Sharpe": ("sharpe", "Sharpe anualizado"),
+    "Drawdown": ("drawdown", "Caída desde el máximo de la ventana (%)"),
+    "Retorno": ("return", "Retorno de la ventana (%)"),
+}
+
+INTERVAL_LABELS = {spec["label"]: interval for interval, spec in INTERVALS.items()}
+
+DAILY_ONLY_NOTE = "💡 Disponible con intervalos de 1 día o menores: las ventanas y horizontes se miden en días"
+
+CORRELATION_VIEWS = ("Correlación", "Covarianza anualizada")
+
+CORRELATION_ORDERS = ("Clusters", "Categoría")
+
+# Formato de las columnas numéricas de las tablas de análisis (ordenan como números)
+ROI_COLUMN = st.column_config.NumberColumn(format="%+.2f%%")
+
+def money_column(currency):
+    """Columna de montos con el prefijo de la moneda base"""
+    return st.column_config.NumberColumn(format=f"{money_prefix(currency)}%.2f")
+
+def category_column_config(currency):
+    money = money_column(currency)
+    return {
+        '💵 Inversión': money,
+        '💎 Valor Final': money,
+        '💰 Ganancia/Pérdida': money,
+        '📈 ROI (%)': ROI_COLUMN,
+    }
+
+def results_column_config(currency):
+    money = money_column(currency)
+    return {
+        **category_column_config(currency),
+        '📈 Precio Inicial': money,
+        '📉 Precio Final': money,
+        '📊 Acciones': st.column_config.NumberColumn(format="%.2f"),
+        '📊 Volatilidad': st.column_config.NumberColumn(format="%.1f%%"),
+    }
+
+OPTIMIZATION_OBJECTIVES = ("Máximo Sharpe", "Mínima varianza", "Retorno objetivo")
+
+SIMULATION_METHODS = {"Bootstrap histórico": "bootstrap", "GBM correlacionado": "gbm"}
+
+SIMULATION_HORIZONS = {"3 meses": 63, "6 meses": 126, "1 año": 252, "3 años": 756}
+
+RETURN_BASIS_LABELS = {"Precio": "price", "Total (dividendos reinvertidos)": "total"}
+
+CONTRIBUTION_LABELS = {"Sin aportes": None, "Semanal": "W", "Mensual": "M", "Trimestral": "Q"}
+
+REBALANCE_LABELS = {"Sin rebalanceo": None, "Periódico": "periodic", "Por desvío": "threshold"}
+
+REBALANCE_FREQUENCY_LABELS = {"Mensual": "M", "Trimestral": "Q", "Anual": "Y"}
+
+selected_title = st.radio(
+    "Vista",
+    list(VIEW_TITLES),
+    horizontal=True,
+    label_visibility="collapsed",
+    key="view_selector"
+)
+current_view = st.session_state.current_view = VIEW_TITLES[selected_title]
 
-tab1, tab2, tab3, tab4 = st.tabs([portfolio_tab, analysis_tab, config_tab, help_tab])
+if has_analysis and current_view != "analysis":
+    st.caption("✅ Análisis calculado: revisa los resultados en 📊 Análisis")
 
-with tab1:
+if current_view == "portfolio":
     st.markdown("### 💼 Gestión de Portfolio")
     
     # Métricas rápidas del portfolio
@@ -436,35 +521,163 @@ with tab1:
                     active_investments += 1
                     
             st.markdown(create_metric_card("💰 Con Inversión", str(active_investments)), unsafe_allow_html=True)
+    
+    # ============= OPTIMIZADOR =============
+    st.markdown("---")
+    st.markdown("#### 🧮 Optimizador de Portfolio")
+    
+    all_stocks = get_all_stocks()
+    if len(all_stocks) < 2:
+        st.info("ℹ️ Agrega al menos dos acciones para optimizar")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            opt_categories = st.multiselect(
+                "Categorías:", sorted(set(data["category"] for data in all_stocks.values())),
+                key="opt_categories", help="Sin selección se usan todas las acciones"
+            )
+        with col2:
+            opt_period = st.selectbox("Historia:", list(DATE_PRESETS), key="opt_period",
+                                      help="Período usado para estimar retornos y covarianzas")
+        with col3:
+            objective = st.selectbox("Objetivo:", list(OPTIMIZATION_OBJECTIVES), key="opt_objective")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            target_return = st.number_input("Retorno objetivo (% anual):", value=15.0, step=1.0,
+                                            key="opt_target", disabled=objective != "Retorno objetivo")
+        with col2:
+            budget = st.number_input(f"Monto total a distribuir ({st.session_state.base_currency}):", min_value=0.0, value=1000.0,
+                                     step=100.0, key="opt_budget")
+        
+        if st.button("🧮 Optimizar", key="opt_run"):
+            symbols = [data["symbol"] for data in all_stocks.values()
+                       if not opt_categories or data["category"] in opt_categories]
+            start, end = preset_range(opt_period)
+            with st.spinner("🔄 Estimando covarianzas y optimizando..."):
+                datasets, _ = get_stocks_data_batch(symbols, start, end)
+                datasets, _ = get_currency_converter().convert(datasets, st.session_state.base_currency, start, end)
+                if st.session_state.return_basis == "total":
+                    datasets = {symbol: total_return_closes(data).to_frame() for symbol, data in datasets.items()}
+                prices = build_price_matrix(datasets)
+                if prices.shape[1] < 2:
+                    st.session_state.optimization = None
+                    show_notification("❌ Se necesitan precios de al menos dos acciones", "error")
+                else:
+                    with span("optimizer", symbols=prices.shape[1]):
+                        optimizer = MeanVarianceOptimizer(prices)
+                        frontier = optimizer.frontier()
+                        if objective == "Mínima varianza":
+                            weights = optimizer.min_variance()
+                        elif objective == "Máximo Sharpe":
+                            weights = optimizer.max_sharpe()
+                        else:
+                            weights = optimizer.target_return(target_return)
+                    st.session_state.optimization = {
+                        'weights': weights[weights > 0].sort_values(ascending=False),
+                        'stats': optimizer.stats(weights.to_numpy()),
+                        'frontier': frontier,
+                        'assets': optimizer.asset_stats(),
+                        'objective': objective,
+                        'budget': budget,
+                        'currency': st.session_state.base_currency
+                    }
+        
+        optimization = st.session_state.get('optimization')
+        if optimization:
+            from analizador.charts import efficient_frontier_figure
+            
+            expected, volatility, sharpe = optimization['stats']
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.markdown(create_metric_card("📈 Retorno Esperado", f"{expected:+.2f}%"), unsafe_allow_html=True)
+            with col2:
+                st.markdown(create_metric_card("📊 Volatilidad", f"{volatility:.2f}%"), unsafe_allow_html=True)
+            with col3:
+                st.markdown(create_metric_card("⚡ Sharpe", f"{sharpe:.2f}"), unsafe_allow_html=True)
+            
+            fig_frontier = efficient_frontier_figure(
+                optimization['frontier'], optimization['assets'], (volatility, expected), optimization['objective']
+            )
+            st.plotly_chart(fig_frontier, use_container_width=True)
+            
+            weights = optimization['weights']
+            st.dataframe(
+                {
+                    'Acción': list(weights.index),
+                    'Peso': [f"{w * 100:.2f}%" for w in weights],
+                    'Monto': [format_money(w * optimization['budget'], optimization['currency']) for w in weights]
+                },
+                use_container_width=True, hide_index=True
+            )
+            
+            if st.button("📥 Cargar en el portfolio", key="opt_load"):
+                for data in all_stocks.values():
+                    st.session_state[f"investment_{data['symbol']}"] = 0.0
+                for symbol, weight in weights.items():
+                    st.session_state[f"investment_{symbol}"] = round(weight * optimization['budget'], 2)
+                show_notification("📥 Asignación optimizada cargada!", "success")
+                st.rerun()
 
-with tab2:
+if current_view == "analysis":
     st.markdown("### 📈 Centro de Análisis")
     
     # Verificar si hay datos calculados
     if 'analysis_results' in st.session_state and st.session_state.analysis_results:
-        results = st.session_state.analysis_results
-        stock_infos = st.session_state.get('stock_infos', {})
+        # Plotly solo se necesita al construir los gráficos de esta vista
+        from analizador.charts import (
+            backtest_figure, category_pie_figure, category_profit_figure, fan_chart_figure, heatmap_figure,
+            normalized_prices_figure, rolling_figure, symbol_profit_figure
+        )
+        
+        basis_label = st.radio(
+            "📐 Retorno:", list(RETURN_BASIS_LABELS), horizontal=True,
+            index=list(RETURN_BASIS_LABELS.values()).index(st.session_state.return_basis),
+            key="_return_basis", on_change=change_return_basis,
+            help="El retorno total reinvierte los dividendos; ambas bases se calculan con los mismos precios"
+        )
+        basis = RETURN_BASIS_LABELS[basis_label]
+        bases = st.session_state.get('analysis_bases') or {}
+        results = bases.get(basis, st.session_state.analysis_results)
+        view_started = time.perf_counter()
+        
+        # Tabla columnar de resultados, armada una sola vez por análisis y base
+        frames = st.session_state.setdefault('analysis_frames', {})
+        frame = frames.get(basis)
+        if frame is None:
+            frame = frames[basis] = results_frame(results)
+        if basis == "total" and 'price' in frames:
+            paying = int((frame['final_value'] != frames['price']['final_value'].reindex(frame.index)).sum())
+            st.caption(f"💵 {paying} de {len(frame)} acciones pagaron dividendos en el período; "
+                       "cada dividendo se reinvierte al cierre previo a su fecha ex")
         
         # Calcular totales
-        total_investment = sum(metrics['investment'] for metrics in results.values())
-        total_final_value = sum(metrics['final_value'] for metrics in results.values())
+        total_investment = frame['investment'].sum()
+        total_final_value = frame['final_value'].sum()
         total_profit_loss = total_final_value - total_investment
         total_profit_loss_pct = (total_profit_loss / total_investment) * 100 if total_investment > 0 else 0
         
         # ============= MÉTRICAS PRINCIPALES =============
         st.markdown("## 📊 Resumen General")
         
+        currency = st.session_state.get('analysis_currency', DEFAULT_CURRENCY)
+        converted = {symbol: quoted for symbol, quoted in st.session_state.get('analysis_converted', {}).items()
+                     if symbol in results}
+        if converted:
+            st.caption(f"💱 Montos en {currency}: {len(converted)} acciones convertidas desde "
+                       f"{', '.join(sorted(set(converted.values())))} con el tipo de cambio de cada día")
+        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.markdown(create_metric_card("💰 Inversión Total", f"${total_investment:,.2f}"), unsafe_allow_html=True)
+            st.markdown(create_metric_card("💰 Inversión Total", format_money(total_investment, currency)), unsafe_allow_html=True)
         
         with col2:
-            st.markdown(create_metric_card("💎 Valor Final", f"${total_final_value:,.2f}"), unsafe_allow_html=True)
+            st.markdown(create_metric_card("💎 Valor Final", format_money(total_final_value, currency)), unsafe_allow_html=True)
         
         with col3:
             delta_str = f"{total_profit_loss_pct:+.2f}%"
-            st.markdown(create_metric_card("📈 Ganancia/Pérdida", f"${total_profit_loss:,.2f}", delta_str), unsafe_allow_html=True)
+            st.markdown(create_metric_card("📈 Ganancia/Pérdida", format_money(total_profit_loss, currency), delta_str), unsafe_allow_html=True)
         
         with col4:
             roi_emoji = "🟢" if total_profit_loss_pct >= 0 else "🔴"
@@ -476,65 +689,17 @@ with tab2:
         st.markdown("## 🏷️ Análisis por Categorías")
         
         # Agrupar por categorías
-        category_analysis = {}
-        for symbol, metrics in results.items():
-            category = metrics['category']
-            if category not in category_analysis:
-                category_analysis[category] = {
-                    'investment': 0,
-                    'final_value': 0,
-                    'profit_loss': 0,
-                    'count': 0,
-                    'stocks': []
-                }
-            category_analysis[category]['investment'] += metrics['investment']
-            category_analysis[category]['final_value'] += metrics['final_value']
-            category_analysis[category]['profit_loss'] += metrics['profit_loss']
-            category_analysis[category]['count'] += 1
-            category_analysis[category]['stocks'].append(symbol)
+        with span("category_aggregate", symbols=len(results)):
+            category_analysis = category_summary(frame)
         
         # Tabla de categorías
-        category_table = []
-        for category, data in category_analysis.items():
-            roi = (data['profit_loss'] / data['investment']) * 100 if data['investment'] > 0 else 0
-            profit_emoji = "🟢" if data['profit_loss'] >= 0 else "🔴"
-            
-            category_table.append({
-                '🏷️ Categoría': category,
-                '📊 # Acciones': data['count'],
-                '💵 Inversión': f"${data['investment']:,.2f}",
-                '💎 Valor Final': f"${data['final_value']:,.2f}",
-                f'{profit_emoji} Ganancia/Pérdida': f"${data['profit_loss']:,.2f}",
-                '📈 ROI (%)': f"{roi:+.2f}%",
-                '📋 Acciones': ", ".join(data['stocks'])
-            })
-        
-        df_categories = pd.DataFrame(category_table)
-        st.dataframe(df_categories, use_container_width=True, hide_index=True)
+        with span("table", "categories"):
+            df_categories = category_table(category_analysis)
+        st.dataframe(df_categories, use_container_width=True, hide_index=True, column_config=category_column_config(currency))
         
         # Gráfico de barras por categorías
-        fig_cat = go.Figure()
-        
-        categories = list(category_analysis.keys())
-        cat_profits = [category_analysis[c]['profit_loss'] for c in categories]
-        cat_colors = ['#00cc44' if p >= 0 else '#ff4444' for p in cat_profits]
-        
-        fig_cat.add_trace(go.Bar(
-            x=categories,
-            y=cat_profits,
-            marker_color=cat_colors,
-            text=[f"${p:,.0f}" for p in cat_profits],
-            textposition='auto',
-            hovertemplate='<b>%{x}</b><br>Ganancia/Pérdida: $%{y:,.2f}<extra></extra>'
-        ))
-        
-        fig_cat.update_layout(
-            title="💰 Ganancia/Pérdida por Categoría",
-            xaxis_title="Categoría",
-            yaxis_title="Ganancia/Pérdida (USD)",
-            template="plotly_white",
-            height=500
-        )
+        with span("figure", "category_profit"):
+            fig_cat = category_profit_figure(category_analysis, currency)
         
         st.plotly_chart(fig_cat, use_container_width=True)
         
@@ -543,104 +708,214 @@ with tab2:
         # ============= TABLA DETALLADA =============
         st.markdown("## 📋 Análisis Detallado por Acción")
         
-        table_data = []
-        for symbol, metrics in results.items():
-            # Buscar nombre de la empresa
-            stock_name = stock_infos.get(symbol, {}).get('name', symbol)
-            if symbol in [data["symbol"] for data in DEFAULT_STOCKS.values()]:
-                for name, data in DEFAULT_STOCKS.items():
-                    if data["symbol"] == symbol:
-                        stock_name = name.split(' ')[0]
-                        break
-            elif symbol in st.session_state.custom_stocks:
-                stock_name = st.session_state.custom_stocks[symbol]["name"].split(' ')[0]
-            
-            profit_emoji = "🟢" if metrics['profit_loss'] >= 0 else "🔴"
-            
-            table_data.append({
-                '🏢 Empresa': f"{stock_name} ({symbol})",
-                '🏷️ Categoría': metrics['category'],
-                '💵 Inversión': f"${metrics['investment']:,.2f}",
-                '📈 Precio Inicial': f"${metrics['start_price']:.2f}",
-                '📉 Precio Final': f"${metrics['end_price']:.2f}",
-                '📊 Acciones': f"{metrics['shares']:.2f}",
-                '💎 Valor Final': f"${metrics['final_value']:,.2f}",
-                f'{profit_emoji} Ganancia/Pérdida': f"${metrics['profit_loss']:,.2f}",
-                '📈 ROI (%)': f"{metrics['profit_loss_pct']:+.2f}%",
-                '📊 Volatilidad': f"{metrics['volatility']:.1f}%"
-            })
-        
-        df_results = pd.DataFrame(table_data)
-        st.dataframe(df_results, use_container_width=True, hide_index=True)
+        with span("table", "results"):
+            display_names = {symbol: get_display_name(symbol) for symbol in results}
+            df_results = results_table(frame, display_names)
+        st.dataframe(df_results, use_container_width=True, hide_index=True, column_config=results_column_config(currency))
         
         # ============= GRÁFICOS =============
         
         # Gráfico de barras - Ganancia/Pérdida por acción
         st.markdown("## 📊 Ganancia/Pérdida por Acción")
         
-        fig_bar = go.Figure()
-        
-        symbols = list(results.keys())
-        profits = [results[s]['profit_loss'] for s in symbols]
-        colors = ['#00cc44' if p >= 0 else '#ff4444' for p in profits]
-        
-        fig_bar.add_trace(go.Bar(
-            x=symbols,
-            y=profits,
-            marker_color=colors,
-            text=[f"${p:,.0f}" for p in profits],
-            textposition='auto',
-            hovertemplate='<b>%{x}</b><br>Ganancia/Pérdida: $%{y:,.2f}<extra></extra>'
-        ))
-        
-        fig_bar.update_layout(
-            title="💰 Ganancia/Pérdida por Acción Individual",
-            xaxis_title="Acción",
-            yaxis_title="Ganancia/Pérdida (USD)",
-            template="plotly_white",
-            height=500
-        )
+        with span("figure", "symbol_profit"):
+            fig_bar = symbol_profit_figure(frame, currency)
         
         st.plotly_chart(fig_bar, use_container_width=True)
         
         # Gráfico de evolución de precios normalizados
         st.markdown("## 📈 Evolución de Precios (Base 100)")
         
-        fig_lines = go.Figure()
+        with span("figure", "normalized_prices"):
+            fig_lines = normalized_prices_figure(results)
+        
+        st.plotly_chart(fig_lines, use_container_width=True)
         
-        colors_line = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', 
-                      '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#ff9999', '#66b3ff']
+        # Las métricas móviles y la proyección se miden en días: con barras
+        # intradiarias usan el último cierre de cada día
+        interval = st.session_state.get('analysis_interval', DEFAULT_INTERVAL)
+        closes = close_matrix(results)
+        day_closes = daily_closes(closes) if is_intraday(interval) else closes
         
-        for i, (symbol, metrics) in enumerate(results.items()):
-            data = metrics['data']
-            normalized_prices = (data['Close'] / data['Close'].iloc[0]) * 100
+        # ============= MÉTRICAS MÓVILES =============
+        st.markdown("## 📉 Métricas Móviles")
+        
+        if interval == "1wk":
+            st.info(DAILY_ONLY_NOTE)
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                window_label = st.selectbox("Ventana:", list(ROLLING_WINDOW_LABELS), index=1, key="rolling_window")
+            with col2:
+                metric_label = st.selectbox("Métrica:", list(ROLLING_METRIC_LABELS), key="rolling_metric")
             
-            fig_lines.add_trace(go.Scatter(
-                x=data.index,
-                y=normalized_prices,
-                mode='lines',
-                name=f"{symbol} ({metrics['category']})",
-                line=dict(width=3, color=colors_line[i % len(colors_line)]),
-                hovertemplate=f'<b>{symbol}</b><br>Fecha: %{{x}}<br>Precio normalizado: %{{y:.1f}}<extra></extra>'
-            ))
-        
-        fig_lines.update_layout(
-            title="📈 Evolución de Precios Normalizados por Categoría",
-            xaxis_title="Fecha",
-            yaxis_title="Precio Normalizado (Base 100)",
-            template="plotly_white",
-            hovermode='x unified',
-            height=600,
-            legend=dict(
-                orientation="v",
-                yanchor="top",
-                y=1,
-                xanchor="left",
-                x=1.02
+            by_investment = sorted(results, key=lambda symbol: results[symbol]['investment'], reverse=True)
+            rolling_symbols = st.multiselect(
+                "Acciones:", by_investment, default=by_investment[:5], key="rolling_symbols",
+                help="El portfolio completo siempre se muestra"
             )
-        )
+            
+            # Todas las acciones y el portfolio en una sola pasada sobre la matriz de cierres
+            with span("rolling_metrics", symbols=len(results)):
+                prices = with_portfolio(day_closes, {symbol: m['shares'] for symbol, m in results.items()})
+                metric, yaxis_title = ROLLING_METRIC_LABELS[metric_label]
+                rolling = rolling_metrics(prices, ROLLING_WINDOW_LABELS[window_label])[metric]
+            
+            with span("figure", "rolling"):
+                fig_rolling = rolling_figure(
+                    rolling[[PORTFOLIO_COLUMN] + rolling_symbols],
+                    f"📉 {metric_label} móvil ({window_label})", yaxis_title
+                )
+            st.plotly_chart(fig_rolling, use_container_width=True)
+        
+        # ============= CORRELACIÓN =============
+        st.markdown("## 🔗 Correlación entre Acciones")
+        
+        if len(results) < 2:
+            st.info("💡 Se necesitan al menos dos acciones para calcular correlaciones")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                correlation_view = st.selectbox("Matriz:", CORRELATION_VIEWS, key="correlation_view",
+                                                help="Retornos de cada barra sobre las fechas en que cotizan ambas acciones")
+            with col2:
+                correlation_order = st.selectbox("Orden:", CORRELATION_ORDERS, key="correlation_order",
+                                                 help="Clusters agrupa las acciones que se mueven juntas")
+            
+            period = (st.session_state.get('analysis_start_date'), st.session_state.get('analysis_end_date'),
+                      interval, basis, currency)
+            correlation, covariance = get_correlation_cache().matrices(closes, period, periods_per_year(interval))
+            categories = {symbol: metrics['category'] for symbol, metrics in results.items()}
+            with span("cluster_order", symbols=len(correlation)):
+                order = cluster_order(correlation)
+            if correlation_order == "Categoría":
+                # Orden estable: dentro de cada categoría se conserva el orden por clusters
+                order = sorted(order, key=lambda symbol: categories[symbol])
+            
+            is_correlation = correlation_view == "Correlación"
+            matrix = correlation if is_correlation else covariance
+            with span("figure", "heatmap"):
+                fig_matrix = heatmap_figure(matrix.loc[order, order], f"🔗 {correlation_view} de Retornos ({INTERVALS[interval]['label']})",
+                                            correlation=is_correlation)
+            st.plotly_chart(fig_matrix, use_container_width=True)
+            
+            blocks = category_blocks(correlation, categories)
+            if len(blocks) > 1:
+                fig_blocks = heatmap_figure(blocks, "🏷️ Correlación Promedio entre Categorías")
+                st.plotly_chart(fig_blocks, use_container_width=True)
+                st.caption("La diagonal promedia los pares de acciones distintas dentro de cada categoría")
         
-        st.plotly_chart(fig_lines, use_container_width=True)
+        # ============= PROYECCIÓN MONTE CARLO =============
+        st.markdown("## 🎲 Proyección Monte Carlo")
+        
+        if interval == "1wk":
+            st.info(DAILY_ONLY_NOTE)
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                method_label = st.selectbox("Método:", list(SIMULATION_METHODS), key="mc_method",
+                                            help="Bootstrap sortea días históricos completos; GBM usa la covarianza histórica")
+            with col2:
+                horizon_label = st.selectbox("Horizonte:", list(SIMULATION_HORIZONS), index=2, key="mc_horizon")
+            with col3:
+                n_paths = st.selectbox("Simulaciones:", [1000, 5000, 10000], index=2, key="mc_paths")
+            
+            if st.button("🎲 Simular", key="mc_run"):
+                horizon = SIMULATION_HORIZONS[horizon_label]
+                with st.spinner("🔄 Simulando caminos..."), span("montecarlo", paths=n_paths, horizon=horizon):
+                    days, paths = simulate_portfolio(
+                        day_closes, {symbol: m['final_value'] for symbol, m in results.items()},
+                        horizon=horizon, n_paths=n_paths, method=SIMULATION_METHODS[method_label],
+                        step=max(1, horizon // 50)
+                    )
+                # Solo los percentiles quedan en la sesión, no los caminos
+                st.session_state.montecarlo = {
+                    'fan': fan_percentiles(days, paths),
+                    'summary': outcome_summary(paths),
+                    'last_date': day_closes.index[-1],
+                    'label': f"{method_label}, {horizon_label}, {n_paths:,} simulaciones"
+                }
+            
+            montecarlo = st.session_state.get('montecarlo')
+            if montecarlo:
+                summary = montecarlo['summary']
+                st.caption(montecarlo['label'])
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.markdown(create_metric_card("🔻 Pesimista (P5)", format_money(summary['p5'], currency)), unsafe_allow_html=True)
+                with col2:
+                    st.markdown(create_metric_card("🎯 Mediana", format_money(summary['p50'], currency)), unsafe_allow_html=True)
+                with col3:
+                    st.markdown(create_metric_card("🚀 Optimista (P95)", format_money(summary['p95'], currency)), unsafe_allow_html=True)
+                with col4:
+                    st.markdown(create_metric_card("⚠️ Prob. de Pérdida", f"{summary['loss_probability']:.1f}%"), unsafe_allow_html=True)
+            
+                st.plotly_chart(fan_chart_figure(montecarlo['fan'], montecarlo['last_date'], currency), use_container_width=True)
+        
+        # ============= BACKTEST DE APORTES Y REBALANCEO =============
+        st.markdown("## 🔁 Backtest de Aportes y Rebalanceo")
+        st.caption("Invierte el monto inicial con los pesos actuales de la cartera y simula aportes periódicos "
+                   "y rebalanceos a esos pesos durante el período analizado")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            bt_initial = st.number_input(f"Monto inicial ({currency}):", min_value=0.0, value=float(total_investment),
+                                         step=100.0, key="bt_initial")
+        with col2:
+            contribution_label = st.selectbox("Aportes:", list(CONTRIBUTION_LABELS), index=2, key="bt_frequency")
+        with col3:
+            bt_contribution = st.number_input(f"Monto por aporte ({currency}):", min_value=0.0, value=100.0, step=50.0,
+                                              key="bt_contribution",
+                                              disabled=CONTRIBUTION_LABELS[contribution_label] is None)
+        with col4:
+            rebalance_label = st.selectbox("Rebalanceo:", list(REBALANCE_LABELS), key="bt_rebalance")
+        
+        rebalance = REBALANCE_LABELS[rebalance_label]
+        rebalance_freq, threshold = "Q", DEFAULT_THRESHOLD
+        if rebalance == "periodic":
+            rebalance_freq = REBALANCE_FREQUENCY_LABELS[st.selectbox(
+                "Cada:", list(REBALANCE_FREQUENCY_LABELS), index=1, key="bt_rebalance_freq"
+            )]
+        elif rebalance == "threshold":
+            threshold = st.slider("Desvío máximo por acción (%):", 1, 25, int(DEFAULT_THRESHOLD * 100),
+                                  key="bt_threshold",
+                                  help="Se rebalancea cuando el peso de una acción se aparta del objetivo más que este porcentaje") / 100
+        
+        if st.button("🔁 Simular estrategia", key="bt_run"):
+            try:
+                with span("backtest", symbols=len(results), rebalance=rebalance):
+                    backtest = run_backtest(
+                        day_closes, {symbol: m['investment'] for symbol, m in results.items()},
+                        initial=bt_initial, contribution=bt_contribution,
+                        contribution_freq=CONTRIBUTION_LABELS[contribution_label],
+                        rebalance=rebalance, rebalance_freq=rebalance_freq, threshold=threshold
+                    )
+                backtest['label'] = f"{contribution_label}, {rebalance_label.lower()}"
+                st.session_state.backtest = backtest
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
+        
+        backtest = st.session_state.get('backtest')
+        if backtest:
+            st.caption(backtest['label'])
+            mwr = backtest['mwr_pct']
+            col1, col2, col3, col4, col5 = st.columns(5)
+            with col1:
+                st.markdown(create_metric_card("💵 Aportado", format_money(backtest['invested'], currency)), unsafe_allow_html=True)
+            with col2:
+                st.markdown(create_metric_card("💎 Valor Final", format_money(backtest['final_value'], currency)), unsafe_allow_html=True)
+            with col3:
+                st.markdown(create_metric_card("⏳ TWR", f"{backtest['twr_pct']:+.2f}%"), unsafe_allow_html=True)
+            with col4:
+                st.markdown(create_metric_card("💰 MWR", f"{mwr:+.2f}%" if mwr is not None else "N/A"), unsafe_allow_html=True)
+            with col5:
+                st.markdown(create_metric_card("🔁 Rebalanceos", f"{len(backtest['rebalances'])}"), unsafe_allow_html=True)
+            
+            with span("figure", "backtest"):
+                fig_backtest = backtest_figure(backtest['equity'], backtest['rebalances'], currency)
+            st.plotly_chart(fig_backtest, use_container_width=True)
+            st.caption("TWR: retorno de la estrategia sin el efecto de los aportes · MWR: tasa interna de retorno "
+                       "de los aportes · ambos anualizados en períodos de más de un año")
         
         # Gráficos de pie - Distribución por categorías
         col1, col2 = st.columns(2)
@@ -648,40 +923,16 @@ with tab2:
         with col1:
             st.markdown("### 🥧 Inversión por Categoría")
             
-            fig_pie_cat = go.Figure(data=[go.Pie(
-                labels=list(category_analysis.keys()),
-                values=[category_analysis[c]['investment'] for c in category_analysis.keys()],
-                hole=.4,
-                textinfo='label+percent',
-                textposition='auto'
-            )])
-            
-            fig_pie_cat.update_layout(
-                title="Capital por Categoría",
-                template="plotly_white",
-                height=400,
-                showlegend=False
-            )
+            with span("figure", "pie_investment"):
+                fig_pie_cat = category_pie_figure(category_analysis, 'investment', "Capital por Categoría")
             
             st.plotly_chart(fig_pie_cat, use_container_width=True)
         
         with col2:
             st.markdown("### 💎 Valor Final por Categoría")
             
-            fig_pie_cat2 = go.Figure(data=[go.Pie(
-                labels=list(category_analysis.keys()),
-                values=[category_analysis[c]['final_value'] for c in category_analysis.keys()],
-                hole=.4,
-                textinfo='label+percent',
-                textposition='auto'
-            )])
-            
-            fig_pie_cat2.update_layout(
-                title="Valor Final por Categoría",
-                template="plotly_white",
-                height=400,
-                showlegend=False
-            )
+            with span("figure", "pie_final_value"):
+                fig_pie_cat2 = category_pie_figure(category_analysis, 'final_value', "Valor Final por Categoría")
             
             st.plotly_chart(fig_pie_cat2, use_container_width=True)
         
@@ -689,13 +940,10 @@ with tab2:
         st.markdown("## 📊 Estadísticas Adicionales")
         
         # Top performers
-        sorted_by_roi = sorted(results.items(), key=lambda x: x[1]['profit_loss_pct'], reverse=True)
-        best_performer = sorted_by_roi[0]
-        worst_performer = sorted_by_roi[-1]
+        best_performer, worst_performer = best_and_worst(frame)
         
         # Top categoría
-        sorted_categories = sorted(category_analysis.items(), key=lambda x: (x[1]['profit_loss'] / x[1]['investment']) * 100, reverse=True)
-        best_category = sorted_categories[0] if sorted_categories else None
+        best_category = category_analysis.nlargest(1, 'roi_pct').iloc[0] if len(category_analysis) else None
         
         col1, col2, col3 = st.columns(3)
         
@@ -703,41 +951,40 @@ with tab2:
             st.success(f"""
             **🏆 Mejor Inversión**
             
-            **{best_performer[0]}**
+            **{best_performer.name}**
             
-            Categoría: **{best_performer[1]['category']}**
+            Categoría: **{best_performer['category']}**
             
-            ROI: **{best_performer[1]['profit_loss_pct']:+.2f}%**
+            ROI: **{best_performer['profit_loss_pct']:+.2f}%**
             
-            Ganancia: **${best_performer[1]['profit_loss']:,.2f}**
+            Ganancia: **{format_money(best_performer['profit_loss'], currency)}**
             """)
         
         with col2:
             st.error(f"""
             **📉 Peor Inversión**
             
-            **{worst_performer[0]}**
+            **{worst_performer.name}**
             
-            Categoría: **{worst_performer[1]['category']}**
+            Categoría: **{worst_performer['category']}**
             
-            ROI: **{worst_performer[1]['profit_loss_pct']:+.2f}%**
+            ROI: **{worst_performer['profit_loss_pct']:+.2f}%**
             
-            Pérdida: **${worst_performer[1]['profit_loss']:,.2f}**
+            Pérdida: **{format_money(worst_performer['profit_loss'], currency)}**
             """)
         
         with col3:
-            if best_category:
-                best_cat_roi = (best_category[1]['profit_loss'] / best_category[1]['investment']) * 100
+            if best_category is not None:
                 st.info(f"""
                 **🏷️ Mejor Categoría**
                 
-                **{best_category[0]}**
+                **{best_category.name}**
                 
-                ROI: **{best_cat_roi:+.2f}%**
+                ROI: **{best_category['roi_pct']:+.2f}%**
                 
-                Acciones: **{best_category[1]['count']}**
+                Acciones: **{best_category['count']}**
                 
-                Ganancia: **${best_category[1]['profit_loss']:,.2f}**
+                Ganancia: **{format_money(best_category['profit_loss'], currency)}**
                 """)
         
         # Información adicional
@@ -747,9 +994,18 @@ with tab2:
         analysis_start = st.session_state.get('analysis_start_date', 'N/A')
         analysis_end = st.session_state.get('analysis_end_date', 'N/A')
         
+        fallback_symbols = st.session_state.get('analysis_fallback', [])
+        if fallback_symbols:
+            st.warning(f"⚠️ El proveedor no respondió: {len(fallback_symbols)} acciones se analizaron con los "
+                       f"últimos precios guardados ({', '.join(fallback_symbols[:10])})")
+        
         st.info(f"""
         **📅 Período analizado:** {analysis_start} a {analysis_end}
         
+        **⏱️ Intervalo:** barras de {INTERVALS[interval]['label']}
+        
+        **💱 Moneda base:** {currency}
+        
         **🎯 Acciones analizadas:** {len(results)} inversiones activas
         
         **🏷️ Categorías únicas:** {len(category_analysis)} categorías diferentes
@@ -758,13 +1014,15 @@ with tab2:
         
         **🎨 Categorías personalizadas:** {len(st.session_state.custom_categories)} creadas por ti
         
-        **💡 Metodología:** Se asume inversión completa en fecha de inicio y mantenimiento hasta fecha final.
+        **💡 Metodología:** Se asume inversión completa en fecha de inicio y mantenimiento hasta fecha final; el backtest simula aportes periódicos y rebalanceos.
         
         **📊 Fuente de datos:** Yahoo Finance
         
         **⚠️ Disclaimer:** Solo para fines educativos. No constituye asesoría financiera.
         """)
         
+        TELEMETRY.record("analysis_view", time.perf_counter() - view_started, symbols=len(results))
+        
     else:
         # Vista cuando no hay análisis
         st.markdown("""
@@ -816,7 +1074,7 @@ with tab2:
             """)
     
 
-with tab3:
+if current_view == "settings":
     st.markdown("### ⚙️ Configuración Avanzada")
     
     col1, col2 = st.columns(2)
@@ -827,19 +1085,8 @@ with tab3:
         # Crear presets personalizados
         preset_name = st.text_input("Nombre del preset:", placeholder="Ej: Portfolio Conservador")
         if st.button("💾 Guardar Preset Actual") and preset_name:
-            current_investments = {}
-            for data in DEFAULT_STOCKS.values():
-                if data["symbol"] not in st.session_state.removed_default_stocks:
-                    amount = st.session_state.get(f"investment_{data['symbol']}", 0)
-                    if amount > 0:
-                        current_investments[data["symbol"]] = amount
-            
-            for symbol in st.session_state.custom_stocks.keys():
-                amount = st.session_state.get(f"investment_{symbol}", 0)
-                if amount > 0:
-                    current_investments[symbol] = amount
-            
-            st.session_state.investment_presets[preset_name] = current_investments
+            st.session_state.investment_presets[preset_name] = get_current_investments()
+            get_cache_warmer().pin(st.session_state.investment_presets[preset_name])
             show_notification(f"Preset '{preset_name}' guardado exitosamente!", "success")
         
         # Mostrar presets guardados
@@ -881,6 +1128,8 @@ with tab3:
                     st.session_state.custom_categories = set()
                     st.session_state.investment_presets = {}
                     st.session_state.analysis_results = None
+                    st.session_state.analysis_bases = None
+                    st.session_state.analysis_frames = {}
                     st.session_state.show_confirm_clean = False
                     
                     # Limpiar inversiones
@@ -891,12 +1140,87 @@ with tab3:
                     show_notification("🗑️ Todo limpiado exitosamente!", "success")
                     st.rerun()
         
+        st.markdown("#### 💱 Moneda")
+        st.selectbox(
+            "Moneda base:",
+            BASE_CURRENCIES,
+            index=BASE_CURRENCIES.index(st.session_state.base_currency),
+            key="_base_currency",
+            on_change=persist_setting, args=("base_currency",),
+            help="Los montos se interpretan en esta moneda y los precios de acciones que cotizan en otra "
+                 "se convierten con el tipo de cambio de cada día. Se aplica desde el próximo cálculo"
+        )
+        
+        st.markdown("#### 🌐 Descargas")
+        st.number_input(
+            "Solicitudes simultáneas:",
+            min_value=1, max_value=32, step=1,
+            value=st.session_state.fetch_max_workers,
+            key="_fetch_max_workers",
+            on_change=persist_setting, args=("fetch_max_workers",),
+            help="Máximo de descargas en paralelo a Yahoo Finance"
+        )
+        st.number_input(
+            "Tiempo límite por solicitud (s):",
+            min_value=5.0, max_value=300.0, step=5.0,
+            value=st.session_state.fetch_timeout,
+            key="_fetch_timeout",
+            on_change=persist_setting, args=("fetch_timeout",),
+            help="Una solicitud que excede este tiempo se reporta como fallida"
+        )
+        gateway_stats = get_market_provider().stats
+        st.caption(
+            f"🔌 Circuito {gateway_stats['circuit']}: {gateway_stats['requests']} solicitudes al proveedor, "
+            f"{gateway_stats['coalesced']} unificadas entre sesiones, {gateway_stats['retries']} reintentos"
+            + (f", {gateway_stats['rejected']} rechazadas" if gateway_stats['rejected'] else "")
+        )
+
+        st.markdown("#### 🔥 Precarga")
+        warmer = get_cache_warmer()
+        warm_status = warmer.status
+        if warm_status["running"]:
+            st.progress(warm_status["completed"] / max(warm_status["total"], 1),
+                        text=f"🔥 Precargando {warm_status['symbols']} acciones "
+                             f"({warm_status['completed']}/{warm_status['total']})")
+        elif warm_status["last_run"] is not None:
+            st.caption(f"Última precarga: {warm_status['last_run']:%d/%m %H:%M} (hora de Nueva York), "
+                       f"{warm_status['symbols']} acciones"
+                       + (f", {warm_status['errors']} con errores" if warm_status['errors'] else ""))
+        if warm_status["failure"]:
+            st.warning(f"⚠️ La última precarga falló: {warm_status['failure']}")
+        if warm_status["next_run"] is not None:
+            st.caption(f"Próxima precarga: {warm_status['next_run']:%d/%m %H:%M} (hora de Nueva York)")
+        hit_ratio = warmer.hit_ratio
+        if hit_ratio is not None:
+            st.caption(f"🎯 Acciones servidas sin descargar: {hit_ratio:.0%} "
+                       f"({warm_status['hits']} de {warm_status['hits'] + warm_status['misses']})")
+        if st.button("🔥 Precargar ahora", disabled=warm_status["running"]):
+            warmer.trigger()
+            show_notification("🔥 Precarga iniciada en segundo plano", "info")
+
+        st.markdown("#### 🗂️ Información de Empresas")
+        metadata = get_metadata_store()
+        known_symbols = list(dict.fromkeys(
+            list(DEFAULT_STOCK_NAMES) + list(st.session_state.custom_stocks) + metadata.symbols()
+        ))
+        stale_count = len(metadata.stale_symbols(known_symbols))
+        st.caption(f"{len(metadata)} empresas guardadas, {stale_count} por actualizar"
+                   + (f", {metadata.refreshing} actualizándose" if metadata.refreshing else ""))
+        if st.button("🔄 Actualizar información", disabled=stale_count == 0):
+            metadata.refresh_in_background(
+                metadata.stale_symbols(known_symbols), get_market_provider().info,
+                max_workers=st.session_state.fetch_max_workers,
+                timeout=st.session_state.fetch_timeout
+            )
+            show_notification("🔄 Actualización iniciada en segundo plano", "info")
+
         if st.button("📤 Exportar Configuración"):
             config_data = {
                 'custom_stocks': dict(st.session_state.custom_stocks),
                 'custom_categories': list(st.session_state.custom_categories),
                 'investment_presets': dict(st.session_state.investment_presets),
-                'removed_default_stocks': list(st.session_state.removed_default_stocks)
+                'removed_default_stocks': list(st.session_state.removed_default_stocks),
+                'amounts': get_current_investments()
             }
             import json
             config_json = json.dumps(config_data, indent=2, ensure_ascii=False)
@@ -907,8 +1231,64 @@ with tab3:
                 file_name=f"portfolio_config_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
+    
+    st.markdown("---")
+    st.checkbox(
+        "⏱️ Rendimiento",
+        value=st.session_state.show_performance,
+        key="_show_performance",
+        on_change=persist_setting, args=("show_performance",),
+        help="Tiempos de cada etapa y aciertos de caché de todo el servidor"
+    )
+    if st.session_state.show_performance:
+        stages = TELEMETRY.stages()
+        if stages:
+            st.dataframe(
+                {
+                    'Etapa': [stage['stage'] if stage['name'] is None else f"{stage['stage']}:{stage['name']}"
+                              for stage in stages],
+                    'Veces': [stage['count'] for stage in stages],
+                    'Total (s)': [round(stage['total'], 3) for stage in stages],
+                    'Promedio (ms)': [round(stage['mean'] * 1000, 1) for stage in stages],
+                    'Máximo (ms)': [round(stage['max'] * 1000, 1) for stage in stages],
+                    'Última (ms)': [round(stage['last'] * 1000, 1) for stage in stages],
+                },
+                use_container_width=True, hide_index=True
+            )
+        else:
+            st.caption("Sin mediciones todavía: calcula un análisis para ver los tiempos")
+        
+        caches = TELEMETRY.caches()
+        if caches:
+            st.dataframe(
+                {
+                    'Caché': [cache['cache'] for cache in caches],
+                    'Aciertos': [cache['hits'] for cache in caches],
+                    'Fallos': [cache['misses'] for cache in caches],
+                    'Tasa de aciertos': [f"{cache['hit_ratio']:.0%}" for cache in caches],
+                },
+                use_container_width=True, hide_index=True
+            )
+        
+        with st.expander("🕒 Mediciones recientes"):
+            recent = pd.DataFrame(TELEMETRY.recent(50))
+            if len(recent) > 0:
+                recent['ts'] = pd.to_datetime(recent['ts'], unit='s')
+            st.dataframe(recent, use_container_width=True, hide_index=True)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("📥 Métricas Prometheus", TELEMETRY.prometheus_text(),
+                               file_name="analizador_metrics.txt", mime="text/plain")
+        with col2:
+            st.download_button("📥 Registro JSON", TELEMETRY.json_lines(),
+                               file_name="analizador_timings.jsonl", mime="application/x-ndjson")
+        with col3:
+            if st.button("🧹 Reiniciar mediciones"):
+                TELEMETRY.reset()
+                st.rerun()
 
-with tab4:
+if current_view == "help":
     st.markdown("### ❓ Centro de Ayuda")
     
     col1, col2 = st.columns(2)
@@ -966,7 +1346,7 @@ with tab4:
         Sí, usa los presets en la pestaña Configuración
         
         **¿Los datos son en tiempo real?**
-        Los datos tienen un retraso de ~15 minutos, actualización automática cada hora
+        Los datos tienen un retraso de ~15 minutos; los precios históricos se guardan localmente y solo se descargan los días nuevos
         """)
 
 # ============= SIDEBAR MEJORADO =============
@@ -1026,24 +1406,11 @@ with st.sidebar:
     # Presets de fechas
     date_preset = st.selectbox(
         "⚡ Presets rápidos:",
-        ["Personalizado", "Último año", "Últimos 6 meses", "Últimos 3 meses", "YTD", "Últimos 5 años"]
+        ["Personalizado"] + list(DATE_PRESETS)
     )
     
-    if date_preset == "Último año":
-        start_date = datetime.now() - timedelta(days=365)
-        end_date = datetime.now() - timedelta(days=1)
-    elif date_preset == "Últimos 6 meses":
-        start_date = datetime.now() - timedelta(days=180)
-        end_date = datetime.now() - timedelta(days=1)
-    elif date_preset == "Últimos 3 meses":
-        start_date = datetime.now() - timedelta(days=90)
-        end_date = datetime.now() - timedelta(days=1)
-    elif date_preset == "YTD":
-        start_date = datetime(datetime.now().year, 1, 1)
-        end_date = datetime.now() - timedelta(days=1)
-    elif date_preset == "Últimos 5 años":
-        start_date = datetime.now() - timedelta(days=365*5)
-        end_date = datetime.now() - timedelta(days=1)
+    if date_preset in DATE_PRESETS:
+        start_date, end_date = preset_range(date_preset)
     else:
         col1, col2 = st.columns(2)
         with col1:
@@ -1059,6 +1426,20 @@ with st.sidebar:
                 max_value=datetime.now()
             )
     
+    interval_label = st.selectbox(
+        "⏱️ Intervalo:",
+        list(INTERVAL_LABELS),
+        index=list(INTERVAL_LABELS.values()).index(DEFAULT_INTERVAL),
+        key="analysis_interval_choice",
+        help="Las barras intradiarias solo están disponibles para los últimos días"
+    )
+    analysis_interval = INTERVAL_LABELS[interval_label]
+    first_day = earliest_start(analysis_interval)
+    if first_day is not None and to_day(start_date) < first_day:
+        start_date = datetime.combine(first_day, datetime.min.time())
+        end_date = datetime.combine(to_day(end_date), datetime.min.time())
+        st.caption(f"⏱️ Barras de {INTERVALS[analysis_interval]['label']} desde el {first_day:%d/%m/%Y}")
+    
     st.markdown("---")
     
     # Gestión de acciones con interfaz mejorada
@@ -1107,20 +1488,65 @@ with st.sidebar:
                 else:
                     show_notification("⚠️ Completa todos los campos", "warning")
     
+    with st.expander("📥 Importar Cartera", expanded=False):
+        holdings_file = st.file_uploader(
+            "Archivo CSV o JSON:",
+            type=["csv", "json"],
+            key="holdings_file",
+            help="Columnas symbol, amount y category (opcional); también acepta un archivo de Exportar Configuración"
+        )
+        replace_amounts = st.checkbox("Reemplazar montos actuales", key="holdings_replace")
+        if st.button("📥 Importar", key="holdings_import", disabled=holdings_file is None):
+            try:
+                holdings = read_holdings(holdings_file.getvalue(), holdings_file.name)
+            except ValueError as e:
+                show_notification(f"❌ {e}", "error")
+            else:
+                progress_bar = st.progress(0.0, text=f"🔍 Validando {len(holdings)} símbolos...")
+                
+                def update_import_progress(symbol, completed, total):
+                    progress_bar.progress(completed / total, text=f"🔍 {symbol} ({completed}/{total})")
+                
+                imported, errors = import_holdings(holdings, replace_amounts, update_import_progress)
+                st.session_state.import_report = {"imported": imported, "errors": errors}
+                if len(get_all_stocks()) > EDITOR_THRESHOLD:
+                    st.session_state.investment_edit_mode = "Tabla"
+                st.rerun()
+        
+        report = st.session_state.get('import_report')
+        if report:
+            st.success(f"📥 {report['imported']} acciones importadas")
+            if report['errors']:
+                st.warning(f"⚠️ {len(report['errors'])} símbolos no válidos: "
+                           + ", ".join(list(report['errors'])[:10]))
+    
     # Mostrar resumen del portfolio
     if st.session_state.custom_stocks:
         st.markdown("#### 🌟 Acciones Personalizadas")
-        for symbol, data in st.session_state.custom_stocks.items():
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.markdown(f"**{symbol}**")
-                st.caption(f"{data['category']}")
-            with col2:
-                if st.button("🗑️", key=f"del_{symbol}", help="Eliminar"):
+        if len(st.session_state.custom_stocks) > EDITOR_THRESHOLD:
+            # Un botón por acción no escala a carteras importadas
+            to_remove = st.multiselect(
+                f"{len(st.session_state.custom_stocks)} acciones:",
+                list(st.session_state.custom_stocks),
+                key="custom_stocks_to_remove"
+            )
+            if st.button("🗑️ Eliminar seleccionadas", disabled=not to_remove, key="del_selected_custom"):
+                for symbol in to_remove:
                     del st.session_state.custom_stocks[symbol]
-                    if f"investment_{symbol}" in st.session_state:
-                        del st.session_state[f"investment_{symbol}"]
-                    st.rerun()
+                    st.session_state.pop(f"investment_{symbol}", None)
+                st.rerun()
+        else:
+            for symbol, data in st.session_state.custom_stocks.items():
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.markdown(f"**{symbol}**")
+                    st.caption(f"{data['category']}")
+                with col2:
+                    if st.button("🗑️", key=f"del_{symbol}", help="Eliminar"):
+                        del st.session_state.custom_stocks[symbol]
+                        if f"investment_{symbol}" in st.session_state:
+                            del st.session_state[f"investment_{symbol}"]
+                        st.rerun()
     
     st.markdown("---")
     
@@ -1128,17 +1554,7 @@ with st.sidebar:
     st.markdown("#### 💰 Configurar Inversiones")
     
     # Combinar todas las acciones
-    ALL_STOCKS = {}
-    for name, data in DEFAULT_STOCKS.items():
-        symbol = data["symbol"]
-        if symbol not in st.session_state.removed_default_stocks:
-            ALL_STOCKS[name] = data
-    
-    for symbol, data in st.session_state.custom_stocks.items():
-        ALL_STOCKS[data["name"]] = {
-            "symbol": symbol,
-            "category": data["category"]
-        }
+    ALL_STOCKS = get_all_stocks()
     
     # Filtro por categoría
     if ALL_STOCKS:
@@ -1149,34 +1565,72 @@ with st.sidebar:
             key="category_filter_sidebar"
         )
         
+        edit_mode = st.radio(
+            "Edición:",
+            ["Campos", "Tabla"],
+            index=1 if len(ALL_STOCKS) > EDITOR_THRESHOLD else 0,
+            horizontal=True,
+            key="investment_edit_mode",
+            help="La tabla edita cientos de montos sin crear un campo por acción"
+        )
+        
         investments = {}
         
-        # Mostrar acciones filtradas
-        for name, data in ALL_STOCKS.items():
-            symbol = data["symbol"]
-            category = data["category"]
-            
-            if category_filter != "Todas" and category != category_filter:
-                continue
-            
-            current_value = st.session_state.get(f"investment_{symbol}", 0.0)
+        if edit_mode == "Tabla":
+            rows = {"Símbolo": [], "Nombre": [], "Categoría": [], "Monto": []}
+            for name, data in ALL_STOCKS.items():
+                if category_filter != "Todas" and data["category"] != category_filter:
+                    continue
+                rows["Símbolo"].append(data["symbol"])
+                rows["Nombre"].append(name)
+                rows["Categoría"].append(data["category"])
+                rows["Monto"].append(float(st.session_state.get(f"investment_{data['symbol']}", 0.0)))
             
-            # Input de inversión más compacto
-            investments[symbol] = st.number_input(
-                f"💰 {symbol}",
-                min_value=0.0,
-                value=current_value,
-                step=50.0,
-                key=f"investment_{symbol}",
-                help=f"{name} | {category}"
+            # Sin clave: al cambiar los montos guardados la tabla se arma con los nuevos valores
+            edited = st.data_editor(
+                pd.DataFrame(rows),
+                column_config={
+                    "Monto": st.column_config.NumberColumn("💰 Monto", min_value=0.0, step=50.0, format=f"{money_prefix(st.session_state.base_currency)}%.2f"),
+                },
+                disabled=["Símbolo", "Nombre", "Categoría"],
+                hide_index=True,
+                use_container_width=True,
+                height=min(600, 35 * (len(rows["Símbolo"]) + 1) + 3)
             )
+            investments = dict(zip(edited["Símbolo"], edited["Monto"].fillna(0.0).astype(float)))
+            # Reasignar cada monto lo conserva aunque su campo no se muestre
+            for data in ALL_STOCKS.values():
+                symbol = data["symbol"]
+                st.session_state[f"investment_{symbol}"] = investments.get(
+                    symbol, float(st.session_state.get(f"investment_{symbol}", 0.0))
+                )
+        else:
+            # Mostrar acciones filtradas
+            for name, data in ALL_STOCKS.items():
+                symbol = data["symbol"]
+                category = data["category"]
+                
+                if category_filter != "Todas" and category != category_filter:
+                    continue
+                
+                current_value = st.session_state.get(f"investment_{symbol}", 0.0)
+                
+                # Input de inversión más compacto
+                investments[symbol] = st.number_input(
+                    f"💰 {symbol}",
+                    min_value=0.0,
+                    value=current_value,
+                    step=50.0,
+                    key=f"investment_{symbol}",
+                    help=f"{name} | {category}"
+                )
     
     # Resumen de inversión
     if 'investments' in locals():
         total_investment = sum(investments.values())
         if total_investment > 0:
             st.markdown("#### 📊 Resumen")
-            st.success(f"💰 Total: ${total_investment:,.2f}")
+            st.success(f"💰 Total: {format_money(total_investment, st.session_state.base_currency)}")
             active_count = sum(1 for v in investments.values() if v > 0)
             st.info(f"📈 Activas: {active_count}")
     
@@ -1191,43 +1645,87 @@ with st.sidebar:
                 show_notification("❌ La fecha de inicio debe ser anterior a la fecha final", "error")
             else:
                 try:
+                    calculate_started = time.perf_counter()
                     # Mostrar progreso inmediatamente
                     progress_placeholder = st.empty()
                     with progress_placeholder.container():
                         with st.spinner("🔄 Analizando inversiones..."):
-                            st.write(f"📊 Procesando {len(active_investments)} inversiones...")
+                            progress_bar = st.progress(0.0, text=f"📊 Procesando {len(active_investments)} inversiones...")
+                            
+                            def update_progress(label, completed, total):
+                                progress_bar.progress(completed / total, text=f"📈 {label} ({completed}/{total})")
+                            
+                            # Solo las acciones sin métricas para este período requieren precios
+                            metrics_cache = get_metrics_cache()
+                            base_currency = st.session_state.base_currency
+                            pending = metrics_cache.missing(active_investments, start_date, end_date, analysis_interval,
+                                                            base_currency)
+                            get_cache_warmer().record(active_investments, pending)
+                            fetch_errors, fallback_data = {}, {}
+                            if pending:
+                                price_data, fetch_errors = fetch_analysis_inputs(
+                                    pending, start_date, end_date, update_progress, analysis_interval
+                                )
+                                # Con la moneda de cada acción ya guardada, los precios se expresan en la base
+                                price_data, fx_errors = get_currency_converter().convert(
+                                    price_data, base_currency, start_date, end_date
+                                )
+                                fetch_errors.update(fx_errors)
+                                # Los precios guardados que se sirven tras un fallo pueden estar incompletos:
+                                # se analizan pero no quedan como métricas del período
+                                fallback_data = {symbol: data for symbol, data in price_data.items()
+                                                 if symbol in fetch_errors}
+                                metrics_cache.add(
+                                    {symbol: data for symbol, data in price_data.items() if symbol not in fallback_data},
+                                    start_date, end_date, analysis_interval, base_currency
+                                )
+                            else:
+                                refresh_stale_metadata(active_investments)
                             
-                            # Obtener datos y calcular métricas
-                            results = {}
-                            stock_infos = {}
+                            # Los montos solo escalan las métricas guardadas
+                            categories = {symbol: get_stock_category(symbol) for symbol in active_investments}
+                            # Las dos bases de retorno salen de las mismas métricas guardadas
+                            bases = {basis: metrics_cache.results(
+                                active_investments, categories, start_date, end_date, analysis_interval, basis,
+                                base_currency
+                            ) for basis in RETURN_BASES}
+                            if fallback_data:
+                                # Caché propio: sus cierres se liberan junto con los resultados de la sesión
+                                fallback_cache = MetricsCache()
+                                fallback_cache.add(fallback_data, start_date, end_date, analysis_interval, base_currency)
+                                for basis, basis_results in bases.items():
+                                    basis_results.update(fallback_cache.results(
+                                        active_investments, categories, start_date, end_date, analysis_interval, basis,
+                                        base_currency
+                                    ))
+                            results = bases["price"]
                             
-                            for i, (symbol, amount) in enumerate(active_investments.items()):
-                                st.write(f"📈 Analizando {symbol}... ({i+1}/{len(active_investments)})")
-                                
-                                data = get_stock_data(symbol, start_date, end_date)
-                                
-                                if data is not None:
-                                    stock_info = get_stock_info(symbol)
-                                    stock_infos[symbol] = stock_info
-                                    
-                                    metrics = calculate_investment_metrics(data, amount)
-                                    
-                                    if metrics:
-                                        # Agregar información de categoría
-                                        metrics['category'] = get_stock_category(symbol)
-                                        results[symbol] = metrics
-                                else:
-                                    st.warning(f"⚠️ No se encontraron datos para {symbol}")
+                            for symbol in active_investments:
+                                if symbol not in results:
+                                    reason = fetch_errors.get(symbol, "Sin datos en el período")
+                                    st.warning(f"⚠️ No se encontraron datos para {symbol}: {reason}")
                     
+                    TELEMETRY.record("calculate", time.perf_counter() - calculate_started,
+                                     symbols=len(active_investments), fetched=len(pending))
                     # Limpiar el placeholder de progreso
                     progress_placeholder.empty()
                     
                     if results:
                         # Guardar resultados inmediatamente en session state
                         st.session_state.analysis_results = results
-                        st.session_state.stock_infos = stock_infos
+                        st.session_state.analysis_bases = bases
+                        st.session_state.analysis_frames = {basis: results_frame(basis_results)
+                                                            for basis, basis_results in bases.items()}
+                        st.session_state.montecarlo = None
+                        st.session_state.backtest = None
                         st.session_state.analysis_start_date = start_date.strftime('%d/%m/%Y')
                         st.session_state.analysis_end_date = end_date.strftime('%d/%m/%Y')
+                        st.session_state.analysis_interval = analysis_interval
+                        st.session_state.analysis_currency = base_currency
+                        units = {symbol: get_currency_converter().currency_of(symbol) for symbol in results}
+                        st.session_state.analysis_converted = {symbol: unit[0] for symbol, unit in units.items()
+                                                               if unit is not None and unit[0] != base_currency}
+                        st.session_state.analysis_fallback = [symbol for symbol in fallback_data if symbol in results]
                         st.session_state.last_calculation = "completed"
                         
                         # Mostrar notificación de éxito
@@ -0,0 +1 @@
+"""Benchmarks del Analizador de Inversiones sobre datos sin red."""
@@ -0,0 +1,328 @@
+"""Benchmark del pipeline de la pestaña Análisis con portfolios sintéticos.
+
+Recorre descarga -> métricas -> agregación por categoría -> tablas -> figuras
+para cada combinación de número de acciones y años de historia, usando el
+proveedor local (sin red), y guarda un reporte JSON comparable entre commits.
+
+    python -m benchmarks.pipeline --output bench_pipeline.json
+    python -m benchmarks.pipeline --symbols 10 100 --years 1 5 --baseline anterior.json
+    python -m benchmarks.pipeline --intraday 5m --intraday-days 60 --symbols 50
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from analizador.backtest import run_backtest
+from analizador.charts import (
+    category_pie_figure, category_profit_figure, normalized_prices_figure, symbol_profit_figure
+)
+from analizador.engine import MetricsCache, close_matrix, load_history
+from analizador.fx import CurrencyConverter
+from analizador.intervals import INTRADAY_INTERVALS
+from analizador.metadata import MetadataStore
+from analizador.providers import LocalProvider
+from analizador.rolling import ROLLING_WINDOWS, rolling_metrics, with_portfolio
+from analizador.report import category_summary, category_table, results_frame, results_table
+from analizador.store import BarCache, PriceStore, SharedCloses
+
+DEFAULT_SYMBOLS = [10, 100, 1000]
+DEFAULT_YEARS = [1, 5, 20]
+
+# Fecha final fija para que los datos sintéticos sean idénticos entre corridas
+END_DATE = datetime(2024, 12, 31)
+CATEGORY_COUNT = 15
+
+# Monedas de cotización que se reparten entre las acciones sintéticas; el análisis se hace en la primera
+QUOTE_CURRENCIES = ("EUR", "USD", "GBp")
+
+
+def synthetic_portfolio(n_symbols):
+    """Símbolos, montos y categorías deterministas para un portfolio de prueba"""
+    symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+    amounts = {symbol: float(100 + (i % 20) * 50) for i, symbol in enumerate(symbols)}
+    categories = {symbol: f"Categoría {i % CATEGORY_COUNT}" for i, symbol in enumerate(symbols)}
+    return symbols, amounts, categories
+
+
+def pipeline_stages(store, provider, symbols, amounts, categories, start, end, metadata):
+    """Etapas del pipeline como (nombre, función); cada una usa el estado previo"""
+    state = {}
+    base = QUOTE_CURRENCIES[0]
+
+    def fetch_cold():
+        state['price_data'], _ = store.get_history(symbols, start, end, provider.history_batch)
+
+    def fetch_warm():
+        state['price_data'], _ = store.get_history(symbols, start, end, provider.history_batch)
+
+    def fx():
+        # Dos de cada tres acciones cotizan en otra moneda; incluye la descarga de los tipos de cambio
+        converter = CurrencyConverter(store, provider.history_batch, metadata)
+        state['price_data'], _ = converter.convert(state['price_data'], base, start, end)
+
+    def metrics():
+        state['cache'] = MetricsCache(SharedCloses())
+        state['cache'].add(state['price_data'], start, end, currency=base)
+        state['results'] = state['cache'].results(amounts, categories, start, end, currency=base)
+
+    def rescale():
+        # Otros montos sobre las métricas ya calculadas, como al volver a presionar Calcular
+        new_amounts = {symbol: amount * 2 for symbol, amount in amounts.items()}
+        state['cache'].results(new_amounts, categories, start, end, currency=base)
+
+    def rolling():
+        results = state['results']
+        prices = with_portfolio(close_matrix(results), {s: m['shares'] for s, m in results.items()})
+        for window in ROLLING_WINDOWS:
+            rolling_metrics(prices, window)
+
+    def backtest():
+        # Aportes mensuales con rebalanceo trimestral a los pesos de los montos
+        run_backtest(close_matrix(state['results']), amounts, initial=sum(amounts.values()),
+                     contribution=1000.0, contribution_freq="M", rebalance="periodic", rebalance_freq="Q")
+
+    def category_aggregation():
+        state['frame'] = results_frame(state['results'])
+        state['category_analysis'] = category_summary(state['frame'])
+        category_table(state['category_analysis'])
+
+    def results_table_stage():
+        results_table(state['frame'], {})
+
+    def figures():
+        results, category_analysis = state['results'], state['category_analysis']
+        figs = [
+            category_profit_figure(category_analysis),
+            symbol_profit_figure(state['frame']),
+            normalized_prices_figure(results),
+            category_pie_figure(category_analysis, 'investment', "Capital por Categoría"),
+            category_pie_figure(category_analysis, 'final_value', "Valor Final por Categoría"),
+        ]
+        # Serializar como lo hace st.plotly_chart al enviar la figura al navegador
+        payloads = [len(fig.to_json()) for fig in figs]
+        state['figure_bytes'] = sum(payloads)
+        state['normalized_bytes'] = payloads[2]
+
+    stages = [
+        ("fetch_cold", fetch_cold),
+        ("fetch_warm", fetch_warm),
+        ("fx", fx),
+        ("metrics", metrics),
+        ("rescale", rescale),
+        ("rolling", rolling),
+        ("backtest", backtest),
+        ("category_aggregation", category_aggregation),
+        ("results_table", results_table_stage),
+        ("figures", figures),
+    ]
+    return stages, state
+
+
+def run_scenario(n_symbols, years, track_memory, latency=0.0):
+    """Ejecuta el pipeline completo y mide cada etapa"""
+    symbols, amounts, categories = synthetic_portfolio(n_symbols)
+    end = END_DATE
+    start = end - timedelta(days=365 * years)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = LocalProvider(root=tmp, latency=latency)
+        store = PriceStore(Path(tmp) / "prices.sqlite")
+        metadata = MetadataStore(Path(tmp) / "metadata.sqlite")
+        for i, symbol in enumerate(symbols):
+            metadata.put(symbol, {'currency': QUOTE_CURRENCIES[i % len(QUOTE_CURRENCIES)]})
+        stages, state = pipeline_stages(store, provider, symbols, amounts, categories, start, end, metadata)
+
+        measured = {}
+        for name, fn in stages:
+            gc.collect()
+            blocks_before = sys.getallocatedblocks()
+            if track_memory:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            fn()
+            wall = time.perf_counter() - t0
+            entry = {"wall_s": wall}
+            if track_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                entry["peak_bytes"] = peak
+                entry["net_bytes"] = current
+            entry["net_blocks"] = sys.getallocatedblocks() - blocks_before
+            measured[name] = entry
+
+        # Referencia sin reducción de puntos, fuera de las etapas medidas
+        full_figure = normalized_prices_figure(state['results'], n_buckets=None,
+                                               webgl_threshold=float("inf"))
+
+        rows = int(sum(len(data) for data in state['price_data'].values()))
+        return {
+            "symbols": n_symbols,
+            "years": years,
+            "rows": rows,
+            "figure_json_bytes": state.get('figure_bytes'),
+            "normalized_figure_json_bytes": {
+                "full": len(full_figure.to_json()),
+                "downsampled": state.get('normalized_bytes'),
+            },
+            "stages": measured,
+        }
+
+
+def run_intraday(n_symbols, interval, days):
+    """Descarga en tramos y métricas de barras intradiarias, con la memoria que ocupan
+
+    Reporta los bytes guardados en BarCache (float32) junto a los que
+    ocuparían las mismas barras en float64.
+    """
+    symbols, amounts, categories = synthetic_portfolio(n_symbols)
+    end = END_DATE
+    start = end - timedelta(days=days)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = LocalProvider(root=tmp)
+        bar_cache = BarCache()
+        t0 = time.perf_counter()
+        price_data, _ = load_history(symbols, start, end, interval, provider, None, bar_cache)
+        fetch_wall = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cache = MetricsCache(SharedCloses())
+        cache.add(price_data, start, end, interval)
+        cache.results(amounts, categories, start, end, interval)
+        metrics_wall = time.perf_counter() - t0
+
+        rows = int(sum(len(data) for data in price_data.values()))
+        return {
+            "symbols": n_symbols,
+            "interval": interval,
+            "days": days,
+            "rows": rows,
+            "bar_cache_bytes": bar_cache.nbytes,
+            "float64_bytes": rows * 8 * (len(next(iter(price_data.values())).columns) + 1) if rows else 0,
+            "budget_bytes": bar_cache.budget_bytes,
+            "stages": {"fetch": {"wall_s": fetch_wall}, "metrics": {"wall_s": metrics_wall}},
+        }
+
+
+def run_benchmark(symbol_counts, years_list, track_memory=True, latency=0.0, log=print):
+    """Recorre todas las combinaciones; la memoria se mide en una pasada aparte"""
+    scenarios = []
+    for n_symbols in symbol_counts:
+        for years in years_list:
+            log(f"▶ {n_symbols} acciones × {years} años")
+            result = run_scenario(n_symbols, years, track_memory=False, latency=latency)
+            if track_memory:
+                # tracemalloc distorsiona los tiempos, por eso se usa otra corrida
+                memory = run_scenario(n_symbols, years, track_memory=True, latency=latency)
+                for name, entry in memory["stages"].items():
+                    result["stages"][name]["peak_bytes"] = entry["peak_bytes"]
+                    result["stages"][name]["net_bytes"] = entry["net_bytes"]
+            for name, entry in result["stages"].items():
+                log(f"   {name:<22} {entry['wall_s']:8.3f}s")
+            payload = result["normalized_figure_json_bytes"]
+            log(f"   {'precios normalizados':<22} {payload['full'] / 1e6:8.2f}MB -> "
+                f"{payload['downsampled'] / 1e6:.2f}MB")
+            scenarios.append(result)
+    return {"meta": environment_metadata(), "scenarios": scenarios}
+
+
+def environment_metadata():
+    """Versión del código y del entorno para comparar reportes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+    }
+
+
+def compare_reports(current, baseline, threshold):
+    """Lista (escenario, etapa, antes, después, razón) de etapas más lentas que threshold"""
+    previous = {(s["symbols"], s["years"]): s["stages"] for s in baseline["scenarios"]}
+    regressions = []
+    for scenario in current["scenarios"]:
+        before = previous.get((scenario["symbols"], scenario["years"]), {})
+        for name, entry in scenario["stages"].items():
+            if name in before and before[name]["wall_s"] > 0:
+                ratio = entry["wall_s"] / before[name]["wall_s"]
+                if ratio > threshold:
+                    key = f'{scenario["symbols"]}x{scenario["years"]}a'
+                    regressions.append((key, name, before[name]["wall_s"], entry["wall_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=DEFAULT_SYMBOLS)
+    parser.add_argument("--years", type=int, nargs="+", default=DEFAULT_YEARS)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latencia simulada por solicitud al proveedor (s)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Omitir la pasada de memoria con tracemalloc")
+    parser.add_argument("--intraday", choices=INTRADAY_INTERVALS,
+                        help="Medir en cambio barras intradiarias de este intervalo")
+    parser.add_argument("--intraday-days", type=int, default=60,
+                        help="Días de barras intradiarias por acción")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="Reporte anterior contra el cual comparar")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Razón de tiempo a partir de la cual se reporta una regresión")
+    args = parser.parse_args(argv)
+
+    if args.intraday:
+        report = {"meta": environment_metadata(), "intraday": [
+            run_intraday(n_symbols, args.intraday, args.intraday_days) for n_symbols in args.symbols
+        ]}
+        for entry in report["intraday"]:
+            print(f"▶ {entry['symbols']} acciones × {entry['days']} días de {entry['interval']}: "
+                  f"{entry['rows']:,} barras, {entry['bar_cache_bytes'] / 1e6:.1f}MB "
+                  f"(float64: {entry['float64_bytes'] / 1e6:.1f}MB, presupuesto "
+                  f"{entry['budget_bytes'] / 1e6:.0f}MB), descarga {entry['stages']['fetch']['wall_s']:.2f}s, "
+                  f"métricas {entry['stages']['metrics']['wall_s']:.2f}s")
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Reporte guardado en {args.output}")
+        return 0
+
+    report = run_benchmark(args.symbols, args.years, track_memory=not args.no_memory,
+                           latency=args.latency)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Reporte guardado en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.threshold)
+        for key, stage, before, after, ratio in regressions:
+            print(f"⚠️ {key} {stage}: {before:.3f}s -> {after:.3f}s (x{ratio:.2f})")
+        if regressions:
+            return 1
+        print("✅ Sin regresiones respecto al reporte base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Benchmark de arranque de la app: imports y tiempo hasta la primera pintura.
+
+Cada medición corre en un intérprete nuevo para capturar el arranque en frío.
+La primera pintura se aproxima con la primera ejecución completa del script
+en streamlit.testing (sin navegador). También mide el rerun de cada vista con
+un análisis ya calculado, que es lo que paga cada interacción del usuario.
+
+    python -m benchmarks.startup --output bench_startup.json
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+# Módulos pesados que no deberían cargarse hasta que se necesiten
+TRACKED_MODULES = ["yfinance", "plotly.express", "plotly.graph_objects", "pandas", "numpy", "pyarrow"]
+
+VIEWS = ["🏠 Portfolio", "📊 Análisis", "⚙️ Configuración", "❓ Ayuda"]
+
+
+def app_import_source():
+    """Sentencias import de nivel superior de app.py"""
+    tree = ast.parse(APP_PATH.read_text(encoding="utf-8"))
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return ast.unparse(ast.Module(body=imports, type_ignores=[]))
+
+
+def child_imports():
+    """Tiempo de los imports de app.py y módulos pesados que quedan cargados"""
+    source = app_import_source()
+    t0 = time.perf_counter()
+    exec(compile(source, str(APP_PATH), "exec"), {})
+    elapsed = time.perf_counter() - t0
+    return {
+        "import_s": elapsed,
+        "loaded_modules": [m for m in TRACKED_MODULES if m in sys.modules],
+    }
+
+
+def child_first_paint(n_symbols):
+    """Primera ejecución del script y rerun de cada vista con un análisis calculado"""
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(str(APP_PATH), default_timeout=600).run()
+    first_paint = time.perf_counter() - t0
+    loaded_after_paint = [m for m in TRACKED_MODULES if m in sys.modules]
+
+    from analizador.engine import analyze_portfolios, Portfolio
+    from analizador.providers import LocalProvider
+
+    symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+    portfolio = Portfolio("bench", {symbol: 100.0 for symbol in symbols})
+    end = "2024-12-31"
+    analyses, _ = analyze_portfolios([portfolio], "2020-01-01", end, provider=LocalProvider())
+    at.session_state["analysis_results"] = analyses["bench"]
+
+    reruns = {}
+    for view in VIEWS:
+        at.radio(key="view_selector").set_value(view)
+        t0 = time.perf_counter()
+        at.run()
+        reruns[view] = time.perf_counter() - t0
+
+    return {
+        "first_paint_s": first_paint,
+        "loaded_after_first_paint": loaded_after_paint,
+        "rerun_s": reruns,
+    }
+
+
+def run_child(mode, n_symbols, data_dir):
+    """Ejecuta una medición en un intérprete nuevo y retorna su resultado"""
+    env = dict(os.environ, ANALIZADOR_DATA_DIR=data_dir, ANALIZADOR_PROVIDER="local")
+    cmd = [sys.executable, "-m", "benchmarks.startup", "--child", mode, "--symbols", str(n_symbols)]
+    output = subprocess.run(
+        cmd, env=env, cwd=APP_PATH.parent, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(repeat, n_symbols, log=print):
+    """Mediana de repeat corridas en frío de cada medición"""
+    imports, paints = [], []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for i in range(repeat):
+            imports.append(run_child("imports", n_symbols, data_dir))
+            paints.append(run_child("paint", n_symbols, data_dir))
+            log(f"▶ corrida {i + 1}/{repeat}: imports {imports[-1]['import_s']:.3f}s, "
+                f"primera pintura {paints[-1]['first_paint_s']:.3f}s")
+
+    from benchmarks.pipeline import environment_metadata
+
+    return {
+        "meta": environment_metadata(),
+        "symbols_in_analysis": n_symbols,
+        "import_s": statistics.median(r["import_s"] for r in imports),
+        "loaded_modules_after_imports": imports[-1]["loaded_modules"],
+        "first_paint_s": statistics.median(r["first_paint_s"] for r in paints),
+        "loaded_modules_after_first_paint": paints[-1]["loaded_after_first_paint"],
+        "rerun_s": {
+            view: statistics.median(r["rerun_s"][view] for r in paints) for view in VIEWS
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--symbols", type=int, default=100,
+                        help="Acciones del análisis usado para medir los reruns")
+    parser.add_argument("--output", default="bench_startup.json")
+    parser.add_argument("--child", choices=["imports", "paint"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "imports":
+        print(json.dumps(child_imports()))
+        return 0
+    if args.child == "paint":
+        print(json.dumps(child_first_paint(args.symbols)))
+        return 0
+
+    report = run_benchmark(args.repeat, args.symbols)
+    for view, seconds in report["rerun_s"].items():
+        print(f"   rerun {view:<18} {seconds:.3f}s")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Reporte guardado en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""run_backtest frente a una simulación día por día de la cartera."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analizador.backtest import DAYS_PER_YEAR, money_weighted_return, run_backtest
+
+
+def reference_backtest(prices, weights, initial=0.0, contribution=0.0, contribution_freq=None,
+                       rebalance=None, rebalance_freq="Q", threshold=0.05):
+    """Valor y fechas de rebalanceo recorriendo las fechas una por una"""
+    weights = pd.Series(weights, dtype=float).reindex(prices.columns).fillna(0.0).to_numpy()
+    filled = prices.ffill()
+    filled = filled.iloc[int(np.argmax(filled.loc[:, weights > 0].notna().any(axis=1).to_numpy())):]
+
+    holdings = np.zeros(len(prices.columns))
+    values, flows, rebalances = [], [], []
+    previous = None
+    for i, (day, row) in enumerate(filled.iterrows()):
+        price = row.to_numpy(dtype=float)
+        available = ~np.isnan(price)
+        market = np.where(available, price, 0.0)
+        safe = np.where(available, price, 1.0)
+        target = np.where(available, weights, 0.0)
+        target = target / target.sum() if target.sum() > 0 else target
+
+        flow = initial if i == 0 else 0.0
+        if contribution_freq and (previous is None or pd.Period(day, contribution_freq) !=
+                                  pd.Period(previous, contribution_freq)):
+            flow += contribution
+        holdings = holdings + flow * target / safe
+
+        if i > 0 and rebalance == "periodic":
+            rebalanced = pd.Period(day, rebalance_freq) != pd.Period(previous, rebalance_freq)
+        elif i > 0 and rebalance == "threshold":
+            total = holdings @ market
+            rebalanced = np.abs(holdings * market / total - target).max() > threshold
+        else:
+            rebalanced = False
+        if rebalanced:
+            holdings = (holdings @ market) * target / safe
+            rebalances.append(day)
+
+        values.append(holdings @ market)
+        flows.append(flow)
+        previous = day
+    return pd.Series(values, index=filled.index), np.array(flows), pd.DatetimeIndex(rebalances)
+
+
+@pytest.fixture
+def prices():
+    """Tres años de cierres: CCC empieza a cotizar después y BBB tiene huecos"""
+    rng = np.random.default_rng(11)
+    index = pd.bdate_range("2020-01-01", periods=780, name="Date")
+    values = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, (len(index), 3)), axis=0))
+    matrix = pd.DataFrame(values, index=index, columns=["AAA", "BBB", "CCC"])
+    matrix.iloc[:200, 2] = np.nan
+    matrix.iloc[rng.choice(len(index), 30, replace=False), 1] = np.nan
+    return matrix
+
+
+WEIGHTS = {"AAA": 0.5, "BBB": 0.3, "CCC": 0.2}
+
+
+@pytest.mark.parametrize("options", [
+    dict(initial=1000.0),
+    dict(initial=1000.0, contribution=100.0, contribution_freq="M"),
+    dict(initial=500.0, contribution=50.0, contribution_freq="W", rebalance="periodic", rebalance_freq="M"),
+    dict(initial=1000.0, contribution=200.0, contribution_freq="Q", rebalance="periodic", rebalance_freq="Y"),
+    dict(initial=1000.0, rebalance="threshold", threshold=0.05),
+    dict(initial=1000.0, contribution=100.0, contribution_freq="M", rebalance="threshold", threshold=0.02),
+])
+def test_backtest_matches_daily_simulation(prices, options):
+    result = run_backtest(prices, WEIGHTS, **options)
+    values, flows, rebalances = reference_backtest(prices, WEIGHTS, **options)
+
+    equity = result['equity']
+    np.testing.assert_allclose(equity['value'], values, rtol=1e-9)
+    np.testing.assert_allclose(equity['flow'], flows)
+    np.testing.assert_allclose(equity['invested'], np.cumsum(flows))
+    assert list(result['rebalances']) == list(rebalances)
+    assert result['invested'] == pytest.approx(flows.sum())
+    assert result['final_value'] == pytest.approx(values.iloc[-1])
+
+    # TWR: producto de los retornos diarios sin el efecto de los aportes
+    growth = (values.to_numpy()[1:] - flows[1:]) / values.to_numpy()[:-1]
+    assert result['total_twr_pct'] == pytest.approx((np.prod(growth) - 1) * 100)
+
+
+def test_money_weighted_return_discounts_flows_to_final_value(prices):
+    result = run_backtest(prices, WEIGHTS, initial=1000.0, contribution=100.0, contribution_freq="M")
+    equity = result['equity']
+    years = (equity.index - equity.index[0]).days.to_numpy() / DAYS_PER_YEAR
+    contributed = equity['flow'].to_numpy() > 0
+    rate = result['mwr_pct'] / 100
+
+    # Los aportes capitalizados a la tasa interna suman el valor final
+    grown = equity['flow'].to_numpy()[contributed] * (1 + rate) ** (years[-1] - years[contributed])
+    assert grown.sum() == pytest.approx(result['final_value'], rel=1e-6)
+
+
+def test_single_investment_returns_agree():
+    index = pd.bdate_range("2023-01-02", periods=100, name="Date")
+    prices = pd.DataFrame({"AAA": np.linspace(10, 12, len(index))}, index=index)
+    result = run_backtest(prices, {"AAA": 1.0}, initial=100.0)
+
+    assert result['final_value'] == pytest.approx(120.0)
+    assert result['total_twr_pct'] == pytest.approx(20.0)
+    assert result['twr_pct'] == pytest.approx(20.0)
+    assert result['mwr_pct'] == pytest.approx(20.0)
+
+
+def test_money_weighted_return_without_time_or_flows():
+    assert money_weighted_return([100.0], [0.0], 100.0, 0.0) is None
+    assert money_weighted_return([], [], 100.0, 1.0) is None
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    (dict(weights={"AAA": 1.0}, initial=100.0, rebalance="daily"), "desconocido"),
+    (dict(weights={"AAA": 0.0}, initial=100.0), "peso objetivo positivo"),
+    (dict(weights={"AAA": 1.0}), "monto inicial"),
+])
+def test_invalid_backtests_raise(prices, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        run_backtest(prices, **kwargs)
@@ -0,0 +1,24 @@
+"""Categorías de acciones y períodos predefinidos."""
+
+from datetime import datetime
+
+from analizador.catalog import OTHER_CATEGORY, preset_range, stock_category
+
+
+def test_stock_category():
+    custom = {"BTC-USD": {"name": "Bitcoin", "category": "🪙 Criptomonedas"},
+              "AAPL": {"name": "Apple", "category": "🔹 Mía"}}
+
+    assert stock_category("KO") == "🥤 Consumo"
+    assert stock_category("BTC-USD", custom) == "🪙 Criptomonedas"
+    # Las acciones por defecto conservan su categoría
+    assert stock_category("AAPL", custom) == "💻 Tecnología"
+    assert stock_category("ZZZ", custom) == OTHER_CATEGORY
+    assert stock_category("ZZZ") == OTHER_CATEGORY
+
+
+def test_preset_range():
+    now = datetime(2024, 3, 15, 12, 0)
+    assert preset_range("YTD", now) == (datetime(2024, 1, 1), datetime(2024, 3, 14, 12, 0))
+    start, end = preset_range("Último año", now)
+    assert (end - start).days == 364
@@ -0,0 +1,104 @@
+"""MetricsCache: métricas por período y cierres compartidos acotados."""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analizador.engine import MetricsCache
+from analizador.store import SharedCloses
+
+
+def prices(start, end, dividends=None, seed=0):
+    """Barras diarias hábiles con una caminata aleatoria y dividendos {fecha: monto}"""
+    index = pd.bdate_range(start, end, inclusive="left", name="Date")
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, len(index))))
+    data = pd.DataFrame({"Close": close, "Dividends": 0.0}, index=index)
+    for day, amount in (dividends or {}).items():
+        data.loc[pd.Timestamp(day), "Dividends"] = amount
+    return data
+
+
+def test_results_scale_with_amounts():
+    cache = MetricsCache(SharedCloses())
+    cache.add({"AAA": prices("2023-01-02", "2023-06-30")}, "2023-01-02", "2023-06-30")
+
+    small = cache.results({"AAA": 100.0}, {"AAA": "X"}, "2023-01-02", "2023-06-30")
+    large = cache.results({"AAA": 300.0}, {"AAA": "X"}, "2023-01-02", "2023-06-30")
+
+    assert large["AAA"]["final_value"] == pytest.approx(3 * small["AAA"]["final_value"])
+    assert large["AAA"]["profit_loss_pct"] == pytest.approx(small["AAA"]["profit_loss_pct"])
+    assert cache.missing(["AAA", "BBB"], "2023-01-02", "2023-06-30") == ["BBB"]
+
+
+def test_total_return_closes_are_released_on_eviction():
+    shared = SharedCloses()
+    cache = MetricsCache(shared, max_entries=3)
+    data = prices("2023-01-02", "2024-01-01", {"2023-03-15": 1.0, "2023-09-15": 1.0})
+
+    # Un rango por día de inicio, como los períodos relativos a hoy que cambian a diario
+    for day in pd.bdate_range("2023-01-02", periods=30):
+        start = day.date()
+        cache.add({"AAA": data.loc[day:]}, start, date(2024, 1, 1))
+        cache.results({"AAA": 100.0}, {"AAA": "X"}, start, date(2024, 1, 1), basis="total")
+
+    assert len(cache) == 3
+    # Los cierres por precio se comparten por símbolo; los reinvertidos, uno por entrada guardada
+    assert len(shared) == 1 + 3
+
+
+def test_shared_closes_survive_while_another_entry_uses_them():
+    shared = SharedCloses()
+    cache = MetricsCache(shared, max_entries=1)
+    cache.add({"AAA": prices("2023-01-02", "2023-06-30")}, "2023-01-02", "2023-06-30")
+    first = cache.results({"AAA": 1.0}, {"AAA": "X"}, "2023-01-02", "2023-06-30")["AAA"]["close"]
+
+    cache.add({"AAA": prices("2023-01-02", "2023-06-30")}, "2023-02-01", "2023-06-30")
+
+    assert len(cache) == 1 and len(shared) == 1
+    # La vista entregada antes de descartar la entrada sigue siendo válida
+    assert len(first) > 0 and np.isfinite(first.to_numpy()).all()
+
+
+def test_shared_closes_release():
+    shared = SharedCloses()
+    data = prices("2023-01-02", "2023-03-01")
+    view = shared.share("AAA", data)
+    shared.share("AAA", data.iloc[10:])
+
+    shared.release("AAA")
+    assert len(shared) == 1
+    shared.release("AAA")
+    assert len(shared) == 0
+    pd.testing.assert_series_equal(view, data["Close"], check_freq=False)
+
+
+def test_intraday_closes_are_not_shared():
+    shared = SharedCloses()
+    cache = MetricsCache(shared, max_entries=1)
+    index = pd.date_range("2024-01-02 09:30", periods=78, freq="5min", name="Date")
+    data = pd.DataFrame({"Close": np.linspace(100, 101, len(index)), "Dividends": 0.0}, index=index)
+
+    cache.add({"AAA": data}, "2024-01-02", "2024-01-03", interval="5m")
+    close = cache.results({"AAA": 1.0}, {"AAA": "X"}, "2024-01-02", "2024-01-03", "5m")["AAA"]["close"]
+
+    assert len(shared) == 0
+    assert len(close) == len(data)
+    cache.add({"BBB": data}, "2024-01-02", "2024-01-03", interval="5m")
+    assert len(cache) == 1 and len(shared) == 0
+
+
+def test_shared_closes_follow_changed_prices():
+    shared = SharedCloses()
+    index = pd.bdate_range("2024-01-01", periods=10, name="Date")
+    old = pd.DataFrame({"Close": 100.0}, index=index)
+    shared.share("AAA", old)
+
+    # Un split 4:1 pasó lo guardado a otra base: un subrango ya cubierto trae otros cierres
+    rebased = pd.DataFrame({"Close": 25.0}, index=index[2:7])
+    view = shared.share("AAA", rebased)
+
+    np.testing.assert_allclose(view, 25.0)
+    np.testing.assert_allclose(shared.share("AAA", old.iloc[:4] / 4), 25.0)
+    np.testing.assert_allclose(shared.share("AAA", rebased.iloc[1:3]), 25.0)
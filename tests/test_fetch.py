@@ -0,0 +1,52 @@
+"""run_concurrently: resultados, errores y tiempos límite con hilos colgados."""
+
+import threading
+import time
+
+from analizador.fetch import run_concurrently
+
+
+def test_results_errors_and_progress():
+    progress = []
+
+    def fail():
+        raise LookupError("sin datos")
+
+    results, errors = run_concurrently({"a": lambda: 1, "b": fail, "c": lambda: 3}, max_workers=2,
+                                       on_done=lambda key, done, total: progress.append((done, total)))
+
+    assert results == {"a": 1, "c": 3}
+    assert errors == {"b": "sin datos"}
+    assert sorted(progress) == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_hung_tasks_do_not_block_the_queue():
+    release = threading.Event()
+
+    def hang():
+        release.wait(10)
+        return "tarde"
+
+    tasks = {f"hung{i}": hang for i in range(5)}
+    tasks["quick"] = lambda: "ok"
+    started = time.monotonic()
+    try:
+        results, errors = run_concurrently(tasks, max_workers=2, timeout=0.5)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    # Tres tandas de 2 hilos: a lo sumo 3 × 0.5 s aunque los hilos sigan colgados
+    assert elapsed < 2.5
+    assert set(errors) == {f"hung{i}" for i in range(5)} | {"quick"} - set(results)
+    assert "sin empezar" in errors["hung4"]
+    assert all("Tiempo límite" in error for error in errors.values())
+
+
+def test_queued_tasks_get_their_share_of_time():
+    # Cada tarea tarda menos que el tiempo límite: ninguna vence aunque esperen en la cola
+    tasks = {i: (lambda i=i: time.sleep(0.2) or i) for i in range(6)}
+    results, errors = run_concurrently(tasks, max_workers=2, timeout=0.5)
+
+    assert errors == {}
+    assert results == {i: i for i in range(6)}
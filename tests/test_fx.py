@@ -0,0 +1,69 @@
+"""CurrencyConverter: moneda de cotización, subunidades y monedas desconocidas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analizador.fx import UNKNOWN_CURRENCY_MESSAGE, CurrencyConverter, format_money, normalize_currency
+from analizador.metadata import MetadataStore
+from analizador.store import PriceStore
+
+
+def prices(close):
+    index = pd.bdate_range("2024-01-01", "2024-01-10", inclusive="left", name="Date")
+    return pd.DataFrame({"Close": close, "Volume": 1000.0}, index=index)
+
+
+def fx_batch(symbols, start, end):
+    """Tipos de cambio fijos: 1 EUR = 1.1 USD"""
+    index = pd.bdate_range(start, end, inclusive="left", name="Date")
+    return {symbol: pd.DataFrame({"Close": 1.1}, index=index) for symbol in symbols}, {}
+
+
+@pytest.fixture
+def converter(tmp_path):
+    metadata = MetadataStore(tmp_path / "metadata.sqlite")
+    metadata.put("SAP.DE", {"currency": "EUR"})
+    metadata.put("VOD.L", {"currency": "GBp"})
+    metadata.put("AAPL", {"currency": "USD"})
+    metadata.put("NOCUR", {"currency": None})
+    return CurrencyConverter(PriceStore(tmp_path / "prices.sqlite"), fx_batch, metadata)
+
+
+def test_normalize_currency():
+    assert normalize_currency("GBp") == ("GBP", 0.01)
+    assert normalize_currency("eur") == ("EUR", 1.0)
+    assert normalize_currency(None) is None
+
+
+def test_format_money():
+    assert format_money(1500.5, "USD") == "$1,500.50"
+    assert format_money(-3, "EUR", 0) == "€-3"
+    assert format_money(1500, "CHF") == "CHF 1,500.00"
+
+
+def test_foreign_prices_are_converted(converter):
+    datasets = {"SAP.DE": prices(100.0), "AAPL": prices(50.0), "VOD.L": prices(200.0)}
+    converted, errors = converter.convert(datasets, "USD", "2024-01-01", "2024-01-10")
+
+    assert errors == {}
+    np.testing.assert_allclose(converted["SAP.DE"]["Close"], 110.0)
+    np.testing.assert_allclose(converted["SAP.DE"]["Volume"], 1000.0)
+    assert converted["AAPL"] is datasets["AAPL"]
+
+
+def test_minor_units_in_their_own_currency(converter):
+    converted, errors = converter.convert({"VOD.L": prices(200.0)}, "GBP", "2024-01-01", "2024-01-10")
+
+    assert errors == {}
+    np.testing.assert_allclose(converted["VOD.L"]["Close"], 2.0)
+
+
+@pytest.mark.parametrize("base", ["USD", "EUR"])
+def test_unknown_currency_is_an_error_not_usd(converter, base):
+    datasets = {"AAPL": prices(50.0), "NOCUR": prices(10.0), "MISSING": prices(10.0)}
+    converted, errors = converter.convert(datasets, base, "2024-01-01", "2024-01-10")
+
+    assert set(converted) == {"AAPL"}
+    assert errors == {"NOCUR": UNKNOWN_CURRENCY_MESSAGE, "MISSING": UNKNOWN_CURRENCY_MESSAGE}
+    assert converter.currency_of("MISSING") is None
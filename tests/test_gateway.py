@@ -0,0 +1,235 @@
+"""FetchGateway: límite de tasa, reintentos, cortocircuito y unificación de solicitudes."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from analizador.gateway import (
+    UNAVAILABLE_MESSAGE, CircuitBreaker, FetchGateway, ProviderUnavailable, TokenBucket, is_transient
+)
+from analizador.providers import MarketDataProvider, info_record
+
+
+class Clock:
+    """Reloj manual para el circuito y el límite de tasa"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ScriptedProvider(MarketDataProvider):
+    """Proveedor que responde cada llamada con el siguiente elemento de script
+
+    Un elemento es una excepción (se lanza), un dict símbolo -> error (esos
+    símbolos fallan y el resto recibe datos) o None (todo sale bien).
+    """
+
+    name = "scripted"
+    store_name = "scripted.sqlite"
+    metadata_name = "scripted_metadata.sqlite"
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def _next(self):
+        return self.script.pop(0) if self.script else None
+
+    def history_batch(self, symbols, start, end, interval="1d"):
+        self.calls.append(("history", tuple(symbols)))
+        step = self._next()
+        if isinstance(step, Exception):
+            raise step
+        errors = {symbol: error for symbol, error in (step or {}).items() if symbol in symbols}
+        data = pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2024-01-02"]))
+        return {symbol: data for symbol in symbols if symbol not in errors}, errors
+
+    def info(self, symbol):
+        self.calls.append(("info", symbol))
+        step = self._next()
+        if isinstance(step, Exception):
+            raise step
+        return info_record(symbol)
+
+
+def gateway(provider, clock, retries=2, threshold=2, reset=60.0):
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=reset, clock=clock)
+    gw = FetchGateway(provider, rate=1000.0, burst=1000, retries=retries, breaker=breaker, sleep=clock.sleep)
+    gw.bucket = TokenBucket(1000.0, 1000, clock=clock, sleep=clock.sleep)
+    return gw
+
+
+@pytest.mark.parametrize("error, transient", [
+    ("429 Too Many Requests", True),
+    ("HTTP Error 503", True),
+    ("Read timed out", True),
+    (ConnectionError("reset"), True),
+    ("No data found, symbol may be delisted", False),
+    (KeyError("Close"), False),
+    (ValueError("bad range"), False),
+    (ProviderUnavailable(UNAVAILABLE_MESSAGE), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_token_bucket_waits_after_burst():
+    clock = Clock()
+    bucket = TokenBucket(rate=2.0, burst=2, clock=clock, sleep=clock.sleep)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.5)
+    assert waits[3] > 0
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # una sola prueba a la vez
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 15.0
+    assert not breaker.allow()
+
+
+def test_lost_probe_expires():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow()
+    # La prueba nunca informa su resultado
+    clock.now = 15.0
+    assert not breaker.allow()
+    clock.now = 20.0
+    assert breaker.allow()
+
+
+def test_transient_failures_are_retried_per_symbol():
+    clock = Clock()
+    provider = ScriptedProvider({"BBB": "429 Too Many Requests"}, None)
+    datasets, errors = gateway(provider, clock).history_batch(["AAA", "BBB"], "2024-01-01", "2024-01-10")
+
+    assert set(datasets) == {"AAA", "BBB"} and errors == {}
+    assert provider.calls == [("history", ("AAA", "BBB")), ("history", ("BBB",))]
+    assert clock.now > 0  # esperó antes de reintentar
+
+
+def test_permanent_errors_are_not_retried():
+    clock = Clock()
+    provider = ScriptedProvider({"ZZZ": "No data found, symbol may be delisted"})
+    gw = gateway(provider, clock)
+    datasets, errors = gw.history_batch(["AAA", "ZZZ"], "2024-01-01", "2024-01-10")
+
+    assert set(datasets) == {"AAA"} and "ZZZ" in errors
+    assert len(provider.calls) == 1
+    assert gw.stats["retries"] == 0
+
+
+def test_exhausted_retries_open_the_breaker():
+    clock = Clock()
+    provider = ScriptedProvider(*[OSError("connection reset")] * 6)
+    gw = gateway(provider, clock, retries=2, threshold=2)
+
+    for _ in range(2):
+        _, errors = gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")
+        assert "AAA" in errors
+    assert gw.breaker.state == CircuitBreaker.OPEN
+
+    _, errors = gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")
+    assert errors == {"AAA": UNAVAILABLE_MESSAGE}
+    assert len(provider.calls) == 6
+    assert gw.stats["rejected"] == 1
+
+
+@pytest.mark.parametrize("error", [KeyError("Close"), ValueError("bad frame")])
+def test_non_transient_error_during_probe_closes_breaker(error):
+    clock = Clock()
+    provider = ScriptedProvider(OSError("connection reset"), error, None)
+    gw = gateway(provider, clock, retries=0, threshold=1, reset=10.0)
+
+    gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")
+    assert gw.breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 10.0
+    with pytest.raises(type(error)):
+        gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")
+    # El proveedor respondió: el circuito no queda semiabierto para siempre
+    assert gw.breaker.state == CircuitBreaker.CLOSED
+    datasets, errors = gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")
+    assert "AAA" in datasets and errors == {}
+
+
+def test_info_errors_record_an_outcome():
+    clock = Clock()
+    provider = ScriptedProvider(OSError("connection reset"), LookupError("unknown symbol"))
+    gw = gateway(provider, clock, retries=0, threshold=1, reset=10.0)
+
+    with pytest.raises(OSError):
+        gw.info("AAA")
+    assert gw.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(ProviderUnavailable):
+        gw.info("AAA")
+
+    clock.now += 10.0
+    with pytest.raises(LookupError):
+        gw.info("AAA")
+    assert gw.breaker.state == CircuitBreaker.CLOSED
+    assert gw.info("AAA")["name"] == "AAA"
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowProvider(ScriptedProvider):
+        def history_batch(self, symbols, start, end, interval="1d"):
+            started.set()
+            release.wait(5)
+            return super().history_batch(symbols, start, end, interval)
+
+    provider = SlowProvider()
+    gw = gateway(provider, Clock())
+    results = []
+    first = threading.Thread(target=lambda: results.append(gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(gw.history_batch(["AAA"], "2024-01-01", "2024-01-10")))
+    second.start()
+    # El segundo pedido espera al primero en lugar de ir al proveedor
+    deadline = time.monotonic() + 5
+    while gw.stats["coalesced"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(provider.calls) == 1
+    assert [set(datasets) for datasets, _ in results] == [{"AAA"}, {"AAA"}]
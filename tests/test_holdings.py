@@ -0,0 +1,89 @@
+"""read_holdings: columnas, separadores y montos con coma o punto decimal."""
+
+import json
+
+import pytest
+
+from analizador.holdings import AmbiguousAmount, parse_amount, read_holdings
+
+
+def amounts(frame):
+    return dict(zip(frame["symbol"], frame["amount"]))
+
+
+@pytest.mark.parametrize("text, decimal_comma, value", [
+    ("1500", None, 1500.0),
+    ("$1,500.50", False, 1500.5),
+    ("1500.50", True, 1500.5),
+    ("1500,50", False, 1500.5),
+    ("1.500,50 €", None, 1500.5),
+    ("1,500", False, 1500.0),
+    ("1,500", True, 1.5),
+    ("1.500", True, 1500.0),
+    ("-20", None, -20.0),
+    ("abc", None, None),
+    ("1.500.50", None, None),
+])
+def test_parse_amount(text, decimal_comma, value):
+    assert parse_amount(text, decimal_comma) == value
+
+
+@pytest.mark.parametrize("text", ["1,500", "1.500", "12,345"])
+def test_parse_amount_rejects_ambiguous_without_convention(text):
+    with pytest.raises(AmbiguousAmount):
+        parse_amount(text)
+
+
+def test_comma_csv_with_dollar_amounts():
+    content = 'ticker,monto,categoría\nAAPL,"$1,500.50",Tecnología\nMSFT,200,\nKO,,Consumo\n'
+    frame = read_holdings(content.encode("utf-8-sig"), "cartera.csv")
+
+    assert list(frame.columns) == ["symbol", "amount", "category"]
+    assert amounts(frame) == {"AAPL": 1500.5, "MSFT": 200.0, "KO": 0.0}
+    assert list(frame["category"]) == ["Tecnología", None, "Consumo"]
+
+
+def test_semicolon_csv_uses_decimal_comma():
+    content = "symbol;amount\nAAPL;1500,50\nMSFT;1.500\nKO;1.234,5\nJNJ;99.95\n"
+    frame = read_holdings(content, "cartera.csv")
+
+    assert amounts(frame) == {"AAPL": 1500.5, "MSFT": 1500.0, "KO": 1234.5, "JNJ": 99.95}
+
+
+def test_comma_csv_reads_unambiguous_decimal_comma():
+    frame = read_holdings('symbol,amount\nAAPL,"1500,50"\nMSFT,"1,500"\n', "cartera.csv")
+
+    assert amounts(frame) == {"AAPL": 1500.5, "MSFT": 1500.0}
+
+
+def test_ambiguous_json_amount_is_rejected():
+    with pytest.raises(ValueError, match="ambiguos para: AAPL"):
+        read_holdings(json.dumps({"AAPL": "1,500", "MSFT": "200"}), "cartera.json")
+
+
+def test_repeated_symbols_are_summed_keeping_last_category():
+    content = "symbol,amount,category\naapl,100,A\nAAPL,50,B\n"
+    frame = read_holdings(content, "cartera.csv")
+
+    assert amounts(frame) == {"AAPL": 150.0}
+    assert list(frame["category"]) == ["B"]
+
+
+@pytest.mark.parametrize("content, message", [
+    ("name,amount\nAAPL,10\n", "columna de símbolos"),
+    ("symbol,amount\nAAPL,diez\n", "no numéricos para: AAPL"),
+    ("symbol,amount\nAAPL,-10\n", "negativos para: AAPL"),
+])
+def test_invalid_files_raise(content, message):
+    with pytest.raises(ValueError, match=message):
+        read_holdings(content, "cartera.csv")
+
+
+def test_json_formats():
+    records = [{"symbol": "AAPL", "amount": 100, "category": "Tec"}, {"symbol": "KO", "amount": "1.500,25"}]
+    exported = {"amounts": {"AAPL": 100.0}, "custom_stocks": {"AAPL": {"category": "Tec"}}}
+
+    assert amounts(read_holdings(json.dumps(records), "a.json")) == {"AAPL": 100.0, "KO": 1500.25}
+    assert amounts(read_holdings(json.dumps({"MSFT": 10}), "b.json")) == {"MSFT": 10.0}
+    frame = read_holdings(json.dumps(exported), "c.json")
+    assert amounts(frame) == {"AAPL": 100.0} and list(frame["category"]) == ["Tec"]
@@ -0,0 +1,99 @@
+"""Métricas vectorizadas frente a un cálculo directo, símbolo por símbolo."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analizador.metrics import (
+    METRIC_COLUMNS, TRADING_DAYS, compute_portfolio_metrics, compute_unit_metrics, returns_matrix,
+    scale_unit_metrics, total_return_closes
+)
+
+
+def reference_metrics(close, amount, periods_per_year=TRADING_DAYS):
+    """Métricas de una serie de cierres sin NaN, calculadas con pandas sobre la serie"""
+    shares = amount / close.iloc[0]
+    returns = close.pct_change().dropna()
+    std = returns.std()
+    drawdown = (close - close.expanding().max()) / close.expanding().max()
+    final_value = shares * close.iloc[-1]
+    return {
+        "investment": amount,
+        "start_price": close.iloc[0],
+        "end_price": close.iloc[-1],
+        "shares": shares,
+        "final_value": final_value,
+        "profit_loss": final_value - amount,
+        "profit_loss_pct": (final_value - amount) / amount * 100,
+        "max_value": shares * close.max(),
+        "min_value": shares * close.min(),
+        "max_price": close.max(),
+        "min_price": close.min(),
+        "volatility": std * periods_per_year ** 0.5 * 100,
+        "max_drawdown": drawdown.min() * 100,
+        "sharpe_ratio": returns.mean() / std * periods_per_year ** 0.5 if std > 0 else 0.0,
+    }
+
+
+@pytest.fixture
+def prices():
+    """Tres acciones en días hábiles: una empieza a cotizar tarde y otra tiene huecos"""
+    rng = np.random.default_rng(7)
+    index = pd.bdate_range("2021-01-04", periods=400, name="Date")
+    values = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (len(index), 3)), axis=0))
+    matrix = pd.DataFrame(values, index=index, columns=["AAA", "BBB", "CCC"])
+    matrix.iloc[:120, 1] = np.nan
+    matrix.iloc[rng.choice(len(index), 40, replace=False), 2] = np.nan
+    return matrix
+
+
+def test_returns_skip_gaps(prices):
+    returns = pd.DataFrame(returns_matrix(prices.to_numpy()), index=prices.index, columns=prices.columns)
+    for symbol in prices.columns:
+        close = prices[symbol].dropna()
+        np.testing.assert_allclose(returns[symbol].reindex(close.index).iloc[1:], close.pct_change().iloc[1:])
+
+
+@pytest.mark.parametrize("periods_per_year", [TRADING_DAYS, 52])
+def test_portfolio_metrics_match_reference(prices, periods_per_year):
+    amounts = pd.Series({"AAA": 1000.0, "BBB": 250.0, "CCC": 40.0})
+    table = compute_portfolio_metrics(prices, amounts, periods_per_year)
+
+    assert list(table.columns) == METRIC_COLUMNS
+    for symbol in prices.columns:
+        expected = reference_metrics(prices[symbol].dropna(), amounts[symbol], periods_per_year)
+        for column in METRIC_COLUMNS:
+            assert table.loc[symbol, column] == pytest.approx(expected[column], rel=1e-9), (symbol, column)
+
+
+def test_scaled_unit_metrics_match_direct_computation(prices):
+    unit = compute_unit_metrics(prices)
+    for amounts in ([100.0, 100.0, 100.0], [1.0, 5000.0, 0.0]):
+        scaled = scale_unit_metrics(unit, amounts)
+        direct = compute_portfolio_metrics(prices, amounts)
+        pd.testing.assert_frame_equal(scaled, direct)
+    assert list(scale_unit_metrics(unit, [0.0, 100.0, 0.0]).index) == ["BBB"]
+
+
+def test_symbols_without_prices_or_amount_are_skipped(prices):
+    prices = prices.assign(DDD=np.nan)
+    table = compute_portfolio_metrics(prices, [100.0, 0.0, 100.0, 100.0])
+    assert list(table.index) == ["AAA", "CCC"]
+
+
+def test_total_return_closes_match_reinvesting_shares():
+    index = pd.bdate_range("2023-01-02", periods=60, name="Date")
+    close = pd.Series(np.linspace(20, 26, len(index)), index=index, name="Close")
+    dividends = pd.Series(0.0, index=index)
+    dividends.iloc[[15, 40]] = [0.5, 0.7]
+    data = pd.DataFrame({"Close": close, "Dividends": dividends})
+
+    # Cada dividendo compra acciones al cierre previo a la fecha ex
+    shares, values = 1.0, []
+    for i in range(len(index)):
+        if dividends.iloc[i] > 0:
+            shares += shares * dividends.iloc[i] / close.iloc[i - 1]
+        values.append(shares * close.iloc[i])
+
+    np.testing.assert_allclose(total_return_closes(data), values)
+    pd.testing.assert_series_equal(total_return_closes(data[["Close"]]), close)
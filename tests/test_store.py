@@ -0,0 +1,184 @@
+"""PriceStore: rangos cubiertos, descargas incrementales y splits entre descargas."""
+
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analizador.store as store_module
+from analizador.store import PriceStore, split_factor, uncovered_ranges
+
+
+class FixedDate(date):
+    """date con un hoy configurable"""
+
+    current = date(2024, 1, 10)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+@pytest.fixture
+def today(monkeypatch):
+    monkeypatch.setattr(store_module, "date", FixedDate)
+    FixedDate.current = date(2024, 1, 10)
+    return FixedDate
+
+
+def bars(start, end, close, splits=None):
+    """Barras diarias hábiles de [start, end) con un cierre fijo y splits {fecha: factor}"""
+    index = pd.bdate_range(start, end, inclusive="left", name="Date")
+    data = pd.DataFrame({
+        "Open": close, "High": close, "Low": close, "Close": close,
+        "Volume": 1000.0, "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+    for day, factor in (splits or {}).items():
+        data.loc[pd.Timestamp(day), "Stock Splits"] = factor
+    return data
+
+
+class FakeProvider:
+    """fetch_batch que registra los rangos pedidos y sirve lo que devuelve series"""
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+
+    def __call__(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start, end))
+        return {symbol: self.series(symbol, start, end) for symbol in symbols}, {}
+
+
+def test_uncovered_ranges():
+    covered = (date(2024, 1, 5), date(2024, 1, 10))
+    assert uncovered_ranges(None, date(2024, 1, 1), date(2024, 1, 3)) == [(date(2024, 1, 1), date(2024, 1, 3))]
+    assert uncovered_ranges(covered, date(2024, 1, 6), date(2024, 1, 9)) == []
+    assert uncovered_ranges(covered, date(2024, 1, 1), date(2024, 1, 12)) == [
+        (date(2024, 1, 1), date(2024, 1, 5)), (date(2024, 1, 10), date(2024, 1, 12))
+    ]
+
+
+def test_uncovered_ranges_stop_at_today():
+    tomorrow = pd.Timestamp.today().normalize() + pd.Timedelta(days=2)
+    (start, end), = uncovered_ranges(None, tomorrow - pd.Timedelta(days=10), tomorrow)
+    assert end == date.today()
+
+
+def test_split_factor():
+    data = bars("2024-01-01", "2024-01-20", 25.0, {"2024-01-05": 2.0, "2024-01-15": 4.0})
+    assert split_factor(data, date(2024, 1, 1)) == 8.0
+    assert split_factor(data, date(2024, 1, 10)) == 4.0
+    assert split_factor(data, date(2024, 1, 15)) == 1.0
+    assert split_factor(None, date(2024, 1, 1)) == 1.0
+
+
+def test_served_from_disk_after_first_fetch(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider(lambda symbol, start, end: bars(start, end, 100.0))
+
+    first, _ = store.get_history(["AAA", "BBB"], "2024-01-01", "2024-01-10", provider)
+    again, _ = store.get_history(["AAA", "BBB"], "2024-01-02", "2024-01-09", provider)
+
+    assert provider.calls == [(("AAA", "BBB"), date(2024, 1, 1), date(2024, 1, 10))]
+    assert len(first["AAA"]) == 7
+    assert again["BBB"].index[0] == pd.Timestamp("2024-01-02")
+    assert store.coverage("AAA") == (date(2024, 1, 1), date(2024, 1, 10))
+
+
+def test_trailing_range_is_appended(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider(lambda symbol, start, end: bars(start, end, 100.0))
+    store.get_history(["AAA"], "2024-01-01", "2024-01-10", provider)
+
+    today.current = date(2024, 1, 20)
+    datasets, _ = store.get_history(["AAA"], "2024-01-01", "2024-01-15", provider)
+
+    # Lo que falta al final se pide hasta hoy, para ver los splits posteriores
+    assert provider.calls[-1] == (("AAA",), date(2024, 1, 10), date(2024, 1, 20))
+    assert datasets["AAA"].index[-1] == pd.Timestamp("2024-01-12")
+    assert store.coverage("AAA") == (date(2024, 1, 1), date(2024, 1, 20))
+
+
+def test_split_in_appended_range_rebases_stored_rows(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    # Antes del split 4:1 del 15/01 la acción cotiza a 100; después Yahoo entrega toda la historia a 25
+    provider = FakeProvider(lambda symbol, start, end: bars(
+        start, end, 25.0 if FixedDate.current > date(2024, 1, 15) else 100.0, {"2024-01-15": 4.0}
+    ))
+    store.get_history(["AAA"], "2024-01-01", "2024-01-10", provider)
+
+    today.current = date(2024, 1, 20)
+    datasets, _ = store.get_history(["AAA"], "2024-01-01", "2024-01-20", provider)
+
+    data = datasets["AAA"]
+    np.testing.assert_allclose(data["Close"], 25.0)
+    np.testing.assert_allclose(data["Open"], 25.0)
+    np.testing.assert_allclose(data.loc[:"2024-01-09", "Volume"], 4000.0)
+
+
+def test_split_before_last_download_is_not_applied_twice(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider(lambda symbol, start, end: bars(start, end, 25.0, {"2024-01-15": 4.0}))
+    # Un rango pasado descargado después del split ya viene ajustado
+    today.current = date(2024, 1, 20)
+    store.get_history(["AAA"], "2024-01-01", "2024-01-10", provider)
+
+    datasets, _ = store.get_history(["AAA"], "2024-01-01", "2024-01-20", provider)
+
+    np.testing.assert_allclose(datasets["AAA"]["Close"], 25.0)
+
+
+def test_leading_gap_refetches_stored_rows(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider(lambda symbol, start, end: bars(
+        start, end, 25.0 if FixedDate.current > date(2024, 1, 15) else 100.0, {"2024-01-15": 4.0}
+    ))
+    store.get_history(["AAA"], "2024-01-05", "2024-01-10", provider)
+
+    # El hueco al inicio no trae el split: se reemplaza todo lo guardado en la base de hoy
+    today.current = date(2024, 1, 20)
+    datasets, _ = store.get_history(["AAA"], "2024-01-01", "2024-01-08", provider)
+
+    assert provider.calls[-1] == (("AAA",), date(2024, 1, 1), date(2024, 1, 20))
+    np.testing.assert_allclose(datasets["AAA"]["Close"], 25.0)
+    assert store.coverage("AAA") == (date(2024, 1, 1), date(2024, 1, 20))
+
+
+def test_fetch_errors_are_not_stored(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    def failing(symbols, start, end):
+        return {}, {symbol: "timeout" for symbol in symbols}
+
+    datasets, errors = store.get_history(["AAA"], "2024-01-01", "2024-01-10", failing)
+
+    assert datasets == {} and errors == {"AAA": "timeout"}
+    assert store.coverage("AAA") is None
+
+
+def test_empty_range_is_recorded_as_covered(tmp_path, today):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider(lambda symbol, start, end: None)
+
+    datasets, errors = store.get_history(["AAA"], "2024-01-06", "2024-01-08", provider)
+    store.get_history(["AAA"], "2024-01-06", "2024-01-08", provider)
+
+    assert datasets == {} and errors == {}
+    assert len(provider.calls) == 1
+
+
+def test_store_without_download_day_is_migrated(tmp_path, today):
+    path = tmp_path / "prices.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE coverage (symbol TEXT PRIMARY KEY, start TEXT NOT NULL, end TEXT NOT NULL)")
+        conn.execute("INSERT INTO coverage VALUES ('AAA', '2024-01-01', '2024-01-10')")
+
+    store = PriceStore(path)
+
+    assert store.coverage("AAA") == (date(2024, 1, 1), date(2024, 1, 10))
+    with sqlite3.connect(path) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(coverage)")]
+    assert "fetched" in columns
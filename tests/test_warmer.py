@@ -0,0 +1,45 @@
+"""CacheWarmer: períodos precargados y corridas fallidas."""
+
+import logging
+from datetime import datetime
+
+from analizador.catalog import DATE_PRESETS
+from analizador.engine import MetricsCache
+from analizador.metadata import MetadataStore
+from analizador.providers import MarketDataProvider
+from analizador.store import PriceStore
+from analizador.warmer import MARKET_TIMEZONE, CacheWarmer, next_warm_time, warm_periods
+
+
+class BrokenProvider(MarketDataProvider):
+    name = "broken"
+
+    def history_batch(self, symbols, start, end, interval="1d"):
+        raise RuntimeError("base de datos bloqueada")
+
+
+def test_next_warm_time_is_after_the_close():
+    before = datetime(2024, 3, 4, 10, 0, tzinfo=MARKET_TIMEZONE)
+    after = datetime(2024, 3, 4, 17, 0, tzinfo=MARKET_TIMEZONE)
+
+    assert next_warm_time(before) == datetime(2024, 3, 4, 16, 30, tzinfo=MARKET_TIMEZONE)
+    assert next_warm_time(after) == datetime(2024, 3, 5, 16, 30, tzinfo=MARKET_TIMEZONE)
+
+
+def test_warm_periods_cover_today_and_tomorrow():
+    periods = warm_periods(datetime(2024, 3, 4, 17, 0))
+    assert len(DATE_PRESETS) <= len(periods) <= 2 * len(DATE_PRESETS)
+    assert all(start < end for start, end in periods)
+
+
+def test_failed_run_is_logged_and_reported(tmp_path, caplog):
+    warmer = CacheWarmer(BrokenProvider(), PriceStore(tmp_path / "prices.sqlite"),
+                         MetadataStore(tmp_path / "metadata.sqlite"), MetricsCache())
+
+    with caplog.at_level(logging.ERROR, logger="analizador.warmer"):
+        warmer._run_logged()
+
+    status = warmer.status
+    assert status["failure"] == "RuntimeError: base de datos bloqueada"
+    assert not status["running"] and status["last_run"] is not None
+    assert "base de datos bloqueada" in caplog.text